@@ -8,11 +8,25 @@ __version__ = "1.5.0"
 # the package name, the next non-empty comment would be
 # printed as description).
 
+import importlib
+import sys
+
 from . import clientcredentials
-from . import handleclient
 from .handleexceptions import *
 
 # Make sure that a single "import pyhandle" allows the use of
 # relevant submodules!
 # See 
 # https://github.com/psf/requests/blob/master/requests/__init__.py#L120
+# The clients (and with them requests and pymysql) are only imported
+# when they are first used, which keeps "import pyhandle" fast:
+_LAZY_SUBMODULES = ('handleclient', 'client')
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module('.'+name, __name__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+if sys.version_info < (3, 7):
+    # No lazy module attributes (PEP 562) before Python 3.7:
+    from . import handleclient
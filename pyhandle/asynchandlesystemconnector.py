@@ -0,0 +1,376 @@
+'''
+This module contains the class AsyncHandleSystemConnector which
+    sends requests to the Handle Server using asyncio (via the
+    aiohttp library), so that many requests can be in flight
+    on one event loop at the same time.
+
+The configuration (URL, credentials, defaults), the URL building
+    and the interpretation of the responses are reused from the
+    synchronous HandleSystemConnector.
+
+'''
+
+import asyncio
+import logging
+import os
+import ssl
+import time
+import pyhandle
+import pyhandle.hsresponses
+import pyhandle.utilhandle
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.handleresponse import HandleResponse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+REQUESTLOGGER = logging.getLogger('log_all_requests_of_testcases_to_file')
+REQUESTLOGGER.propagate = False
+REQUESTLOGGER.addHandler(pyhandle.util.NullHandler())
+
+
+def check_aiohttp_available():
+    '''
+    Check that the optional dependency aiohttp is installed.
+
+    :raise: :exc:`~ImportError`
+    '''
+    if aiohttp is None:
+        raise ImportError('The asynchronous client needs the package "aiohttp".'
+                          ' Please install it, e.g. using "pip install pyhandle[async]".')
+
+
+def make_client_timeout(timeout):
+    '''
+    Translate a (connect, read) timeout tuple into the "timeout"
+        argument understood by aiohttp.
+
+    :timeout: A tuple (connect timeout, read timeout) in seconds.
+    :return: An aiohttp.ClientTimeout.
+    '''
+    connect_timeout, read_timeout = timeout
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+
+
+def make_ssl_context(verify, cert=None):
+    '''
+    Translate the HTTPS settings used with the requests library into
+        the "ssl" argument understood by aiohttp.
+
+    :verify: True, False or the path to a CA_BUNDLE file or directory.
+    :cert: Optional. None, the path to a file containing certificate and
+        key, or a tuple of the paths to certificate and key.
+    :return: True (default verification), False (no verification) or
+        an ssl.SSLContext.
+    '''
+    if cert is None:
+        if verify is True:
+            return True
+        if verify is False:
+            return False
+
+    if verify is True or verify is False:
+        context = ssl.create_default_context()
+    elif os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    else:
+        context = ssl.create_default_context(cafile=verify)
+
+    if verify is False:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    if isinstance(cert, tuple):
+        context.load_cert_chain(cert[0], cert[1])
+    elif cert is not None:
+        context.load_cert_chain(cert)
+    return context
+
+
+class BufferedRequest(object):
+    '''
+    The request that a BufferedResponse answers. Only contains the
+        URL, as this is all that pyhandle accesses.
+    '''
+    def __init__(self, url):
+        self.url = url
+
+
+class BufferedResponse(object):
+    '''
+    A response whose body has been read completely. It offers the
+        attributes of a requests.Response that pyhandle accesses
+        (status_code, content, headers, url, request.url), so that
+        the helpers in hsresponses and the exceptions can be used
+        with it.
+    '''
+    def __init__(self, status_code, content, headers, url, request_url):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.url = url
+        self.request = BufferedRequest(request_url)
+
+
+async def send_buffered_request(session, method, url, json_codec=None, **kwargs):
+    '''
+    Send a request with an aiohttp session and read the entire response.
+
+    :session: An aiohttp.ClientSession.
+    :method: The HTTP method.
+    :url: The URL.
+    :json_codec: Optional. The JSON codec used to parse the body.
+    :kwargs: Any other arguments understood by aiohttp.
+    :return: A HandleResponse wrapping a BufferedResponse.
+    '''
+    async with session.request(method, url, **kwargs) as resp:
+        content = await resp.read()
+        return HandleResponse(BufferedResponse(resp.status, content, resp.headers, str(resp.url), url), json_codec)
+
+
+class AsyncHandleSystemConnector(object):
+    '''
+    AsyncHandleSystemConnector sends the requests of the
+    asynchronous client to the handle server. It has the same
+    request methods as HandleSystemConnector, but they are
+    coroutines.
+
+    '''
+
+    def __init__(self, connector=None, **args):
+        '''
+        :param connector: Optional. A HandleSystemConnector that holds the
+            configuration. If not given, one is created from the other
+            arguments. Note that this may send a (blocking) request to check
+            whether the username exists.
+        :param max_connections: Optional. The maximum number of simultaneous
+            connections to the Handle Server. Defaults to 100.
+        :param args: Any argument understood by HandleSystemConnector.
+        '''
+        check_aiohttp_available()
+
+        if connector is None:
+            connector = HandleSystemConnector(**args)
+        self.__connector = connector
+        self.__max_connections = args.get('max_connections') or 100
+        self.__session = None
+        self.__ssl = None
+        self.__ssl_ready = False
+
+        LOGGER.debug('End of instantiation of the async handle system connector.')
+
+    # Session:
+
+    def __get_session(self):
+        # The aiohttp session must be created inside the event loop,
+        # so it is created on first use.
+        if self.__session is None or self.__session.closed:
+            tcp_connector = aiohttp.TCPConnector(limit=self.__max_connections)
+            self.__session = aiohttp.ClientSession(connector=tcp_connector)
+        return self.__session
+
+    def __get_ssl(self, verify, cert):
+        if not self.__ssl_ready:
+            self.__ssl = make_ssl_context(verify, cert)
+            self.__ssl_ready = True
+        return self.__ssl
+
+    async def close(self):
+        '''
+        Close the connections to the Handle Server.
+        '''
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+        self.__session = None
+
+    async def __wait_for_rate_limit(self, kind, deadline, handle, op):
+        wait = self.__connector.get_rate_limit_wait(kind, deadline, handle, op)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # API methods:
+
+    def make_handle_URL(self, handle, indices=None, overwrite=None, other_url=None, **options):
+        '''
+        Create the URL for a HTTP request (see
+        :meth:`~pyhandle.handlesystemconnector.HandleSystemConnector.make_handle_URL`).
+        '''
+        return self.__connector.make_handle_URL(handle, indices, overwrite, other_url, **options)
+
+    async def send_handle_get_request(self, handle, indices=None, timeout=None, deadline=None, **hs_options):
+        '''
+        Send a HTTP GET request to the handle server to read either an entire
+            handle or to some specified values from a handle record.
+
+        :param handle: The handle.
+        :param indices: Optional. A list of indices to retrieve. Defaults to
+            None (i.e. the entire handle record is retrieved).
+        :param timeout: Optional. The timeout in seconds for this request, as
+            one number or as a (connect, read) pair.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :param hs_options: Optional. Key-value pairs which will be appended
+            to the URL as parameters (e.g. "&auth=true").
+        :return: The server's response, as BufferedResponse.
+        '''
+        url = self.make_handle_URL(handle, indices, **hs_options)
+        LOGGER.debug('GET Request to %s', url)
+        head, veri, cert = self.__connector.get_request_settings('GET')
+        await self.__wait_for_rate_limit('read', deadline, handle, 'GET')
+        client_timeout = make_client_timeout(self.__connector.get_timeout(timeout, deadline, handle, 'GET'))
+
+        resp, latency = await self.__send('GET', url, handle,
+            headers=head, ssl=self.__get_ssl(veri, cert), timeout=client_timeout)
+        self.__log_request_response_to_file(
+            logger=REQUESTLOGGER,
+            op='GET',
+            handle=handle,
+            url=url,
+            headers=head,
+            verify=veri,
+            resp=resp,
+            latency=latency
+        )
+        return resp
+
+    async def send_handle_put_request(self, **args):
+        '''
+        Send a HTTP PUT request to the handle server to write either an entire
+            handle or to some specified values to an handle record.
+
+        :param handle: The handle.
+        :param list_of_entries: A list of handle record entries to be written,
+         in the format [{"index":xyz, "type":"xyz", "data":"xyz"}] or similar.
+        :param indices: Optional. A list of indices to write.
+        :param overwrite: Optional. Whether the handle should be overwritten
+         if it exists already.
+        :param op: Optional. Name of the operation, used in exceptions.
+        :param timeout: Optional. The timeout in seconds for this request.
+        :param deadline: Optional. The point in time (as returned by
+         time.time()) by which the request must be finished.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :return: The server's response and the payload sent.
+        '''
+        mandatory_args = ['handle', 'list_of_entries']
+        optional_args = ['indices', 'op', 'overwrite', 'timeout', 'deadline']
+        pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
+        pyhandle.util.check_presence_of_mandatory_args(args, mandatory_args)
+        handle = args['handle']
+        op = args['op']
+        overwrite = args['overwrite'] or False
+
+        head, veri, cert = self.__connector.get_request_settings('PUT')
+        await self.__wait_for_rate_limit('write', args['deadline'], handle, 'PUT')
+        client_timeout = make_client_timeout(
+            self.__connector.get_timeout(args['timeout'], args['deadline'], handle, 'PUT'))
+        url = self.make_handle_URL(handle, args['indices'], overwrite=overwrite)
+        LOGGER.debug('PUT Request to %s', url)
+        payload = self.__connector.get_json_codec().dumps({'values':args['list_of_entries']})
+
+        resp = await self.__send_put_request_to_server(url, payload, head, veri, cert, handle, client_timeout)
+        if pyhandle.hsresponses.is_redirect_from_http_to_https(resp):
+            # Reissue the PUT ourselves, as it must not become a GET:
+            newurl = resp.headers['location']
+            resp = await self.__send_put_request_to_server(newurl, payload, head, veri, cert, handle, client_timeout)
+
+        self.__connector.check_authentication(resp, op, handle)
+        return resp, payload
+
+    async def __send_put_request_to_server(self, url, payload, head, veri, cert, handle, client_timeout):
+        data = payload.encode('utf-8')
+        resp, latency = await self.__send('PUT', url, handle, len(data),
+            data=data, headers=head, ssl=self.__get_ssl(veri, cert),
+            allow_redirects=False, timeout=client_timeout)
+        self.__log_request_response_to_file(
+            logger=REQUESTLOGGER,
+            op='PUT',
+            handle=handle,
+            url=url,
+            headers=head,
+            verify=veri,
+            resp=resp,
+            latency=latency,
+            payload=payload)
+        return resp
+
+    async def send_handle_delete_request(self, **args):
+        '''
+        Send a HTTP DELETE request to the handle server to delete either an
+            entire handle or to some specified values from a handle record.
+
+        :param handle: The handle.
+        :param indices: Optional. A list of indices to delete. Defaults to
+            None (i.e. the entire handle is deleted.).
+        :param op: Optional. Name of the operation, used in exceptions.
+        :param timeout: Optional. The timeout in seconds for this request.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :return: The server's response.
+        '''
+        mandatory_args = ['handle']
+        optional_args = ['indices', 'op', 'timeout', 'deadline']
+        pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
+        pyhandle.util.check_presence_of_mandatory_args(args, mandatory_args)
+        handle = args['handle']
+        op = args['op']
+
+        head, veri, cert = self.__connector.get_request_settings('DELETE')
+        await self.__wait_for_rate_limit('write', args['deadline'], handle, 'DELETE')
+        client_timeout = make_client_timeout(
+            self.__connector.get_timeout(args['timeout'], args['deadline'], handle, 'DELETE'))
+        url = self.make_handle_URL(handle, args['indices'])
+        LOGGER.debug('DELETE Request to %s', url)
+
+        resp, latency = await self.__send('DELETE', url, handle,
+            headers=head, ssl=self.__get_ssl(veri, cert), timeout=client_timeout)
+        self.__log_request_response_to_file(
+            logger=REQUESTLOGGER,
+            op='DELETE',
+            handle=handle,
+            url=url,
+            headers=head,
+            verify=veri,
+            resp=resp,
+            latency=latency
+        )
+
+        self.__connector.check_authentication(resp, op, handle)
+        return resp
+
+    async def __send(self, method, url, handle, bytes_sent=0, **kwargs):
+        # Send, and count the request (also if it failed):
+        statistics = self.__connector.get_statistics()
+        hooks = self.__connector.get_request_hooks()
+        hooked_request = None
+        if hooks is not None:
+            hooked_request = hooks.before_request(method, handle, url)
+        start = time.monotonic()
+        try:
+            resp = await send_buffered_request(
+                self.__get_session(), method, url, json_codec=self.__connector.get_json_codec(), **kwargs)
+        except Exception as error:
+            statistics.record_response(method, None, time.monotonic() - start, bytes_sent)
+            if hooked_request is not None:
+                hooks.after_request(hooked_request, error=error)
+            raise
+        latency = time.monotonic() - start
+        statistics.record_response(method, resp, latency, bytes_sent)
+        if hooked_request is not None:
+            hooks.after_request(hooked_request, resp)
+        return resp, latency
+
+    def __log_request_response_to_file(self, **args):
+        request_log = self.__connector.get_request_log()
+        if request_log is not None:
+            request_log.log_request(args['op'], args['handle'], args['url'], args['resp'],
+                args.get('latency'), args.get('payload'))
+
+        # Only build the message if someone is listening:
+        if args['logger'].isEnabledFor(logging.INFO):
+            message = pyhandle.utilhandle.make_request_log_message(**args)
+            args['logger'].info(message)
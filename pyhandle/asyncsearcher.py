@@ -0,0 +1,138 @@
+'''
+This module provides the class AsyncSearcher
+which interacts with a Handle Search Servlet
+using asyncio (via the aiohttp library).
+
+The query building and the interpretation of the
+responses are reused from the class Searcher.
+
+'''
+
+import asyncio
+import logging
+import time
+import pyhandle
+import pyhandle.utilhandle
+from pyhandle.searcher import Searcher
+from pyhandle.asynchandlesystemconnector import check_aiohttp_available, make_client_timeout, make_ssl_context, send_buffered_request
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+REQUESTLOGGER = logging.getLogger('log_all_requests_of_testcases_to_file')
+REQUESTLOGGER.propagate = False
+REQUESTLOGGER.addHandler(pyhandle.util.NullHandler())
+
+class AsyncSearcher(object):
+    '''
+    Asynchronous variant of the Searcher: search_handle
+        is a coroutine.
+    '''
+
+    def __init__(self, searcher=None, **args):
+        '''
+        :param searcher: Optional. A Searcher that holds the configuration.
+            If not given, one is created from the other arguments.
+        :param args: Any argument understood by Searcher.
+        '''
+        check_aiohttp_available()
+
+        if searcher is None:
+            searcher = Searcher(**args)
+        self.__searcher = searcher
+        self.__session = None
+        self.__ssl = None
+        self.__ssl_ready = False
+
+    def __get_session(self):
+        # The aiohttp session must be created inside the event loop,
+        # so it is created on first use.
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession()
+        return self.__session
+
+    async def close(self):
+        '''
+        Close the connections to the search servlet.
+        '''
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+        self.__session = None
+
+    async def search_handle(self, timeout=None, deadline=None, **args):
+        '''
+        Search for handles containing the specified key with the specified
+        value (see :meth:`~pyhandle.searcher.Searcher.search_handle`).
+
+        :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`: If a search field is specified that
+            cannot be used, or if something else goes wrong.
+        :return: A list of all Handles (strings) that bear the given key with
+            given value of given prefix or server, or None if there is no
+            access to a search servlet.
+        '''
+        LOGGER.debug('search_handle...')
+        if not self.__searcher.has_search_access():
+            LOGGER.error('Searching not possible. Reason: No access to search system (endpoint: %s).',
+                self.__searcher.get_search_endpoint())
+            return None
+
+        query, prefix = self.__searcher.prepare_search(**args)
+        resp = await self.__send_revlookup_get_request(query, timeout, deadline)
+        return self.__searcher.interpret_search_response(resp, query, prefix)
+
+    async def __send_revlookup_get_request(self, query, timeout=None, deadline=None):
+
+        entirequery, head, veri = self.__searcher.get_search_request_settings(query)
+        wait = self.__searcher.get_rate_limit_wait(deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        client_timeout = make_client_timeout(self.__searcher.get_timeout(timeout, deadline))
+        if not self.__ssl_ready:
+            self.__ssl = make_ssl_context(veri)
+            self.__ssl_ready = True
+
+        statistics = self.__searcher.get_statistics()
+        hooks = self.__searcher.get_request_hooks()
+        hooked_request = None
+        if hooks is not None:
+            hooked_request = hooks.before_request('SEARCH', '', entirequery)
+        start = time.monotonic()
+        try:
+            resp = await send_buffered_request(
+                self.__get_session(), 'GET', entirequery, json_codec=self.__searcher.get_json_codec(),
+                headers=head, ssl=self.__ssl, timeout=client_timeout)
+        except Exception as error:
+            statistics.record_response('SEARCH', None, time.monotonic() - start)
+            if hooked_request is not None:
+                hooks.after_request(hooked_request, error=error)
+            raise
+        latency = time.monotonic() - start
+        statistics.record_response('SEARCH', resp, latency)
+        if hooked_request is not None:
+            hooks.after_request(hooked_request, resp)
+        self.__log_request_response_to_file(
+            logger=REQUESTLOGGER,
+            op='SEARCH',
+            handle='',
+            url=entirequery,
+            headers=head,
+            verify=veri,
+            resp=resp,
+            latency=latency
+        )
+        return resp
+
+    def __log_request_response_to_file(self, **args):
+        request_log = self.__searcher.get_request_log()
+        if request_log is not None:
+            request_log.log_request(args['op'], args['handle'], args['url'], args['resp'],
+                args.get('latency'))
+
+        # Only build the message if someone is listening:
+        if args['logger'].isEnabledFor(logging.INFO):
+            message = pyhandle.utilhandle.make_request_log_message(**args)
+            args['logger'].info(message)
@@ -0,0 +1,370 @@
+'''
+This module provides the asynchronous REST client, which can
+    be used from asyncio code to interact with a Handle Server
+    without blocking the event loop.
+
+The asynchronous client needs the optional dependency "aiohttp".
+'''
+from __future__ import absolute_import
+
+import logging
+
+from .. import util
+from .. import utilhandle
+from ..handleexceptions import HandleAlreadyExistsException
+from ..asynchandlesystemconnector import AsyncHandleSystemConnector, check_aiohttp_available
+from ..asyncsearcher import AsyncSearcher
+from .resthandleclient import RESTHandleClient
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(util.NullHandler())
+
+
+class AsyncRESTHandleClient(object):
+    '''
+    PyHandle asynchronous rest client class. Its methods mirror the ones
+    of :class:`~pyhandle.client.resthandleclient.RESTHandleClient`, but are
+    coroutines, so that thousands of requests can share one event loop.
+
+    Example:
+
+        .. code:: python
+
+            async with AsyncRESTHandleClient.instantiate_for_read_access() as client:
+                records = await asyncio.gather(*[
+                    client.retrieve_handle_record_json(handle) for handle in handles
+                ])
+
+    The URL building, the payload building and the interpretation of the
+    Handle Server's responses are the same as in the synchronous client.
+    '''
+
+    def __init__(self, handle_server_url=None, **args):
+        '''
+        Initialize the client. It understands the same arguments as
+        :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.__init__`.
+
+        *Note:* If a username is given, its existence is checked during the
+        instantiation, using a (blocking) synchronous request.
+
+        :param max_connections: Optional. The maximum number of simultaneous
+            connections to the Handle Server. Defaults to 100.
+        :raises: :exc:`~ImportError`: If aiohttp is not installed.
+        '''
+        check_aiohttp_available()
+
+        LOGGER.debug('\n%s\nInstantiation of AsyncRESTHandleClient\n%s', 60 * '*', 60 * '*')
+
+        # The synchronous client holds the configuration and the logic:
+        self.__restclient = RESTHandleClient(handle_server_url, **args)
+        self.__handlesystemconnector = AsyncHandleSystemConnector(
+            self.__restclient._get_handlesystemconnector(), **args)
+        self.__searcher = AsyncSearcher(self.__restclient._get_searcher(), **args)
+
+        LOGGER.debug(' - (end of initialisation)')
+
+    @staticmethod
+    def instantiate_for_read_access(handle_server_url=None, **config):
+        '''
+        Initialize the client in read-only mode. Access is anonymous,
+        thus no credentials are required.
+
+        :param handle_server_url: Optional. The URL of the Handle System
+            server to read from. Defaults to 'https://hdl.handle.net'
+        :param **config: More key-value pairs may be passed that will be passed
+            on to the constructor as config.
+        :return: An instance of the client.
+        '''
+        return AsyncRESTHandleClient(handle_server_url, **config)
+
+    @staticmethod
+    def instantiate_for_read_and_search(handle_server_url, reverselookup_username, reverselookup_password, **config):
+        '''
+        Initialize client with read access and with search function.
+
+        :param handle_server_url: The URL of the Handle Server. May be None
+            (then, the default 'https://hdl.handle.net' is used).
+        :param reverselookup_username: The username to authenticate at the
+            reverse lookup servlet.
+        :param reverselookup_password: The password to authenticate at the
+            reverse lookup servlet.
+        :param **config: More key-value pairs may be passed that will be passed
+            on to the constructor as config.
+        :return: An instance of the client.
+        '''
+        if handle_server_url is None and 'reverselookup_baseuri' not in config.keys():
+            raise TypeError('You must specify either "handle_server_url" or "reverselookup_baseuri".' + \
+                ' Searching not possible without the URL of a search servlet.')
+
+        return AsyncRESTHandleClient(
+            handle_server_url,
+            reverselookup_username=reverselookup_username,
+            reverselookup_password=reverselookup_password,
+            **config
+        )
+
+    @staticmethod
+    def instantiate_with_username_and_password(handle_server_url, username, password, **config):
+        '''
+        Initialize client against an HSv8 instance with full read/write access.
+
+        :param handle_server_url: The URL of the Handle System server.
+        :param username: This must be a handle value reference in the format
+            "index:prefix/suffix".
+        :param password: This is the password stored as secret key in the
+            actual Handle value the username points to.
+        :param **config: More key-value pairs may be passed that will be passed
+            on to the constructor as config.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`: If the username handle is not found.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :return: An instance of the client.
+        '''
+        return AsyncRESTHandleClient(handle_server_url, username=username, password=password, **config)
+
+    @staticmethod
+    def instantiate_with_credentials(credentials, **config):
+        '''
+        Initialize the client against an HSv8 instance with full read/write
+        access.
+
+        :param credentials: A credentials object, see separate class
+            PIDClientCredentials.
+        :param **config: More key-value pairs may be passed that will be passed
+            on to the constructor as config. Config options from the
+            credentials object are overwritten by this.
+        :return: An instance of the client.
+        '''
+        key_value_pairs = credentials.get_all_args()
+
+        if config is not None:
+            key_value_pairs.update(**config)  # passed config overrides json file
+
+        return AsyncRESTHandleClient(**key_value_pairs)
+
+    def stats(self):
+        '''
+        Return the statistics of the requests sent by this client (see
+        :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.stats`).
+        '''
+        return self.__restclient.stats()
+
+    def get_slow_requests(self):
+        '''
+        Return the slow requests sent by this client (see
+        :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.get_slow_requests`).
+        '''
+        return self.__restclient.get_slow_requests()
+
+    async def close(self):
+        '''
+        Close all connections of the client.
+        '''
+        await self.__handlesystemconnector.close()
+        await self.__searcher.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    # Methods with read access to Handle Server:
+
+    async def retrieve_handle_record_json(self, handle, auth=False, indices=None, **hs_options):
+        '''
+        Retrieve a handle record from the Handle server as a complete nested
+        dict (see :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.retrieve_handle_record_json`).
+
+        :param handle: The Handle whose record to retrieve.
+        :param auth: Optional. If set to True, the handle record will be retrieved
+            from the primary server and not from cache. Defaults to False.
+        :param indices: Optional. A list of indices to retrieve. Defaults to
+            None (i.e. the entire handle record is retrieved).
+        :param hs_options: Optional. A list of key-value pairs which will be appended
+            to the URL as parameters.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :return: The handle record as a nested dict. If the handle does not
+            exist, returns None.
+        '''
+        LOGGER.debug('retrieve_handle_record_json...')
+
+        utilhandle.check_handle_syntax(handle)
+
+        # Add url parameters (see Tech Manual)
+        if auth == True:
+            hs_options['auth'] = 'true'
+
+        response = await self.__handlesystemconnector.send_handle_get_request(handle, indices, **hs_options)
+        return self.__restclient._interpret_retrieve_response(handle, response)
+
+    # Methods with write access to Handle Server:
+
+    async def register_handle_kv(self, handle, overwrite=False, **kv_pairs):
+        '''
+        Registers a new Handle with given name (see
+        :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.register_handle_kv`).
+
+        :param handle: The full name of the handle to be registered (prefix
+            and suffix)
+        :param kv_pairs: The key value pairs to be included in the record,
+            e.g. URL, CHECKSUM, ...
+        :param overwrite: Optional. If set to True, an existing handle record
+            will be overwritten. Defaults to False.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAlreadyExistsException` Only if overwrite is not set or
+            set to False.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :return: The handle name.
+        '''
+        LOGGER.debug('register_handle_kv...')
+
+        utilhandle.check_handle_syntax(handle)
+
+        # If already exists and can't be overwritten (unless the Handle
+        # Server is left to check that):
+        if overwrite == False and self.__restclient._check_existence_before_register():
+            handlerecord_json = await self.retrieve_handle_record_json(handle)
+            if handlerecord_json is not None:
+                msg = 'Could not register handle'
+                LOGGER.error('%s, as it already exists.', msg)
+                raise HandleAlreadyExistsException(handle=handle, msg=msg)
+
+        list_of_entries = self.__restclient._make_entries_for_registering_kv(handle, **kv_pairs)
+
+        op = 'registering handle'
+        resp, put_payload = await self.__handlesystemconnector.send_handle_put_request(
+            handle=handle,
+            list_of_entries=list_of_entries,
+            overwrite=overwrite,
+            op=op
+        )
+        return self.__restclient._interpret_registering_response(handle, resp, put_payload, op)
+
+    async def modify_handle_value(self, handle, ttl=None, add_if_not_exist=True, **kvpairs):
+        '''
+        Modify entries (key-value-pairs) in a handle record (see
+        :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.modify_handle_value`).
+
+        :param handle: Handle whose record is to be modified
+        :param ttl: Optional. Integer value. If ttl should be set to a
+            non-default value.
+        :param add_if_not_exist: Optional. Whether a kv pair should be added if
+            the key does not exist yet.
+        :param all other args: The key-value-pairs to be modified.
+        :return: The modified handle.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        '''
+        LOGGER.debug('modify_handle_value...')
+
+        handlerecord_json = await self.retrieve_handle_record_json(handle, auth=True)
+        new_list_of_entries, indices = self.__restclient._make_entries_for_modification(
+            handle, handlerecord_json, ttl, add_if_not_exist, **kvpairs)
+
+        if len(new_list_of_entries) == 0:
+            LOGGER.debug('modify_handle_value: There was no entries %s to be modified (handle "%s").',
+                kvpairs.keys(), handle)
+            return handle
+
+        op = 'modifying handle values'
+        resp, put_payload = await self.__handlesystemconnector.send_handle_put_request(
+            handle=handle,
+            list_of_entries=new_list_of_entries,
+            indices=indices,
+            overwrite=True,
+            op=op
+        )
+        return self.__restclient._interpret_modification_response(handle, resp, put_payload, op, kvpairs)
+
+    async def sync_handle_record(self, handle, desired, ttl=None):
+        '''
+        Bring a handle record into a desired state, writing only what
+        differs (see :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.sync_handle_record`).
+
+        :param handle: Handle whose record is to be synced.
+        :param desired: The desired state, as dict of key-value pairs or as
+            :class:`~pyhandle.handlerecord.HandleRecord`.
+        :param ttl: Optional. The ttl of the entries that are written.
+            Defaults to None (changed entries keep their ttl).
+        :return: A dict with the lists of the indices written ('modified')
+            and deleted ('deleted').
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        '''
+        LOGGER.debug('sync_handle_record...')
+
+        handlerecord_json = await self.retrieve_handle_record_json(handle, auth=True)
+        entries_to_write, indices_to_delete = self.__restclient._make_changes_for_sync(
+            handle, handlerecord_json, desired, ttl)
+
+        if len(entries_to_write) > 0:
+            op = 'syncing handle values'
+            resp, put_payload = await self.__handlesystemconnector.send_handle_put_request(
+                handle=handle,
+                list_of_entries=entries_to_write,
+                indices=[entry['index'] for entry in entries_to_write],
+                overwrite=True,
+                op=op
+            )
+            self.__restclient._interpret_modification_response(handle, resp, put_payload, op, desired)
+        if len(indices_to_delete) > 0:
+            op = 'deleting values not to be synced'
+            resp = await self.__handlesystemconnector.send_handle_delete_request(
+                handle=handle, indices=indices_to_delete, op=op)
+            self.__restclient._interpret_delete_values_response(handle, resp, op)
+
+        return {
+            'modified': [entry['index'] for entry in entries_to_write],
+            'deleted': indices_to_delete
+        }
+
+    async def delete_handle(self, handle):
+        '''
+        Delete the handle and its handle record. If the Handle is not found,
+        an Exception is raised.
+
+        :param handle: Handle to be deleted.
+        :return: The deleted handle.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        '''
+        LOGGER.debug('delete_handle...')
+
+        utilhandle.check_handle_syntax(handle)
+
+        op = 'deleting handle'
+        resp = await self.__handlesystemconnector.send_handle_delete_request(handle=handle, op=op)
+        return self.__restclient._interpret_delete_handle_response(handle, resp, op)
+
+    # No HS access:
+
+    async def search_handle(self, URL=None, prefix=None, **key_value_pairs):
+        '''
+        Search for handles containing the specified key with the specified
+        value (see :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.search_handle`).
+
+        :param URL: Optional. The URL to search for (reverse lookup).
+        :param prefix: Optional. The Handle prefix to which the search should
+            be limited to.
+        :param key_value_pairs: Optional. Several search fields and values can
+            be specified as key-value-pairs.
+        :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`
+        :return: A list of all Handles (strings) that bear the given key with
+            given value of given prefix or server.
+        '''
+        LOGGER.debug('search_handle...')
+        return await self.__searcher.search_handle(URL=URL, prefix=prefix, **key_value_pairs)
+
+    def generate_PID_name(self, prefix=None):
+        '''
+        Generate a unique random Handle name (random UUID). The Handle is not
+        registered.
+
+        :param prefix: Optional. The prefix to be used for the Handle name.
+        :return: The handle name.
+        '''
+        return self.__restclient.generate_PID_name(prefix)
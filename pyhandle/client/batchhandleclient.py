@@ -34,7 +34,7 @@ class BatchHandleClient(HandleClient):
         :param args: Optional. This includes different parameters concerning the batch file, such as the PATH.
         '''
 
-        LOGGER.debug('\n' + 60 * '*' + '\nInstantiation of BatchHandleClient\n' + 60 * '*')
+        LOGGER.debug('\n%s\nInstantiation of BatchHandleClient\n%s', 60 * '*', 60 * '*')
 
 
 
@@ -75,7 +75,7 @@ class BatchHandleClient(HandleClient):
             except Exception as exc:
                 if exc.args[0] == 17:
                     msg = 'Could not create batch file, already exists'
-                    LOGGER.error(msg + ', as it already exists.')
+                    LOGGER.error('%s, as it already exists.', msg)
                     raise BatchFileExistsException(file=self.get_batch_file_path(), msg=msg)
 
     def register_handle_batch(self, handle, location, hdl_admin_index, admin_handle, perm):
@@ -9,6 +9,7 @@ import binascii
 import codecs
 import logging
 import sys
+import time
 import uuid
 import pymysql
 
@@ -16,6 +17,8 @@ from pyhandle.clientcredentials import PIDClientCredentials
 from pyhandle.dbhsexceptions import DBHandleNotFoundException, DBHandleKeyNotFoundException, \
     DBHandleAlreadyExistsException, DBHandleKeyNotSpecifiedException
 from pyhandle.pyhandleclient import HandleClient
+from pyhandle.requeststats import REQUEST_STATS_ARGS, RequestStatistics, SUCCESS, ERROR
+from pyhandle.slowrequests import SLOW_REQUEST_ARGS, SlowRequestDetector
 
 from .. import util
 from ..util import timeutil
@@ -23,6 +26,9 @@ from ..util import timeutil
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(util.NullHandler())
 
+# The options that the DB client understands, besides the credentials:
+DB_CLIENT_ARGS = REQUEST_STATS_ARGS + SLOW_REQUEST_ARGS
+
 
 class DBHandleClient(HandleClient):
     _handle_db_connection = None
@@ -37,9 +43,21 @@ class DBHandleClient(HandleClient):
         :param db_user: username to log in as
         :param db_password: password for db_user
         :param db_name: database name
+        :param statistics: Optional. A RequestStatistics to record the
+            queries in. Defaults to a new one (see :meth:`stats`).
+        :param slow_request_threshold: Optional. The number of seconds after
+            which a query counts as slow. Slow queries are logged as warnings
+            and kept (see :meth:`get_slow_requests`). Defaults to None.
+        :param slow_request_ring_size: Optional. The number of slow queries
+            that are kept. Defaults to 100.
+        :raises: :exc:`~ValueError`: If an option is not understood by the
+            DB client.
+
+        The options can also be given in the credentials (e.g. in the JSON
+        file). Options passed as arguments take precedence.
         '''
 
-        LOGGER.debug('\n' + 60 * '*' + '\nInstantiation of DBHandleClient\n' + 60 * '*')
+        LOGGER.debug('\n%s\nInstantiation of DBHandleClient\n%s', 60 * '*', 60 * '*')
 
 
         if credentials is None:
@@ -55,6 +73,16 @@ class DBHandleClient(HandleClient):
         self.db_password = self.credentials['db_password']
         self.db_name = self.credentials['db_name']
 
+        unsupported = sorted(set(args) - set(DB_CLIENT_ARGS))
+        if len(unsupported) > 0:
+            raise ValueError('Options not supported by the DB client: '+', '.join(unsupported)+
+                             '. Supported options: '+', '.join(DB_CLIENT_ARGS))
+        config = dict((key, self.credentials[key]) for key in DB_CLIENT_ARGS
+                      if self.credentials.get(key) is not None)
+        config.update(args)
+        self.__statistics = RequestStatistics.from_args(config)
+        self.__slow_requests = SlowRequestDetector.from_args(config)
+
         try:
             self._handle_db_connection = pymysql.connect(self.db_host,
                                                          self.db_user,
@@ -81,18 +109,26 @@ class DBHandleClient(HandleClient):
 
         result = None
         self.query = query
+        start = time.monotonic()
+        phases = {}
+        outcome = ERROR
 
         try:
             with self._handle_db_cur as cursor:
                 self_handle_db_cur = self._handle_db_connection.cursor()
                 self_handle_db_cur.execute(self.query)
+                phases['execute'] = time.monotonic() - start
                 result = self_handle_db_cur.fetchall()
+                phases['fetch'] = time.monotonic() - start - phases['execute']
             self._handle_db_connection.commit()
+            outcome = SUCCESS
             LOGGER.debug('Query result %s', result)
 
         except pymysql.InternalError as error:
             code, message = error.args
             print(">>>>>>>>>>>>>", code, message)
+        finally:
+            self.__record_query(query, outcome, start, phases, result)
         return result
 
     def search_handle(self, pattern=None, limit=None, offset=None, **args):
@@ -236,18 +272,58 @@ class DBHandleClient(HandleClient):
         LOGGER.debug('Get handle, key and execute query')
 
         result = None
+        start = time.monotonic()
+        phases = {}
+        outcome = ERROR
 
         try:
             self_handle_db_cur = self._handle_db_connection.cursor()
             self_handle_db_cur.execute(query, (handle, key))
+            phases['execute'] = time.monotonic() - start
             result = self_handle_db_cur.fetchall()
+            phases['fetch'] = time.monotonic() - start - phases['execute']
+            outcome = SUCCESS
 
             LOGGER.debug('Query result %s', result)
         except pymysql.InternalError as error:
             code, message = error.args
             print(">>>>>>>>>>>>>", code, message)
+        finally:
+            self.__record_query(query, outcome, start, phases, result, handle)
         return result
 
+    def __record_query(self, query, outcome, start, phases, result, handle=None):
+        # The statement (SELECT, INSERT, ...) serves as operation:
+        op = query.split(None, 1)[0].upper() if query and query.strip() else 'QUERY'
+        latency = time.monotonic() - start
+        self.__statistics.record_request(op, outcome, latency)
+        if self.__slow_requests is not None and latency >= self.__slow_requests.threshold:
+            self.__slow_requests.capture(op, handle, query, latency, phases=phases,
+                                         error=None if outcome == SUCCESS else outcome,
+                                         response_bytes=None if result is None else len(result))
+
+    def stats(self):
+        '''
+        Return the statistics of the queries sent by this client, by
+        statement and outcome.
+
+        :return: A :class:`~pyhandle.requeststats.RequestStatistics`.
+        '''
+        return self.__statistics
+
+    def get_slow_requests(self):
+        '''
+        Return the queries that took longer than the threshold given as
+        "slow_request_threshold", the oldest first.
+
+        :return: A list of dicts (see :mod:`pyhandle.slowrequests`). For
+            queries, 'url' is the query, the phases are 'execute' and
+            'fetch', and 'response_bytes' is the number of rows.
+        '''
+        if self.__slow_requests is None:
+            return []
+        return self.__slow_requests.records()
+
     def convert_query_result_to_dict(self, query_result):
         '''
         Convert the query result (list) to dictionary
@@ -386,7 +462,7 @@ class DBHandleClient(HandleClient):
 
             if handle_exists:
                 msg = 'Could not register handle'
-                LOGGER.error(msg + ', as it already exists.')
+                LOGGER.error('%s, as it already exists.', msg)
                 raise DBHandleAlreadyExistsException(handle=handle, msg=msg)
 
         if handle_exists:
@@ -591,8 +667,7 @@ class DBHandleClient(HandleClient):
                                                                                                idx_key)
                 self.execute_query(query)
             elif add_if_not_exists:
-                LOGGER.debug('modify_handle_value: Adding entry "' + str(handle_key) + '"' + \
-                             ' to handle ' + handle)
+                LOGGER.debug('modify_handle_value: Adding entry "%s" to handle %s', handle_key, handle)
                 self.create_new_value(handle, handle_key=handle_key[0], handle_value=handle_value[0])
         else:
             msg = 'Cannot modify unexisting handle'
@@ -1,11 +1,11 @@
 from __future__ import absolute_import
 import pyhandle
-import json
 import xml.etree.ElementTree as ET
 import uuid
 import logging
 import datetime
 import copy
+import time
 import requests  # This import is needed for mocking in unit tests.
 
 from .. pyhandleclient import HandleClient
@@ -17,9 +17,20 @@ from ..handleexceptions import GenericHandleError
 from ..handleexceptions import BrokenHandleRecordException
 from ..handleexceptions import HandleAlreadyExistsException
 from ..handleexceptions import IllegalOperationException
+from ..handleexceptions import DeadlineExceededError
+from ..handleexceptions import HandleServerUnavailableError
 from ..handlesystemconnector import HandleSystemConnector
 from ..searcher import Searcher
-from .. compatibility_helper import decoded_response, set_encoding_variable
+from ..recordcache import RecordCache, NotFoundCache
+from ..ratelimiter import RateLimiter
+from ..jsoncodec import get_json_codec
+from ..requestlog import RequestLog
+from ..requeststats import RequestStatistics
+from ..hooks import HookChain
+from ..slowrequests import SlowRequestDetector
+from ..handleresponse import get_handle_response
+from ..handlerecord import HandleRecord, get_free_index, get_entry_value
+from .. compatibility_helper import set_encoding_variable
 
 # parameters for debugging
 # LOG_FILENAME = 'example.log'
@@ -90,11 +101,112 @@ class RESTHandleClient(HandleClient):
             mode. If this is specified, a private key needs to be specified too.
         :param certificate_and_key: Optional. The path to a file containing both
             certificate and private key, used for authentication in write mode.
+        :param pool_connections: Optional. The number of connection pools (one
+            per host) to keep. Defaults to 10.
+        :param pool_maxsize: Optional. The maximum number of connections kept
+            open to one host. Set it to at least the number of threads that use
+            the client concurrently. Defaults to 10.
+        :param pool_block: Optional. If True, threads wait for a free
+            connection when all pooled connections are in use, instead of
+            opening extra connections that are thrown away afterwards.
+            Defaults to False.
+        :param keep_alive: Optional. If False, connections are closed after
+            each response. Defaults to True.
+        :param tcp_keepalive: Optional. If True, TCP keep-alive probes are sent
+            on idle connections, so that connections dropped by firewalls are
+            noticed. Defaults to False.
+        :param timeout: Optional. The timeout in seconds of each request to the
+            Handle Server and to the search servlet. Either one number, or a pair
+            (connect timeout, read timeout). Defaults to (10, 60).
+        :param connect_timeout: Optional. Overrides the connect timeout.
+        :param read_timeout: Optional. Overrides the read timeout, i.e. the
+            maximum time to wait for the server between two received bytes.
+        :param max_retries: Optional. How often a request that failed
+            temporarily (HTTP 429, 502, 503, 504 or connection errors) is
+            retried. Only idempotent requests (reading, deleting, overwriting)
+            are retried. Defaults to 0 (no retries).
+        :param retry_backoff_factor: Optional. Base waiting time in seconds
+            between retries. It doubles with each retry and is randomized
+            (jitter). Defaults to 0.5.
+        :param retry_backoff_max: Optional. Maximum waiting time in seconds
+            between retries, also when the server sends "Retry-After".
+            Defaults to 30.
+        :param retry_status_codes: Optional. The HTTP status codes that are
+            retried, as a list. Defaults to [429, 502, 503, 504].
+        :param circuit_breaker_threshold: Optional. After this many
+            consecutive failures, requests fail immediately with a
+            :exc:`~pyhandle.handleexceptions.HandleServerUnavailableError`
+            instead of being sent. 0 disables this. Defaults to 0.
+        :param circuit_breaker_timeout: Optional. The number of seconds
+            requests fail immediately, before a trial request is sent to the
+            Handle Server again. Defaults to 30.
+        :param record_cache_size: Optional. If set, up to this many handle
+            records are kept in memory after reading them, so that reading
+            them again needs no request. Defaults to None (no cache).
+        :param record_cache_max_ttl: Optional. The maximum number of seconds a
+            handle record is cached. Records expire earlier if one of their
+            values has a smaller ttl. Defaults to 300.
+        :param not_found_cache_size: Optional. If set, up to this many handles
+            that do not exist are remembered, so that looking them up again
+            needs no request. Defaults to None (no cache).
+        :param not_found_cache_ttl: Optional. The number of seconds a handle
+            is remembered as not existing. Defaults to 30.
+        :param rate_limit: Optional. The maximum number of requests per second
+            sent by this client, for each kind of request (read, write, search).
+            Defaults to None (no limit).
+        :param read_rate_limit: Optional. Overrides rate_limit for reading.
+        :param write_rate_limit: Optional. Overrides rate_limit for writing
+            (PUT and DELETE).
+        :param search_rate_limit: Optional. Overrides rate_limit for searching.
+        :param rate_limit_burst: Optional. The number of requests (of each
+            kind) that may be sent at once after a pause. Defaults to one
+            second's worth.
+        :param rate_limit_group: Optional. A name. All clients in this process
+            with the same name share one rate limit.
+        :param rate_limiter: Optional. A
+            :class:`~pyhandle.ratelimiter.RateLimiter` to use, e.g. to share it
+            between clients. Overrides the other rate limit arguments.
+        :param json_codec: Optional. The JSON library used for the payloads
+            and responses: 'json' (standard library), 'orjson', or 'auto'
+            (orjson if it is installed). Defaults to 'auto'.
+        :param request_log: Optional. The name of a file to which one JSON line
+            is appended per request (operation, handle, URL, status, latency
+            and byte sizes), or a :class:`~pyhandle.requestlog.RequestLog`.
+            Defaults to None (no request log).
+        :param request_log_sample_rate: Optional. The fraction of requests
+            written to the request log, between 0 and 1. Defaults to 1.
+        :param request_log_body_bytes: Optional. The number of bytes of each
+            response body written to the request log. Defaults to 0.
+        :param statistics: Optional. A
+            :class:`~pyhandle.requeststats.RequestStatistics` to record the
+            requests in, e.g. to share it between clients. Defaults to a new
+            one (see :meth:`stats`).
+        :param request_hooks: Optional. A list of hooks that are called before
+            and after every request to the Handle Server and to the search
+            servlet, e.g. for tracing (see :mod:`pyhandle.hooks`). Defaults
+            to None.
+        :param slow_request_threshold: Optional. The number of seconds after
+            which a request counts as slow. Slow requests are logged as
+            warnings and kept (see :meth:`get_slow_requests`). Defaults to
+            None (no detection).
+        :param slow_request_ring_size: Optional. The number of slow requests
+            that are kept. Defaults to 100.
+        :param coalesce_requests: Optional. If True, threads that read the
+            same handle record (with the same options) at the same time share
+            one request to the Handle Server. Reads issued after this client
+            wrote the handle do not join requests that started before.
+            Defaults to True.
+        :param check_existence_before_register: Optional. If True, registering
+            a handle without overwrite first reads the handle to check that it
+            does not exist yet. If False, only one request is sent, and the
+            Handle Server refuses to overwrite an existing handle (which also
+            closes the race between the check and the registration).
+            Defaults to True.
         '''
 
         util.log_instantiation(LOGGER, 'RESTHandleClient', args, ['password', 'reverselookup_password'], with_date=True)
 
-        LOGGER.debug('\n' + 60 * '*' + '\nInstantiation of RESTHandleClient\n' + 60 * '*')
+        LOGGER.debug('\n%s\nInstantiation of RESTHandleClient\n%s', 60 * '*', 60 * '*')
 
         if (handle_server_url != None):
             args['handle_server_url'] = handle_server_url
@@ -103,16 +215,41 @@ class RESTHandleClient(HandleClient):
         self.__handleowner = None
         self.__HS_ADMIN_permissions = None
         self.__modify_HS_ADMIN = None
+        self.__check_existence_before_register = None
         
 
+        # One rate limiter, JSON codec, request log, statistics and hook chain for the connector and the searcher:
+        args['rate_limiter'] = RateLimiter.from_args(args)
+        args['json_codec'] = get_json_codec(args.get('json_codec'))
+        args['request_log'] = RequestLog.from_args(args)
+        args['statistics'] = RequestStatistics.from_args(args)
+        args['request_hooks'] = HookChain.from_args(args)
+        self.__statistics = args['statistics']
+        self.__slow_requests = SlowRequestDetector.from_args(args)
+        if self.__slow_requests is not None:
+            # The detector is the innermost hook, so it sees the response first:
+            hooks = () if args['request_hooks'] is None else args['request_hooks'].hooks
+            args['request_hooks'] = HookChain(hooks + (self.__slow_requests,))
+
         # Other attributes:
         self.__handlesystemconnector = HandleSystemConnector(handleclient=self, **args)
         self.__searcher = Searcher(handleclient=self, **args)
+        self.__record_cache = RecordCache.from_args(args)
+        self.__not_found_cache = NotFoundCache.from_args(args)
+        self.__single_flight = None
+        if args.get('coalesce_requests') is None or util.get_valid_bool(args['coalesce_requests']):
+            # Every caller gets its own record to modify:
+            self.__single_flight = util.SingleFlight(copy=copy.deepcopy)
+        if self.__record_cache is not None:
+            self.__statistics.add_cache('record_cache', self.__record_cache)
+        if self.__not_found_cache is not None:
+            self.__statistics.add_cache('not_found_cache', self.__not_found_cache)
 
         # Defaults:
         defaults = {
             'HS_ADMIN_permissions':'011111110011',  # default from hdl-admintool
-            'modify_HS_ADMIN': False
+            'modify_HS_ADMIN': False,
+            'check_existence_before_register': True
         }
 
 
@@ -127,25 +264,33 @@ class RESTHandleClient(HandleClient):
 
         if 'HS_ADMIN_permissions' in args.keys():
             self.__HS_ADMIN_permissions = args['HS_ADMIN_permissions']
-            LOGGER.debug(' - HS_ADMIN_permissions set to: ' + self.__HS_ADMIN_permissions)
+            LOGGER.debug(' - HS_ADMIN_permissions set to: %s', self.__HS_ADMIN_permissions)
         else:
             self.__HS_ADMIN_permissions = defaults['HS_ADMIN_permissions']
-            LOGGER.debug(' - HS_ADMIN_permissions set to default: ' + self.__HS_ADMIN_permissions)
+            LOGGER.debug(' - HS_ADMIN_permissions set to default: %s', self.__HS_ADMIN_permissions)
 
         
         if 'modify_HS_ADMIN' in args.keys():
             self.__modify_HS_ADMIN = args['modify_HS_ADMIN']
-            LOGGER.debug(' - modify_HS_ADMIN set to: ' + str(self.__modify_HS_ADMIN))
+            LOGGER.debug(' - modify_HS_ADMIN set to: %s', self.__modify_HS_ADMIN)
         else:
             self.__modify_HS_ADMIN = defaults['modify_HS_ADMIN']
-            LOGGER.debug(' - modify_HS_ADMIN set to default: ' + str(self.__modify_HS_ADMIN))
+            LOGGER.debug(' - modify_HS_ADMIN set to default: %s', self.__modify_HS_ADMIN)
+
+        if args.get('check_existence_before_register') is not None:
+            self.__check_existence_before_register = util.get_valid_bool(args['check_existence_before_register'])
+            LOGGER.debug(' - check_existence_before_register set to: %s', self.__check_existence_before_register)
+        else:
+            self.__check_existence_before_register = defaults['check_existence_before_register']
+            LOGGER.debug(' - check_existence_before_register set to default: %s',
+                self.__check_existence_before_register)
 
 
         # Handle owner: The user name to be written into HS_ADMIN.
         # Can be specified in json credentials file (optionally):
         if ('handleowner' in args.keys()) and (args['handleowner'] is not None):
             self.__handleowner = args['handleowner']
-            LOGGER.debug(' - handleowner set to: ' + self.__handleowner)
+            LOGGER.debug(' - handleowner set to: %s', self.__handleowner)
         else:
             self.__handleowner = None
             LOGGER.debug(' - handleowner: Will be set to default for each created handle separately.')
@@ -264,8 +409,12 @@ class RESTHandleClient(HandleClient):
             GET request (e.g. "&type=xyz"). Please see the Handle Tech Manual for
             possible values. To add several "?index=xyz" options, pass a list or 
             use the parameter "indices". To add several "?type=xyz" options, add
-            them as a list.
+            them as a list. The options "timeout" (seconds, one number or a
+            (connect, read) pair) and "deadline" (a point in time as returned by
+            time.time()) are not sent to the Handle Server, but limit the time
+            spent on this request.
         :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
         :return: The handle record as a nested dict. If the handle does not
             exist, returns None.
         '''
@@ -273,22 +422,83 @@ class RESTHandleClient(HandleClient):
 
         utilhandle.check_handle_syntax(handle)
 
+        # Only entire records are cached. With auth, the caches are skipped,
+        # but the fresh result is stored:
+        use_cache = (
+            indices is None and
+            set(hs_options.keys()) <= set(['timeout', 'deadline'])
+        )
+        if use_cache and not auth:
+            if self.__record_cache is not None:
+                handlerecord_json = self.__record_cache.get(handle)
+                if handlerecord_json is not None:
+                    return handlerecord_json
+            if self.__not_found_cache is not None and self.__not_found_cache.contains(handle):
+                return None
+
         # Add url parameters (see Tech Manual)
         if auth == True:
             hs_options['auth'] = 'true'
-        
-        if len(hs_options)>0:
-            response = self.__send_handle_get_request(handle, indices, **hs_options)
-        else:
-            response = self.__send_handle_get_request(handle, indices)
-        
-        response_content = decoded_response(response)
-                    
+
+        def retrieve():
+            # If the handle is written while the GET is running, its result
+            # may be outdated and is not cached:
+            if use_cache and self.__record_cache is not None:
+                record_generation = self.__record_cache.generation()
+            if use_cache and self.__not_found_cache is not None:
+                not_found_generation = self.__not_found_cache.generation()
+
+            if len(hs_options)>0:
+                response = self.__send_handle_get_request(handle, indices, **hs_options)
+            else:
+                response = self.__send_handle_get_request(handle, indices)
+
+            handlerecord_json = self._interpret_retrieve_response(handle, response)
+            if use_cache:
+                if handlerecord_json is None:
+                    if self.__not_found_cache is not None:
+                        self.__not_found_cache.add(handle, not_found_generation)
+                elif self.__record_cache is not None:
+                    self.__record_cache.put(handle, handlerecord_json, record_generation)
+            return handlerecord_json
+
+        if self.__single_flight is None:
+            return retrieve()
+        return self.__retrieve_coalesced(handle, indices, hs_options, retrieve)
+
+    def __retrieve_coalesced(self, handle, indices, hs_options, retrieve):
+        # Concurrent requests for the same URL share one request. The
+        # timeout and deadline are not part of the URL:
+        url_options = dict((k, v) for k, v in hs_options.items() if k not in ('timeout', 'deadline'))
+        url = self.__handlesystemconnector.make_handle_URL(handle, indices, **url_options)
+        wait = None
+        if hs_options.get('deadline') is not None:
+            wait = max(0, hs_options['deadline'] - time.time())
+        try:
+            handlerecord_json, _ = self.__single_flight.do((handle, url), retrieve, wait)
+        except TimeoutError:
+            raise DeadlineExceededError(handle=handle, operation='retrieving handle record')
+        return handlerecord_json
+
+    def _interpret_retrieve_response(self, handle, response):
+        '''
+        Turn the Handle Server's response to a GET request into a handle
+            record. This is shared by the synchronous and the asynchronous
+            client.
+
+        :param handle: The handle that was requested.
+        :param response: The server's response.
+        :raises: :exc:`~pyhandle.handleexceptions.GenericHandleError`
+        :return: The handle record as a nested dict, or None if the handle
+            does not exist.
+        '''
+        response = get_handle_response(response)
+
         if hsresponses.handle_not_found(response):
             return None
         elif hsresponses.does_handle_exist(response):
-         
-            handlerecord_json = json.loads(response_content)
+
+            handlerecord_json = response.body
 
             if not handlerecord_json['handle'] == handle.lstrip('hdl:').lstrip('doi:'):
                 raise GenericHandleError(
@@ -299,7 +509,7 @@ class RESTHandleClient(HandleClient):
                 )
             return handlerecord_json
         elif hsresponses.is_handle_empty(response):
-            handlerecord_json = json.loads(response_content)
+            handlerecord_json = response.body
             return handlerecord_json
         else:
             raise GenericHandleError(
@@ -307,8 +517,8 @@ class RESTHandleClient(HandleClient):
                 handle=handle,
                 response=response
             )
-           
-    def retrieve_handle_record(self, handle, handlerecord_json=None, auth=False, indices=None, **hs_options):
+
+    def retrieve_handle_record(self, handle, handlerecord_json=None, auth=False, indices=None, types=None, **hs_options):
         '''
         Retrieve a handle record from the Handle server as a dict. If there
         is several entries of the same type, only the first one is
@@ -317,7 +527,11 @@ class RESTHandleClient(HandleClient):
 
         :param handle: The handle whose record to retrieve.
         :param handlerecord_json: Optional. If the handlerecord has already
-            been retrieved from the server, it can be reused.
+            been retrieved from the server, it can be reused (as dict or as
+            :class:`~pyhandle.handlerecord.HandleRecord`).
+        :param types: Optional. A list of types (keys) to retrieve. Only
+            entries of these types are requested from the Handle Server and
+            returned. Defaults to None (all types).
         :param auth: Optional. If set to True, the handle record will be retrieved
             from the primary server and not from cache, so changes from the last
             max. 24 hours or so will be included. Defaults to False.
@@ -337,17 +551,10 @@ class RESTHandleClient(HandleClient):
         '''
         LOGGER.debug('retrieve_handle_record...')
 
-        handlerecord_json = self.__get_handle_record_if_necessary(handle, handlerecord_json, auth, indices, **hs_options)
-        if handlerecord_json is None:
+        record = self.__get_record_if_necessary(handle, handlerecord_json, auth, indices, types, **hs_options)
+        if record is None:
             return None  # Instead of HandleNotFoundException!
-        list_of_entries = handlerecord_json['values']
-
-        record_as_dict = {}
-        for entry in list_of_entries:
-            key = entry['type']
-            if not key in record_as_dict.keys():
-                record_as_dict[key] = str(entry['data']['value'])
-        return record_as_dict
+        return record.to_dict(types)
 
     def get_value_from_handle(self, handle, key, handlerecord_json=None, auth=False, indices=None, **hs_options):
         '''
@@ -357,6 +564,9 @@ class RESTHandleClient(HandleClient):
 
         :param handle: The handle to take the value from.
         :param key: The key.
+        :param handlerecord_json: Optional. If the handlerecord has already
+            been retrieved from the server, it can be reused (as dict or as
+            :class:`~pyhandle.handlerecord.HandleRecord`).
         :param auth: Optional. If set to True, the handle record will be retrieved
             from the primary server and not from cache, so changes from the last
             max. 24 hours or so will be included. Defaults to False.
@@ -376,31 +586,136 @@ class RESTHandleClient(HandleClient):
         '''
         LOGGER.debug('get_value_from_handle...')
 
-        handlerecord_json = self.__get_handle_record_if_necessary(handle, handlerecord_json, auth, indices, **hs_options)
-        if handlerecord_json is None:
+        # Only the entries of this type are requested from the Handle Server:
+        record = self.__get_record_if_necessary(handle, handlerecord_json, auth, indices, [key], **hs_options)
+        if record is None:
             raise HandleNotFoundException(handle=handle)
-        list_of_entries = handlerecord_json['values']
+        values = record.get_all(key)
+        if len(values) == 0:
+            return None
+        if len(values) > 1:
+            LOGGER.debug('get_value_from_handle: The handle %s contains several entries of type "%s".'
+                         ' Only the first one is returned.', handle, key)
+        return values[0]
 
-        # Instead of this filtering, we could simply pass "?type=key" to the Handle Server!!
-        # TODO: Reimplement!
+    def retrieve_handle_records(self, handles, max_workers=10, max_in_flight=None, auth=False, total_timeout=None):
+        '''
+        Retrieve many handle records concurrently, as nested dicts (like
+        :meth:`~pyhandle.handleclient.RESTHandleClient.retrieve_handle_record_json`).
 
-        indices = [] # Why indices? Why not just grab the value!
-        for i in range(len(list_of_entries)):
-            if list_of_entries[i]['type'] == key:
-                indices.append(i)
+        The requests are sent by a pool of threads that share this client's
+        HTTP session (and thus its connection pool). The handles are read
+        from the iterable lazily, so it may be arbitrarily long, e.g. a
+        generator reading handles from a file.
+
+        Example call:
+
+            .. code:: python
+
+                for handle, record, error in client.retrieve_handle_records(handles, max_workers=20):
+                    if error is not None:
+                        ...
+
+        :param handles: An iterable of handles.
+        :param max_workers: Optional. Number of requests sent in parallel.
+            Defaults to 10.
+        :param max_in_flight: Optional. Maximum number of handles that are
+            being processed or waiting to be yielded at the same time.
+            Defaults to twice max_workers.
+        :param auth: Optional. If set to True, the handle records will be
+            retrieved from the primary server and not from cache. Defaults
+            to False.
+        :param total_timeout: Optional. The number of seconds the whole
+            operation may take, counted from this call. The timeouts of the
+            single requests are shortened to end in time. When the time is
+            up, no more handles are read from the iterable, and the handles
+            still pending are yielded with a
+            :exc:`~pyhandle.handleexceptions.DeadlineExceededError`.
+            Defaults to None (no limit).
+        :return: A generator of tuples (handle, record, error), in the order
+            in which the requests complete. The record is None if the
+            handle does not exist or if an error occurred. The error is the
+            exception raised while retrieving this handle (e.g. a
+            :exc:`~pyhandle.handleexceptions.HandleSyntaxError`), or None.
+        '''
+        LOGGER.debug('retrieve_handle_records...')
+
+        op = 'retrieving handle records'
+        deadline = None
+        hs_options = {}
+        if total_timeout is not None:
+            deadline = time.time() + total_timeout
+            hs_options['deadline'] = deadline
+
+        def retrieve(handle):
+            return self.retrieve_handle_record_json(handle, auth, **hs_options)
+
+        def deadline_error(handle):
+            return DeadlineExceededError(handle=handle, operation=op)
+
+        return util.bounded_concurrent_map(retrieve, handles, max_workers, max_in_flight,
+                                           deadline, deadline_error)
 
-        if len(indices) == 0:
-            return None
-        else:
-            if len(indices) > 1:
-                LOGGER.debug('get_value_from_handle: The handle ' + handle + \
-                    ' contains several entries of type "' + key + \
-                    '". Only the first one is returned.')
-            return list_of_entries[indices[0]]['data']['value']
 
-    
     # Methods with write access to Handle Server:
 
+    def register_handles(self, items, overwrite=False, max_workers=10, max_in_flight=None):
+        '''
+        Register many handles concurrently. Every item is registered like
+        with :meth:`~pyhandle.handleclient.RESTHandleClient.register_handle_kv`
+        (if it contains key-value pairs) or with
+        :meth:`~pyhandle.handleclient.RESTHandleClient.register_handle_json`
+        (if it contains a list of entries).
+
+        The requests are sent by a pool of threads that share this client's
+        HTTP session (and thus its connection pool). The items are read from
+        the iterable lazily, so it may be arbitrarily long, e.g. a generator
+        reading handles from a file. A failing item does not abort the
+        others.
+
+        *Note:* To send only one request per handle, instantiate the client
+        with check_existence_before_register=False.
+
+        Example call:
+
+            .. code:: python
+
+                items = ((prefix+'/'+suffix, {'URL': url}) for suffix, url in ...)
+                for handle, registered, error in client.register_handles(items, max_workers=20):
+                    if error is not None:
+                        ...
+
+        :param items: An iterable of tuples (handle, kv_pairs), where kv_pairs
+            is either a dict of key-value pairs or a list of entries.
+        :param overwrite: Optional. If set to True, existing handle records
+            will be overwritten. Defaults to False.
+        :param max_workers: Optional. Number of requests sent in parallel.
+            Defaults to 10.
+        :param max_in_flight: Optional. Maximum number of items that are
+            being processed or waiting to be yielded at the same time.
+            Defaults to twice max_workers.
+        :return: A generator of tuples (handle, registered, error), in the
+            order in which the requests complete. "registered" is the
+            registered handle name, or None if an error occurred. The error
+            is the exception raised while registering this handle (e.g. a
+            :exc:`~pyhandle.handleexceptions.HandleAlreadyExistsException`),
+            or None.
+        '''
+        LOGGER.debug('register_handles...')
+
+        def register(item):
+            handle, content = item
+            if isinstance(content, dict):
+                return self.register_handle_kv(handle, overwrite, **content)
+            return self.register_handle_json(handle, content, overwrite)
+
+        results = util.bounded_concurrent_map(register, items, max_workers, max_in_flight)
+        for item, registered, error in results:
+            # Malformed items are reported as they are:
+            if isinstance(item, (tuple, list)) and len(item) > 0:
+                item = item[0]
+            yield item, registered, error
+
     def generate_and_register_handle(self, prefix, location, checksum=None, overwrite=False, **extratypes):
         '''
         Register a new Handle with a unique random name (random UUID).
@@ -440,25 +755,25 @@ class RESTHandleClient(HandleClient):
         return handle
 
 
-    def modify_or_add_handle_value(self, handle, ttl=None, **kvpairs):
+    def modify_or_add_handle_value(self, handle, ttl=None, handlerecord_json=None, **kvpairs):
         add_if_not_exist = True
         overwrite = True
-        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, **kvpairs)
+        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, handlerecord_json, **kvpairs)
 
 
-    def modify_handle_value_not_add(self, handle, ttl=None, **kvpairs):
+    def modify_handle_value_not_add(self, handle, ttl=None, handlerecord_json=None, **kvpairs):
         add_if_not_exist = False
         overwrite = True
-        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, **kvpairs)
+        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, handlerecord_json, **kvpairs)
 
 
-    def add_handle_value(self, handle, ttl=None, **kvpairs):
+    def add_handle_value(self, handle, ttl=None, handlerecord_json=None, **kvpairs):
         add_if_not_exist = True
         overwrite = False
-        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, **kvpairs)
+        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, handlerecord_json, **kvpairs)
 
 
-    def modify_handle_value(self, handle, ttl=None, add_if_not_exist=True, **kvpairs):
+    def modify_handle_value(self, handle, ttl=None, add_if_not_exist=True, handlerecord_json=None, **kvpairs):
         '''
         Modify entries (key-value-pairs) in a handle record. If the key
         does not exist yet, it is created.
@@ -471,6 +786,11 @@ class RESTHandleClient(HandleClient):
             non-default value.
         :param add_if_not_exist: Optional. Whether a kv pair should be added if
             the key does not exist yet.
+        :param handlerecord_json: Optional. The current handle record, if the
+            caller has it already. It is used to find the indices of the
+            entries, so that only one request (the PUT) is sent. If the record
+            is outdated, entries may be written to wrong indices. Defaults to
+            None (the record is read from the Handle Server first).
         :param all other args: The user can specify several key-value-pairs.
             These will be the handle value types and values that will be
             modified. The keys are the names or the handle value types (e.g.
@@ -485,20 +805,56 @@ class RESTHandleClient(HandleClient):
         '''
         LOGGER.debug('modify_handle_value...')
         overwrite = True
-        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, **kvpairs)
+        return self.__handle_modification(handle, ttl, add_if_not_exist, overwrite, handlerecord_json, **kvpairs)
 
 
-    def __handle_modification(self, handle, ttl=None, add_if_not_exist=True, overwrite=True, **kvpairs):
+    def __handle_modification(self, handle, ttl=None, add_if_not_exist=True, overwrite=True, handlerecord_json=None, **kvpairs):
 
         # Read handle record (the primary one with auth=True,
         # because we'll modify the primary one!)
         # But we're talking to the primary anyway, as we're in read-write mode.
         auth = True # makes no difference!
-        handlerecord_json = self.retrieve_handle_record_json(handle, auth)
+        handlerecord_json = self.__get_handle_record_for_writing(handle, handlerecord_json, auth)
+        new_list_of_entries, indices = self._make_entries_for_modification(
+            handle, handlerecord_json, ttl, add_if_not_exist, **kvpairs)
+
+        # append to the old record:
+        if len(new_list_of_entries) == 0:
+            LOGGER.debug('modify_handle_value: There was no entries %s to be modified (handle "%s").'
+                         ' To add them, set add_if_not_exist = True', kvpairs.keys(), handle)
+            return handle
+        else:
+            op = 'modifying handle values'
+            resp, put_payload = self.__send_handle_put_request(
+                handle,
+                new_list_of_entries,
+                indices=indices,
+                overwrite=overwrite,
+                op=op)
+            return self._interpret_modification_response(handle, resp, put_payload, op, kvpairs)
+
+    def _make_entries_for_modification(self, handle, handlerecord_json, ttl=None, add_if_not_exist=True, **kvpairs):
+        '''
+        Find out which entries have to be sent to the Handle Server to
+            modify (or add) the given key-value pairs in an existing record.
+
+        :param handle: The handle whose record is modified.
+        :param handlerecord_json: The current record, as retrieved from the
+            Handle Server. It is not modified.
+        :param ttl: Optional. The ttl of newly added entries.
+        :param add_if_not_exist: Optional. Whether a kv pair should be added
+            if the key does not exist yet.
+        :param kvpairs: The key-value pairs to be modified/added.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        :raises: :exc:`~pyhandle.handleexceptions.BrokenHandleRecordException`
+        :return: A tuple of the entries to send and their indices. Both lists
+            are empty if nothing needs to be changed.
+        '''
         if handlerecord_json is None:
             msg = 'Cannot modify unexisting handle'
             raise HandleNotFoundException(handle=handle, msg=msg)
-        list_of_existing_entries = handlerecord_json['values']
+        record = HandleRecord(handlerecord_json)
 
         # HS_ADMIN
         if 'HS_ADMIN' in kvpairs.keys() and not self.__modify_HS_ADMIN:
@@ -514,98 +870,273 @@ class RESTHandleClient(HandleClient):
         # the Handle Server as payload.
         new_list_of_entries = []
 
-        # Existing and new/modified entries will be in this list, which is
-        # used/needed for making up new indexes for new entries.
-        # I guess we don't just use the existing list because we iterate through it.
-        list_of_old_and_new_entries = list_of_existing_entries[:]
+        # The indices of the existing and the new entries, which are needed
+        # for making up new indexes for new entries:
+        used_indices = record.used_indices()
 
         # Iterate over all kv pairs that are to be modified/added:
-        nothingchanged = True
         for key, newval in kvpairs.items():
-            
+
             # Check if that key already exists in the record:
-            changed = False
-            for i in range(len(list_of_existing_entries)):
-                current_entry = list_of_existing_entries[i]
-                if current_entry['type'] == key:
-
-                    # If it does, modify it:
-                    if not changed:
-                        current_entry['data'] = newval
-                        current_entry.pop('timestamp')  # will be ignored anyway
-                        if key == 'HS_ADMIN':
-                            newval['permissions'] = self.__HS_ADMIN_permissions
-                            current_entry.pop('timestamp')  # will be ignored anyway
-                            current_entry['data'] = {
-                                'format':'admin',
-                                'value':newval
-                            }
-                            LOGGER.debug('Modified' + \
-                                ' "HS_ADMIN" of handle ' + handle)
-                        changed = True
-                        nothingchanged = False
-                        new_list_of_entries.append(current_entry)
-                        list_of_old_and_new_entries.append(current_entry)
-                    else:
-                        msg = 'There is several entries of type "' + key + '".' + \
-                            ' This can lead to unexpected behaviour.' + \
-                            ' Please clean up before modifying the record.'
-                        raise BrokenHandleRecordException(handle=handle, msg=msg)
+            existing_entries = record.get_entries(key)
+            if len(existing_entries) > 1:
+                msg = 'There is several entries of type "' + key + '".' + \
+                    ' This can lead to unexpected behaviour.' + \
+                    ' Please clean up before modifying the record.'
+                raise BrokenHandleRecordException(handle=handle, msg=msg)
+
+            # If it does, modify a copy of it (without the timestamp, which
+            # will be ignored anyway):
+            if len(existing_entries) == 1:
+                modified_entry = dict((name, value) for name, value in existing_entries[0].items()
+                                      if name != 'timestamp')
+                modified_entry['data'] = newval
+                if key == 'HS_ADMIN':
+                    newval['permissions'] = self.__HS_ADMIN_permissions
+                    modified_entry['data'] = {
+                        'format':'admin',
+                        'value':newval
+                    }
+                    LOGGER.debug('Modified "HS_ADMIN" of handle %s', handle)
+                new_list_of_entries.append(modified_entry)
 
             # If the entry doesn't exist yet, add it (if you're allowed to!).
-            if not changed:
+            else:
                 if add_if_not_exist:
-                    LOGGER.debug('modify_handle_value: Adding entry "' + key + '"' + \
-                        ' to handle ' + handle)
-                    index = self.__make_another_index(list_of_old_and_new_entries)
+                    LOGGER.debug('modify_handle_value: Adding entry "%s" to handle %s', key, handle)
+                    index = get_free_index(used_indices)
                     entry_to_add = self.__create_entry(key, newval, index, ttl)
                     new_list_of_entries.append(entry_to_add)
-                    list_of_old_and_new_entries.append(entry_to_add)
-                    changed = True
-                    nothingchanged = False
+                    used_indices.add(index)
                 else:
-                    LOGGER.debug('modify_handle_value: Key "'+key+'" does not exist,' + \
-                        ' but we\'re not allowed to add it to handle "'+handle+'".')
+                    LOGGER.debug('modify_handle_value: Key "%s" does not exist, but we\'re not allowed'
+                                 ' to add it to handle "%s".', key, handle)
 
         # Add the indices
         indices = []
         for i in range(len(new_list_of_entries)):
             indices.append(new_list_of_entries[i]['index'])
 
-        # append to the old record:
-        if nothingchanged:
-            LOGGER.debug('modify_handle_value: There was no entries ' + \
-                str(kvpairs.keys()) + ' to be modified (handle "' + handle + '").' + \
-                ' To add them, set add_if_not_exist = True')
+        return new_list_of_entries, indices
+
+    def _interpret_modification_response(self, handle, resp, put_payload, op, kvpairs):
+        '''
+        Check the Handle Server's response to a PUT request that modifies
+            handle values.
+
+        :raises: :exc:`~pyhandle.handleexceptions.GenericHandleError`
+        :return: The modified handle.
+        '''
+        resp = get_handle_response(resp)
+        if hsresponses.handle_success(resp):
+            LOGGER.info('Handle modified: %s', handle)
         else:
-            op = 'modifying handle values'
+            msg = 'Values: ' + str(kvpairs)
+            raise GenericHandleError(
+                operation=op,
+                handle=handle,
+                response=resp,
+                msg=msg,
+                payload=put_payload
+            )
+
+        return resp.body['handle']
+
+    def sync_handle_record(self, handle, desired, ttl=None):
+        '''
+        Bring a handle record into a desired state, writing only what
+        differs: One GET request reads the record, then one PUT request
+        writes the new and changed entries and one DELETE request removes
+        the entries that are not desired. If the record is up to date,
+        nothing is written.
+
+        Entries are compared by type and by their value as string (the
+        form returned by :meth:`retrieve_handle_record`), not by format or
+        ttl, so that the result of :meth:`retrieve_handle_record` is up
+        to date. Entries of the Handle System's own types (HS_ADMIN,
+        HS_VLIST, ...) are only changed or deleted if their type is part of
+        the desired state.
+
+        :param handle: Handle whose record is to be synced.
+        :param desired: The desired state, either as dict of key-value pairs
+            (like the result of :meth:`retrieve_handle_record`), where every
+            key has one entry and existing entries keep their indices, or as
+            :class:`~pyhandle.handlerecord.HandleRecord`, whose entries are
+            compared index by index.
+        :param ttl: Optional. The ttl of the entries that are written.
+            Defaults to None (changed entries keep their ttl).
+        :return: A dict with the lists of the indices written ('modified')
+            and deleted ('deleted').
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        '''
+        LOGGER.debug('sync_handle_record...')
+
+        handlerecord_json = self.retrieve_handle_record_json(handle, auth=True)
+        entries_to_write, indices_to_delete = self._make_changes_for_sync(handle, handlerecord_json, desired, ttl)
+
+        if len(entries_to_write) > 0:
+            op = 'syncing handle values'
             resp, put_payload = self.__send_handle_put_request(
                 handle,
-                new_list_of_entries,
-                indices=indices,
-                overwrite=overwrite,
+                entries_to_write,
+                indices=[entry['index'] for entry in entries_to_write],
+                overwrite=True,
                 op=op)
-            if hsresponses.handle_success(resp):
-                LOGGER.info('Handle modified: ' + handle)
-            else:
-                msg = 'Values: ' + str(kvpairs)
-                raise GenericHandleError(
-                    operation=op,
-                    handle=handle,
-                    response=resp,
+            self._interpret_modification_response(handle, resp, put_payload, op, desired)
+        if len(indices_to_delete) > 0:
+            op = 'deleting values not to be synced'
+            resp = self.__send_handle_delete_request(handle, indices=indices_to_delete, op=op)
+            self._interpret_delete_values_response(handle, resp, op)
+        if len(entries_to_write) == 0 and len(indices_to_delete) == 0:
+            LOGGER.debug('sync_handle_record: Handle %s is up to date.', handle)
+
+        return {
+            'modified': [entry['index'] for entry in entries_to_write],
+            'deleted': indices_to_delete
+        }
+
+    def _make_changes_for_sync(self, handle, handlerecord_json, desired, ttl=None):
+        '''
+        Compare a handle record to its desired state (see
+            :meth:`sync_handle_record`).
+
+        :param handle: The handle.
+        :param handlerecord_json: The current record, as retrieved from the
+            Handle Server.
+        :param desired: The desired state, as dict of key-value pairs or as
+            HandleRecord.
+        :param ttl: Optional. The ttl of the entries that are written.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        :return: A tuple of the entries to write and of the indices to
+            delete. Both lists are empty if the record is up to date.
+        '''
+        if handlerecord_json is None:
+            msg = 'Cannot sync unexisting handle'
+            raise HandleNotFoundException(handle=handle, msg=msg)
+        current = HandleRecord(handlerecord_json)
+
+        if isinstance(desired, HandleRecord):
+            desired_entries = desired.values
+        else:
+            # Each key keeps the index of an existing entry, preferably one
+            # that has the desired value already:
+            desired_entries = []
+            used_indices = current.used_indices()
+            for key, value in desired.items():
+                existing_entries = current.get_entries(key)
+                unchanged = [entry for entry in existing_entries
+                             if str(get_entry_value(entry)) == str(value)]
+                if len(unchanged) > 0:
+                    index = unchanged[0]['index']
+                elif len(existing_entries) > 0:
+                    index = existing_entries[0]['index']
+                else:
+                    index = get_free_index(used_indices, url=key == 'URL', hs_admin=key == 'HS_ADMIN')
+                    used_indices.add(index)
+                data = {'format': 'admin', 'value': value} if key == 'HS_ADMIN' else value
+                desired_entries.append({'index': index, 'type': key, 'data': data})
+
+        entries_to_write = []
+        desired_indices = set()
+        for entry in desired_entries:
+            desired_indices.add(int(entry['index']))
+            current_entry = current.by_index(entry['index'])
+            if (current_entry is None or current_entry['type'] != entry['type'] or
+                    str(get_entry_value(current_entry)) != str(get_entry_value(entry))):
+                if entry['type'] == 'HS_ADMIN' and not isinstance(get_entry_value(entry), dict):
+                    msg = 'HS_ADMIN can only be changed to a dict value, not '+repr(get_entry_value(entry))
+                    raise IllegalOperationException(
+                        msg=msg,
+                        operation='syncing HS_ADMIN',
+                        handle=handle
+                    )
+                entry = {'index': entry['index'], 'type': entry['type'], 'data': entry['data']}
+                if ttl is not None:
+                    entry['ttl'] = ttl
+                elif current_entry is not None and 'ttl' in current_entry:
+                    entry['ttl'] = current_entry['ttl']
+                entries_to_write.append(entry)
+
+        desired_types = set(entry['type'] for entry in desired_entries)
+        indices_to_delete = []
+        for entry in current:
+            if int(entry['index']) in desired_indices:
+                continue
+            if entry['type'].startswith('HS_') and entry['type'] not in desired_types:
+                continue
+            indices_to_delete.append(entry['index'])
+
+        # HS_ADMIN
+        if not self.__modify_HS_ADMIN:
+            changed_types = set(entry['type'] for entry in entries_to_write)
+            changed_types.update(current.by_index(index)['type'] for index in indices_to_delete)
+            if 'HS_ADMIN' in changed_types:
+                msg = 'You may not modify HS_ADMIN'
+                raise IllegalOperationException(
                     msg=msg,
-                    payload=put_payload
+                    operation='syncing HS_ADMIN',
+                    handle=handle
                 )
-                
-        return json.loads(decoded_response(resp))['handle']
 
-    def delete_handle_value(self, handle, key):
+        return entries_to_write, indices_to_delete
+
+    def modify_handle_json(self, handle, list_of_entries):
+        '''
+        Write entries with known indices to a handle record, with one PUT
+        request and without reading the record first. Entries at these
+        indices are overwritten, other entries are left untouched.
+
+        :param handle: Handle whose record is to be modified.
+        :param list_of_entries: The entries to write. Every entry needs an
+            index, e.g. {'index':index, 'type':entrytype, 'data':data}.
+            Optionally you can add 'ttl'.
+        :return: The modified handle.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        '''
+        LOGGER.debug('modify_handle_json...')
+
+        utilhandle.check_handle_syntax(handle)
+
+        op = 'modifying handle values'
+        indices = []
+        for entry in list_of_entries:
+            if entry.get('index') is None:
+                msg = 'Every entry needs an index: ' + str(entry)
+                raise IllegalOperationException(msg=msg, operation=op, handle=handle)
+            if entry.get('type') == 'HS_ADMIN' and not self.__modify_HS_ADMIN:
+                msg = 'You may not modify HS_ADMIN'
+                raise IllegalOperationException(msg=msg, operation='modifying HS_ADMIN', handle=handle)
+            indices.append(entry['index'])
+        if len(indices) == 0:
+            LOGGER.debug('modify_handle_json: No entries to be modified (handle "%s").', handle)
+            return handle
+
+        resp, put_payload = self.__send_handle_put_request(
+            handle,
+            list_of_entries,
+            indices=indices,
+            overwrite=True,
+            op=op)
+        return self._interpret_modification_response(
+            handle, resp, put_payload, op, dict((entry['type'], entry['data']) for entry in list_of_entries))
+
+    def delete_handle_value(self, handle, key, handlerecord_json=None):
         '''
         Delete a key-value pair from a handle record. If the key exists more
         than once, all key-value pairs with this key are deleted.
 
         :param handle: Handle from whose record the entry should be deleted.
         :param key: Key to be deleted. Also accepts a list of keys.
+        :param handlerecord_json: Optional. The current handle record, if the
+            caller has it already. It is used to find the indices of the
+            entries, so that only one request (the DELETE) is sent. Defaults
+            to None (the record is read from the Handle Server first).
         :return: The deleted handle.
         :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
         :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
@@ -617,11 +1148,11 @@ class RESTHandleClient(HandleClient):
         # because we'll modify the primary one!)
         # But we're talking to the primary anyway, as we're in read-write mode.
         auth = True # makes no difference!
-        handlerecord_json = self.retrieve_handle_record_json(handle, auth)
+        handlerecord_json = self.__get_handle_record_for_writing(handle, handlerecord_json, auth)
         if handlerecord_json is None:
             msg = 'Cannot modify unexisting handle'
             raise HandleNotFoundException(handle=handle, msg=msg)
-        list_of_entries = handlerecord_json['values']
+        record = HandleRecord(handlerecord_json)
 
 
         # find indices to delete:
@@ -640,32 +1171,59 @@ class RESTHandleClient(HandleClient):
                 raise IllegalOperationException(operation=op, handle=handle)
 
             if key not in keys_done:
-                indices_onekey = self.get_handlerecord_indices_for_key(key, list_of_entries)
+                indices_onekey = record.indices(key)
                 indices = indices + indices_onekey
                 keys_done.append(key)
 
         # Important: If key not found, do not continue, as deleting without indices would delete the entire handle!!
         if not len(indices) > 0:
-            LOGGER.debug('delete_handle_value: No values for key(s) ' + str(keys))
+            LOGGER.debug('delete_handle_value: No values for key(s) %s', keys)
             return None
         else:
 
             # delete and process response:
             op = 'deleting "' + str(keys) + '"'
             resp = self.__send_handle_delete_request(handle, indices=indices, op=op)
+            return self._interpret_delete_values_response(handle, resp, op)
 
-            if hsresponses.handle_success(resp):
-                LOGGER.debug("delete_handle_value: Deleted handle values " + str(keys) + "of handle " + handle)
-                return json.loads(decoded_response(resp))['handle']
+    def delete_handle_value_by_index(self, handle, indices):
+        '''
+        Delete the entries with the given indices from a handle record, with
+        one DELETE request and without reading the record first.
 
-            elif hsresponses.values_not_found(resp):
-                pass
-            else:
-                raise GenericHandleError(
-                    operation=op,
-                    handle=handle,
-                    response=resp
-                )
+        :param handle: Handle from whose record the entries should be deleted.
+        :param indices: A list of indices (integers or strings). It must not
+            be empty, as deleting without indices deletes the entire handle.
+        :return: The handle, or None if none of the entries existed.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        :raises: :exc:`~pyhandle.handleexceptions.IllegalOperationException`
+        :raises: :exc:`~pyhandle.handleexceptions.HandleSyntaxError`
+        '''
+        LOGGER.debug('delete_handle_value_by_index...')
+
+        utilhandle.check_handle_syntax(handle)
+
+        op = 'deleting indices ' + str(indices)
+        if indices is None or len(indices) == 0:
+            msg = 'No indices given. To delete the entire handle, use "delete_handle()".'
+            raise IllegalOperationException(msg=msg, operation=op, handle=handle)
+
+        resp = self.__send_handle_delete_request(handle, indices=indices, op=op)
+        return self._interpret_delete_values_response(handle, resp, op)
+
+    def _interpret_delete_values_response(self, handle, resp, op):
+        resp = get_handle_response(resp)
+        if hsresponses.handle_success(resp):
+            LOGGER.debug('Deleted handle values (%s) of handle %s', op, handle)
+            return resp.body['handle']
+        elif hsresponses.values_not_found(resp):
+            return None
+        else:
+            raise GenericHandleError(
+                operation=op,
+                handle=handle,
+                response=resp
+            )
 
     def delete_handle(self, handle, *other):
         '''Delete the handle and its handle record. If the Handle is not found, an Exception is raised.
@@ -694,11 +1252,23 @@ class RESTHandleClient(HandleClient):
 
         op = 'deleting handle'
         resp = self.__send_handle_delete_request(handle, op=op)
-        handle = json.loads(decoded_response(resp))['handle']
+        return self._interpret_delete_handle_response(handle, resp, op)
+
+    def _interpret_delete_handle_response(self, handle, resp, op):
+        '''
+        Check the Handle Server's response to a DELETE request that deletes
+            an entire handle.
+
+        :raises: :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+        :raises: :exc:`~pyhandle.handleexceptions.GenericHandleError`
+        :return: The deleted handle.
+        '''
+        resp = get_handle_response(resp)
+        handle = resp.body['handle']
 
         if hsresponses.handle_success(resp):
             # Response: {'handle': '21.14106/TESTTESTTEST', 'responseCode': 1}   with HTTP 200
-            LOGGER.info('Handle ' + handle + ' deleted.')
+            LOGGER.info('Handle %s deleted.', handle)
             return handle
         elif hsresponses.handle_not_found(resp):
             # Response: {'handle': '21.14106/TESTTESTTEST', 'responseCode': 100} with HTTP 404
@@ -709,6 +1279,146 @@ class RESTHandleClient(HandleClient):
         else:
             raise GenericHandleError(op=op, handle=handle, response=resp)
 
+    def delete_handles(self, handles, max_workers=10, max_in_flight=None, retries=0):
+        '''
+        Delete many handles concurrently (like
+        :meth:`~pyhandle.handleclient.RESTHandleClient.delete_handle`).
+
+        The requests are sent by a pool of threads that share this client's
+        HTTP session. The handles are read from the iterable lazily, so it
+        may be arbitrarily long. A failing handle does not abort the others.
+
+        Example call:
+
+            .. code:: python
+
+                results = client.delete_handles(handles, max_workers=20)
+                for handle, deleted, error in results:
+                    ...
+                print(results.summary) # {'deleted': 998, 'not_found': 1, 'failed': 1}
+
+        :param handles: An iterable of handles.
+        :param max_workers: Optional. Number of requests sent in parallel.
+            Defaults to 10.
+        :param max_in_flight: Optional. Maximum number of handles that are
+            being processed or waiting to be yielded at the same time.
+            Defaults to twice max_workers.
+        :param retries: Optional. How often a handle is tried again if it
+            failed temporarily and the request was not retried already
+            (connection error, timeout or Handle Server busy, if the client
+            was created with max_retries=0, or an open circuit breaker).
+            Defaults to 0.
+        :return: An iterator of tuples (handle, deleted, error), in the order
+            in which the requests complete. "deleted" is the deleted handle,
+            or None. The error is the exception raised while deleting this
+            handle (a :exc:`~pyhandle.handleexceptions.HandleNotFoundException`
+            if it did not exist), or None. Its attribute "summary" is a dict
+            counting the handles "deleted", "not_found" and "failed" so far.
+            A handle that is not found when its deletion is retried counts
+            as deleted, as the failed attempt must have deleted it.
+        '''
+        LOGGER.debug('delete_handles...')
+
+        def delete(handle):
+            attempts = [0]
+            def attempt():
+                attempts[0] += 1
+                try:
+                    return self.delete_handle(handle)
+                except HandleNotFoundException as exc:
+                    # The response to an earlier attempt was lost:
+                    if attempts[0] > 1 or getattr(exc.response, 'retries', 0) > 0:
+                        LOGGER.info('Handle %s not found when retrying, so it was deleted.', handle)
+                        return handle
+                    raise
+            return self.__retry_temporary_failures(attempt, retries)
+
+        results = util.bounded_concurrent_map(delete, handles, max_workers, max_in_flight)
+        return util.SummarizedResults(results, self.__classify_deletion, ['deleted', 'not_found', 'failed'])
+
+    def delete_handle_values(self, items, max_workers=10, max_in_flight=None, retries=0):
+        '''
+        Delete values from many handle records concurrently (like
+        :meth:`~pyhandle.handleclient.RESTHandleClient.delete_handle_value`).
+
+        See :meth:`~pyhandle.handleclient.RESTHandleClient.delete_handles`
+        for how the requests are sent.
+
+        *Note:* Every item costs two requests, as the record is read to
+        find the indices. If the indices are known, use
+        :meth:`~pyhandle.handleclient.RESTHandleClient.delete_handle_value_by_index`
+        instead.
+
+        :param items: An iterable of tuples (handle, keys), where keys is one
+            key or a list of keys.
+        :param max_workers: Optional. Number of requests sent in parallel.
+            Defaults to 10.
+        :param max_in_flight: Optional. Maximum number of items that are
+            being processed or waiting to be yielded at the same time.
+            Defaults to twice max_workers.
+        :param retries: Optional. How often an item is tried again if it
+            failed temporarily and the request was not retried already
+            (see :meth:`~pyhandle.handleclient.RESTHandleClient.delete_handles`).
+            Defaults to 0.
+        :return: An iterator of tuples (handle, deleted, error), in the order
+            in which the requests complete. "deleted" is the handle, or None
+            if the handle had no values with these keys. The error is the
+            exception raised for this item, or None. Its attribute "summary"
+            is a dict counting the items "deleted", "not_found" (handle or
+            values) and "failed" so far. If the values were deleted by an
+            attempt whose response was lost, the item counts as "not_found",
+            as the retry cannot tell that the values existed.
+        '''
+        LOGGER.debug('delete_handle_values...')
+
+        def delete(item):
+            handle, keys = item
+            return self.__retry_temporary_failures(lambda: self.delete_handle_value(handle, keys), retries)
+
+        def results():
+            for item, deleted, error in util.bounded_concurrent_map(delete, items, max_workers, max_in_flight):
+                # Malformed items are reported as they are:
+                if isinstance(item, (tuple, list)) and len(item) > 0:
+                    item = item[0]
+                yield item, deleted, error
+
+        return util.SummarizedResults(results(), self.__classify_deletion, ['deleted', 'not_found', 'failed'])
+
+    def __classify_deletion(self, handle, deleted, error):
+        if error is None:
+            return 'deleted' if deleted is not None else 'not_found'
+        if isinstance(error, HandleNotFoundException):
+            return 'not_found'
+        return 'failed'
+
+    def __retry_temporary_failures(self, function, retries):
+        # Retry the whole operation, with the same backoff as single
+        # requests, but only if the request was not retried already:
+        policy = self.__handlesystemconnector.get_retry_policy()
+        attempt = 0
+        while True:
+            try:
+                return function()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    HandleServerUnavailableError, GenericHandleError) as exc:
+                if attempt >= retries or not self.__is_temporary_failure(exc, policy):
+                    raise
+                attempt += 1
+                wait = policy.get_backoff_time(attempt, getattr(exc, 'response', None))
+                LOGGER.info('Operation failed (%s), attempt %s/%s in %.2f s.',
+                    exc.__class__.__name__, attempt, retries, wait)
+                time.sleep(wait)
+
+    def __is_temporary_failure(self, exc, policy):
+        # The connector does not retry while the circuit breaker is open:
+        if isinstance(exc, HandleServerUnavailableError):
+            return True
+        if policy.max_retries > 0:
+            return False
+        if isinstance(exc, GenericHandleError):
+            return policy.is_retryable_response(getattr(exc, 'response', None))
+        return True
+
     def register_handle_json(self, handle, list_of_entries, overwrite=False):
         '''
         Registers a new Handle with given name. If the handle already exists
@@ -737,14 +1447,17 @@ class RESTHandleClient(HandleClient):
         :return: The handle name.
         '''
 
-        # If already exists and can't be overwritten:
-        if overwrite == False:
+        utilhandle.check_handle_syntax(handle)
+
+        # If already exists and can't be overwritten (unless the Handle
+        # Server is left to check that):
+        if overwrite == False and self.__check_existence_before_register:
             handlerecord_json = self.retrieve_handle_record_json(handle)
             # Note: Adding "?auth=true" to this request makes no sense, as we are
             # talking to the primary server anyway.
             if handlerecord_json is not None:
                 msg = 'Could not register handle %s' % handle
-                LOGGER.error(msg + ', as it already exists.')
+                LOGGER.error('%s, as it already exists.', msg)
                 raise HandleAlreadyExistsException(handle=handle, msg=msg)
 
         # So we don't modify the caller's list:
@@ -845,16 +1558,35 @@ class RESTHandleClient(HandleClient):
             LOGGER.debug('Found keyword "auth", which will be registered as a key-value-pair in the handle record.')
             # TODO: Is this behaviour desired?
 
-        # If already exists and can't be overwritten:
-        if overwrite == False:
+        utilhandle.check_handle_syntax(handle)
+
+        # If already exists and can't be overwritten (unless the Handle
+        # Server is left to check that):
+        if overwrite == False and self.__check_existence_before_register:
             handlerecord_json = self.retrieve_handle_record_json(handle)
             # Note: Adding "?auth=true" to this request makes no sense, as we are
             # talking to the primary server anyway.
             if handlerecord_json is not None:
                 msg = 'Could not register handle'
-                LOGGER.error(msg + ', as it already exists.')
+                LOGGER.error('%s, as it already exists.', msg)
                 raise HandleAlreadyExistsException(handle=handle, msg=msg)
 
+        # Create the entries, including the admin entry:
+        list_of_entries = self._make_entries_for_registering_kv(handle, **kv_pairs)
+
+        # Create record itself and put to server:
+        return self.__handle_registering(handle, list_of_entries, overwrite)
+
+    def _make_entries_for_registering_kv(self, handle, **kv_pairs):
+        '''
+        Create the list of entries for a new handle record from key-value
+            pairs, including an HS_ADMIN entry.
+
+        :param handle: The handle to be registered.
+        :param kv_pairs: The key value pairs to be included in the record.
+        :return: The list of entries, ready to be sent to the Handle Server.
+        '''
+
         # Create admin entry
         list_of_entries = []
         adminentry = self.__create_admin_entry(
@@ -875,9 +1607,8 @@ class RESTHandleClient(HandleClient):
                     self.__make_another_index(list_of_entries, is_url)
                 )
                 list_of_entries.append(entry)
-        
-        # Create record itself and put to server:
-        return self.__handle_registering(handle, list_of_entries, overwrite)
+
+        return list_of_entries
 
     def __handle_registering(self, handle, list_of_entries, overwrite):
         op = 'registering handle'
@@ -887,10 +1618,30 @@ class RESTHandleClient(HandleClient):
             overwrite=overwrite,
             op=op
         )
-        resp_content = decoded_response(resp)
+        return self._interpret_registering_response(handle, resp, put_payload, op)
+
+    def _interpret_registering_response(self, handle, resp, put_payload, op):
+        '''
+        Check the Handle Server's response to a PUT request that registers
+            a handle.
+
+        :param handle: The handle that was registered.
+        :param resp: The server's response.
+        :param put_payload: The payload that was sent.
+        :param op: Name of the operation, only used in exceptions.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAlreadyExistsException`
+        :raises: :exc:`~pyhandle.handleexceptions.GenericHandleError`
+        :return: The handle name.
+        '''
+        resp = get_handle_response(resp)
         if hsresponses.was_handle_created(resp) or hsresponses.handle_success(resp):
-            LOGGER.info("Handle registered: " + handle)
-            return json.loads(resp_content)['handle']
+            LOGGER.info('Handle registered: %s', handle)
+            return resp.body['handle']
+        elif hsresponses.handle_already_exists(resp):
+            # Response: {'handle': '21.14106/TESTTESTTEST', 'responseCode': 101} with HTTP 409
+            msg = 'Could not register handle'
+            LOGGER.error('%s, as it already exists.', msg)
+            raise HandleAlreadyExistsException(handle=handle, msg=msg)
         elif hsresponses.is_temporary_redirect(resp):
             oldurl = resp.url
             newurl = resp.headers['location']
@@ -948,6 +1699,9 @@ class RESTHandleClient(HandleClient):
         :param key_value_pairs: Optional. Several search fields and values can
             be specified as key-value-pairs,
             e.g. CHECKSUM=123456, URL=www.foo.com
+        :param timeout: Optional. The timeout in seconds for the search, as one
+            number or as a (connect, read) pair. Defaults to the timeout passed
+            to the constructor.
         :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`: If a search field is specified that
             cannot be used, or if something else goes wrong.
         :return: A list of all Handles (strings) that bear the given key with
@@ -993,19 +1747,95 @@ class RESTHandleClient(HandleClient):
 
         :param key: The key (Handle Record type)
         :param list_of_entries: A list of the existing entries in which to find
-            the indices.
+            the indices, or a :class:`~pyhandle.handlerecord.HandleRecord`.
         :return: A list of strings, the indices of the entries of type "key" in
             the given handle record.
         '''
 
         LOGGER.debug('get_handlerecord_indices_for_key...')
 
+        if isinstance(list_of_entries, HandleRecord):
+            return list_of_entries.indices(key)
         indices = []
         for entry in list_of_entries:
             if entry['type'] == key:
                 indices.append(entry['index'])
         return indices
 
+    def stats(self):
+        '''
+        Return the statistics of the requests sent by this client (to the
+        Handle Server and to the search servlet) and of its caches.
+
+        :return: A :class:`~pyhandle.requeststats.RequestStatistics`. Use its
+            methods as_dict() or to_prometheus() to export them.
+        '''
+        return self.__statistics
+
+    def get_slow_requests(self):
+        '''
+        Return the requests that took longer than the threshold given as
+        "slow_request_threshold", the oldest first.
+
+        :return: A list of dicts with the operation, handle, URL, status,
+            error, latency and phase timings (in seconds), the number of
+            retries and the size of the response (see
+            :mod:`pyhandle.slowrequests`).
+        '''
+        if self.__slow_requests is None:
+            return []
+        return self.__slow_requests.records()
+
+    def get_record_cache_stats(self):
+        '''
+        Return the statistics of the record cache (see the constructor's
+        parameter "record_cache_size").
+
+        :return: A dict with the number of hits, misses, evictions,
+            expirations and invalidations and with the current and maximum
+            size, or None if the client has no record cache.
+        '''
+        if self.__record_cache is None:
+            return None
+        return self.__record_cache.stats()
+
+    def get_not_found_cache_stats(self):
+        '''
+        Return the statistics of the cache of handles that do not exist
+        (see the constructor's parameter "not_found_cache_size").
+
+        :return: A dict with the number of hits, misses, evictions,
+            expirations and invalidations and with the current and maximum
+            size, or None if the client has no not-found cache.
+        '''
+        if self.__not_found_cache is None:
+            return None
+        return self.__not_found_cache.stats()
+
+    def clear_record_cache(self):
+        '''
+        Remove all handle records from the record cache and all handles
+        from the not-found cache, if any.
+        '''
+        if self.__record_cache is not None:
+            self.__record_cache.clear()
+        if self.__not_found_cache is not None:
+            self.__not_found_cache.clear()
+
+    # Protected methods (used by the asynchronous client):
+
+    def _check_existence_before_register(self):
+        # pylint: disable=missing-docstring
+        return self.__check_existence_before_register
+
+    def _get_handlesystemconnector(self):
+        # pylint: disable=missing-docstring
+        return self.__handlesystemconnector
+
+    def _get_searcher(self):
+        # pylint: disable=missing-docstring
+        return self.__searcher
+
     # Private methods:
 
     def __send_handle_delete_request(self, handle, indices=None, op=None):
@@ -1023,10 +1853,13 @@ class RESTHandleClient(HandleClient):
         :return: The server's response.
         '''
 
-        resp = self.__handlesystemconnector.send_handle_delete_request(
-            handle=handle,
-            indices=indices,
-            op=op)
+        try:
+            resp = self.__handlesystemconnector.send_handle_delete_request(
+                handle=handle,
+                indices=indices,
+                op=op)
+        finally:
+            self.__invalidate_cached_record(handle)
         return resp
 
     def __send_handle_put_request(self, handle, list_of_entries, indices=None, overwrite=False, op=None):
@@ -1048,15 +1881,30 @@ class RESTHandleClient(HandleClient):
         :return: The server's response.
         '''
 
-        resp, payload = self.__handlesystemconnector.send_handle_put_request(
-            handle=handle,
-            list_of_entries=list_of_entries,
-            indices=indices,
-            overwrite=overwrite,
-            op=op
-        )
+        try:
+            resp, payload = self.__handlesystemconnector.send_handle_put_request(
+                handle=handle,
+                list_of_entries=list_of_entries,
+                indices=indices,
+                overwrite=overwrite,
+                op=op
+            )
+        finally:
+            self.__invalidate_cached_record(handle)
         return resp, payload
 
+    def __invalidate_cached_record(self, handle):
+        # After a write (even a failed one, as we do not know what was
+        # written), the cached record cannot be trusted any more, and
+        # the handle may exist now. Reads that started before the write
+        # must not be joined either:
+        if self.__single_flight is not None:
+            self.__single_flight.forget(lambda key: key[0] == handle)
+        if self.__record_cache is not None:
+            self.__record_cache.invalidate(handle)
+        if self.__not_found_cache is not None:
+            self.__not_found_cache.invalidate(handle)
+
     def __send_handle_get_request(self, handle, indices=None, **hs_options):
         '''
         Send a HTTP GET request to the handle server to read either an entire
@@ -1079,7 +1927,7 @@ class RESTHandleClient(HandleClient):
         resp = self.__handlesystemconnector.send_handle_get_request(handle, indices, **hs_options)
         return resp
 
-    def __get_handle_record_if_necessary(self, handle, handlerecord_json, auth, indices, **hs_options):
+    def __get_handle_record_if_necessary(self, handle, handlerecord_json, auth, indices, types=None, **hs_options):
         '''
         Returns the handle record if it is None or if its handle is not the
             same as the specified handle.
@@ -1101,16 +1949,51 @@ class RESTHandleClient(HandleClient):
             possible values. To add several "?index=xyz" options, pass a list or 
             use the parameter "indices". To add several "?type=xyz" options, add
             them as a list.
+        :param types: Optional. A list of types. If the handle record has to be
+            requested, only entries of these types are requested (unless the
+            entire record is in the record cache). The returned record may
+            thus contain only these types, or no "values" at all.
         '''
 
 
-        if handlerecord_json is None:
-            handlerecord_json = self.retrieve_handle_record_json(handle, auth, indices, **hs_options)
-        else:
-            if handle != handlerecord_json['handle']:
+        if handlerecord_json is None or handle != handlerecord_json['handle']:
+            if types is None or indices is not None or 'type' in hs_options:
                 handlerecord_json = self.retrieve_handle_record_json(handle, auth, indices, **hs_options)
+            else:
+                handlerecord_json = self.__retrieve_handle_record_json_of_types(handle, types, auth, **hs_options)
         return handlerecord_json
 
+    def __get_record_if_necessary(self, handle, handlerecord_json, auth, indices, types=None, **hs_options):
+        # Like __get_handle_record_if_necessary, but returns a HandleRecord.
+        # A HandleRecord passed by the caller is used as it is:
+        if isinstance(handlerecord_json, HandleRecord):
+            if handlerecord_json.handle == handle:
+                return handlerecord_json
+            handlerecord_json = None
+        return HandleRecord.from_json(self.__get_handle_record_if_necessary(
+            handle, handlerecord_json, auth, indices, types, **hs_options))
+
+    def __retrieve_handle_record_json_of_types(self, handle, types, auth, **hs_options):
+        # An entire record from the cache is as good as a filtered one
+        # from the server:
+        if not auth and set(hs_options.keys()) <= set(['timeout', 'deadline']):
+            if self.__record_cache is not None:
+                utilhandle.check_handle_syntax(handle)
+                handlerecord_json = self.__record_cache.get(handle)
+                if handlerecord_json is not None:
+                    return handlerecord_json
+            if self.__not_found_cache is not None and self.__not_found_cache.contains(handle):
+                return None
+        hs_options['type'] = list(types)
+        return self.retrieve_handle_record_json(handle, auth, **hs_options)
+
+    def __get_handle_record_for_writing(self, handle, handlerecord_json, auth):
+        # A record passed by the caller is used as it is (preparing the
+        # request does not modify it):
+        if handlerecord_json is not None and handlerecord_json.get('handle') == handle:
+            return handlerecord_json
+        return self.retrieve_handle_record_json(handle, auth)
+
     def __make_another_index(self, list_of_entries, url=False, hs_admin=False):
         '''
         Find an index not yet used in the handle record and not reserved for
@@ -1125,32 +2008,13 @@ class RESTHandleClient(HandleClient):
         :return: An integer.
         '''
 
-        start = 2
-
-        # reserved indices:
-        reserved_for_url = set([1])
-        reserved_for_admin = set(range(100, 200))
-        prohibited_indices = reserved_for_url | reserved_for_admin
-
-        if url:
-            prohibited_indices = prohibited_indices - reserved_for_url
-            start = 1
-        elif hs_admin:
-            prohibited_indices = prohibited_indices - reserved_for_admin
-            start = 100
-
         # existing indices
         existing_indices = set()
         if list_of_entries is not None:
             for entry in list_of_entries:
                 existing_indices.add(int(entry['index']))
 
-        # find new index:
-        all_prohibited_indices = existing_indices | prohibited_indices
-        searchmax = max(start, max(all_prohibited_indices)) + 2
-        for index in range(start, searchmax):
-            if index not in all_prohibited_indices:
-                return index
+        return get_free_index(existing_indices, url=url, hs_admin=hs_admin)
 
     def __create_entry(self, entrytype, data, index, ttl=None):
         '''
@@ -1223,26 +2087,9 @@ class RESTHandleClient(HandleClient):
 
         return entry
 
-    def __get_python_indices_for_key(self, key, list_of_entries):
-        '''
-        Finds the indices of all entries that have a specific type. Important:
-            This method finds the python indices of the list of entries! These
-            are not the Handle System index values!
-
-        :param key: The key (Handle Record type)
-        :param list_of_entries: A list of the existing entries in which to find
-            the indices.
-        :return: A list of integers, the indices of the entries of type "key"
-            in the given list.
-        '''
-        indices = []
-        for i in range(len(list_of_entries)):
-            if list_of_entries[i]['type'] == key:
-                indices.append(i)
-        return indices
-    
     def __log_request_response_to_file(self, **args):
-        message = util.make_request_log_message(**args)
-        args['logger'].info(message)
+        if args['logger'].isEnabledFor(logging.INFO):
+            message = util.make_request_log_message(**args)
+            args['logger'].info(message)
     
         
\ No newline at end of file
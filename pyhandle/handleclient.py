@@ -4,13 +4,11 @@ This module provides the main client for the PYHANDLE
 '''
 from __future__ import absolute_import
 
+import importlib
 import logging
+import sys
 import pyhandle
-import requests
 
-from pyhandle.client.batchhandleclient import BatchHandleClient
-from pyhandle.client.dbhandleclient import DBHandleClient
-from pyhandle.client.resthandleclient import RESTHandleClient
 from . import util
 
 LOGGER = logging.getLogger(__name__)
@@ -19,26 +17,81 @@ REQUESTLOGGER = logging.getLogger('log_all_requests_of_testcases_to_file')
 REQUESTLOGGER.propagate = False
 REQUESTLOGGER.addHandler(util.NullHandler())
 
+# The clients are only imported when they are used, so that e.g. the
+# REST client does not need pymysql:
+HANDLE_CLIENTS = {
+    'db': ('pyhandle.client.dbhandleclient', 'DBHandleClient'),
+    'rest': ('pyhandle.client.resthandleclient', 'RESTHandleClient'),
+    'batch': ('pyhandle.client.batchhandleclient', 'BatchHandleClient')
+}
+
+
+def get_handle_client_class(client):
+    '''
+    Import a client class.
+
+    :param client: 'rest', 'db' or 'batch'.
+    :raises: :exc:`~ValueError`: If there is no such client.
+    :return: The class of the client.
+    '''
+    if client not in HANDLE_CLIENTS:
+        raise ValueError('Unknown client %r. Allowed clients: %s' % (client, ', '.join(map(repr, HANDLE_CLIENTS))))
+    module_name, class_name = HANDLE_CLIENTS[client]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def __getattr__(name):
+    # Still allow "from pyhandle.handleclient import RESTHandleClient":
+    for client, (_, class_name) in HANDLE_CLIENTS.items():
+        if name == class_name:
+            return get_handle_client_class(client)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+class _ClientClasses(object):
+    '''
+    The list of the client classes, as a class attribute that imports
+    the clients on first access only.
+    '''
+
+    def __init__(self):
+        self.__classes = None
+
+    def __get__(self, instance, owner):
+        if self.__classes is None:
+            self.__classes = [get_handle_client_class(client) for client in HANDLE_CLIENTS]
+        return self.__classes
+
 
 class PyHandleClient(object):
     ''' PYHANDLE main client class '''
 
-    HANDLE_CLIENTS = [DBHandleClient, RESTHandleClient, BatchHandleClient]
+    HANDLE_CLIENTS = _ClientClasses()
 
-    def __init__(self, client, credentials=None, batch_file_path=None):
+    def __init__(self, client, credentials=None, batch_file_path=None, **config):
         '''
         Initialize a REST or Db client.
 
         :param client: A string that can be 'rest' or 'db'
         :param credentials: Optional: key-value pairs to specify credentials for the MySQL database.
+        :param config: Optional. Options of the DB client, e.g. "statistics"
+            or "slow_request_threshold" (see
+            :class:`~pyhandle.client.dbhandleclient.DBHandleClient`). The
+            REST client gets its options from its instantiate methods.
+        :raises: :exc:`~ValueError`: If the client or an option is not
+            supported.
         '''
 
         allowed_args = ['rest', 'db', 'batch']
 
         if client in allowed_args:
+            if len(config) > 0 and client != 'db':
+                raise ValueError('Options are only passed to the DB client, not to the '+client+' client: '+
+                                 ', '.join(sorted(config))+'. Pass them to the instantiate methods instead.')
             self.client = client
             self.credentials = credentials
             self.batch_file_path = batch_file_path
+            self.config = config
             self.handle_client = self.select_handle_client()
         else:
             raise ValueError("Allowed clients: 'rest', 'db' or 'batch'")
@@ -49,14 +102,13 @@ class PyHandleClient(object):
         :return: Instance of the client.
         '''
 
-        for client in self.HANDLE_CLIENTS:
-            if client.check_client(self.client):
-                if self.client == 'db':
-                    return client(self.credentials)
-                elif self.client == 'batch':
-                    return client(batch_file_path=self.batch_file_path)
-                else:
-                    return client()
+        client = get_handle_client_class(self.client)
+        if self.client == 'db':
+            return client(self.credentials, **self.config)
+        elif self.client == 'batch':
+            return client(batch_file_path=self.batch_file_path)
+        else:
+            return client()
 
     def create_batch_file(self, overwrite=False):
         return self.handle_client.create_batch_file(overwrite)
@@ -82,24 +134,39 @@ class PyHandleClient(object):
     def retrieve_handle_record(self, handle, handle_record_json=None):
         return self.handle_client.retrieve_handle_record(handle, handle_record_json)
 
+    def retrieve_handle_records(self, handles, max_workers=10, total_timeout=None):
+        return self.handle_client.retrieve_handle_records(handles, max_workers=max_workers, total_timeout=total_timeout)
+
     def get_value_from_handle(self, handle, key, handle_record_json=None):
         return self.handle_client.get_value_from_handle(handle, key, handle_record_json)
 
     def modify_handle_value(self, handle, **kvpairs):
         self.handle_client.modify_handle_value(handle, **kvpairs)
 
+    def sync_handle_record(self, handle, desired, ttl=None):
+        return self.handle_client.sync_handle_record(handle, desired, ttl)
+
     def delete_handle_value(self, handle, key):
         self.handle_client.delete_handle_value(handle, key)
 
     def delete_handle(self, handle):
         self.handle_client.delete_handle(handle)
 
+    def delete_handles(self, handles, max_workers=10):
+        return self.handle_client.delete_handles(handles, max_workers=max_workers)
+
+    def delete_handle_values(self, items, max_workers=10):
+        return self.handle_client.delete_handle_values(items, max_workers=max_workers)
+
     def generate_and_register_handle(self, prefix, location, checksum=None, **extratypes):
         return self.handle_client.generate_and_register_handle(prefix, location, checksum, **extratypes)
 
     def register_handle(self, handle, location, overwrite=False, **extratypes):
         return self.handle_client.register_handle(handle, location, overwrite, **extratypes)
 
+    def register_handles(self, items, overwrite=False, max_workers=10):
+        return self.handle_client.register_handles(items, overwrite=overwrite, max_workers=max_workers)
+
     def search_handle(self, pattern=None, **args):
         return self.handle_client.search_handle(pattern, **args)
 
@@ -135,3 +202,16 @@ class PyHandleClient(object):
 
     def add_handle_value(self, handle, **kvpairs):
         self.handle_client.add_handle_value(handle, **kvpairs)
+
+    def stats(self):
+        return self.handle_client.stats()
+
+    def get_slow_requests(self):
+        return self.handle_client.get_slow_requests()
+
+
+if sys.version_info < (3, 7):
+    # No lazy module attributes (PEP 562) before Python 3.7:
+    from pyhandle.client.batchhandleclient import BatchHandleClient
+    from pyhandle.client.dbhandleclient import DBHandleClient
+    from pyhandle.client.resthandleclient import RESTHandleClient
@@ -104,6 +104,59 @@ class GenericHandleError(PyhandleBaseException):
 
         super(self.__class__, self).__init__(self.msg)
 
+class HandleServerUnavailableError(PyhandleBaseException):
+    '''
+    To be raised when requests to the Handle Server are not sent, because
+    the Handle Server failed repeatedly (i.e. the circuit breaker is open).
+    '''
+    def __init__(self, **args):
+
+        # Default message:
+        self.msg = 'Handle Server unavailable'
+
+        # Possible arguments:
+        optional_args = ['msg', 'handle']
+        add_missing_optional_args_with_value_none(args, optional_args)
+        self.handle = args['handle']
+        self.custom_message = args['msg']
+
+        if self.custom_message is not None:
+            self.msg += ': '+self.custom_message
+        self.msg += '.'
+
+        if self.handle is not None:
+            self.msg += '\n\tHandle: '+self.handle
+
+        super(self.__class__, self).__init__(self.msg)
+
+class DeadlineExceededError(PyhandleBaseException):
+    '''
+    To be raised when a request is not sent (or not retried), because the
+    deadline of the operation it belongs to has passed.
+    '''
+    def __init__(self, **args):
+
+        # Default message:
+        self.msg = 'Deadline exceeded'
+
+        # Possible arguments:
+        optional_args = ['msg', 'handle', 'operation']
+        add_missing_optional_args_with_value_none(args, optional_args)
+        self.handle = args['handle']
+        self.custom_message = args['msg']
+        self.operation = args['operation']
+
+        if self.operation is not None:
+            self.msg += ' ('+self.operation+')'
+        if self.custom_message is not None:
+            self.msg += ': '+self.custom_message
+        self.msg += '.'
+
+        if self.handle is not None:
+            self.msg += '\n\tHandle: '+self.handle
+
+        super(self.__class__, self).__init__(self.msg)
+
 class ReverseLookupException(PyhandleBaseException):
     '''
     To be raised if the reverse lookup servlet returns an error.
@@ -0,0 +1,245 @@
+'''
+This module provides the HandleRecord, a compact, read-only view of a
+    handle record (as returned by the Handle Server's REST API) whose
+    entries are indexed by type and by index once, so that looking up
+    values does not scan the entries again and again.
+
+A HandleRecord keeps the record dict it was built from (without
+    copying it), so converting it back to JSON is free. Building one
+    takes one pass over the entries.
+
+'''
+
+from pyhandle.jsoncodec import get_json_codec
+
+# Indices that are only used for entries of a special type:
+INDEX_URL = 1
+INDICES_HS_ADMIN = range(100, 200)
+
+
+def get_free_index(used_indices, url=False, hs_admin=False):
+    '''
+    Find an index not yet used in a handle record and not reserved for
+        any (other) special type.
+
+    :param used_indices: The indices in use, as a set of integers.
+    :param url: Optional. If True, an index for an URL entry is returned
+        (1, unless it is already in use).
+    :param hs_admin: Optional. If True, an index for HS_ADMIN is returned
+        (100 or one of the following).
+    :return: An integer.
+    '''
+    start = 2
+
+    # reserved indices:
+    reserved_for_url = set([INDEX_URL])
+    reserved_for_admin = set(INDICES_HS_ADMIN)
+    prohibited_indices = reserved_for_url | reserved_for_admin
+
+    if url:
+        prohibited_indices = prohibited_indices - reserved_for_url
+        start = INDEX_URL
+    elif hs_admin:
+        prohibited_indices = prohibited_indices - reserved_for_admin
+        start = INDICES_HS_ADMIN[0]
+
+    # find new index:
+    all_prohibited_indices = used_indices | prohibited_indices
+    searchmax = max(start, max(all_prohibited_indices)) + 2
+    for index in range(start, searchmax):
+        if index not in all_prohibited_indices:
+            return index
+
+
+def get_entry_value(entry):
+    '''
+    :param entry: An entry of a handle record.
+    :return: The value of its data, which may be a dict {"format": ...,
+        "value": ...} or (in entries made by the library) the value itself.
+    '''
+    data = entry['data']
+    if isinstance(data, dict) and 'value' in data:
+        return data['value']
+    return data
+
+
+class HandleRecord(object):
+    '''
+    A handle record, with its entries indexed by type and by index.
+    Entries are the dicts of the record's JSON ("index", "type", "data",
+    ...). They are shared with the JSON and must not be modified.
+    '''
+
+    __slots__ = ('handle', '__json', '__by_type', '__by_index')
+
+    def __init__(self, handlerecord_json):
+        '''
+        :param handlerecord_json: The handle record as dict, as returned by
+            :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.retrieve_handle_record_json`.
+            It is kept, not copied. It may have no "values" (if no entry
+            matched the requested types).
+        '''
+        self.handle = handlerecord_json.get('handle')
+        self.__json = handlerecord_json
+        # The types map to their entry, or to a list if there are several
+        # (which is rare), which saves one list per type:
+        self.__by_type = {}
+        self.__by_index = {}
+        for entry in handlerecord_json.get('values', ()):
+            entries = self.__by_type.get(entry['type'])
+            if entries is None:
+                self.__by_type[entry['type']] = entry
+            elif isinstance(entries, list):
+                entries.append(entry)
+            else:
+                self.__by_type[entry['type']] = [entries, entry]
+            self.__by_index[int(entry['index'])] = entry
+
+    @staticmethod
+    def from_json(handlerecord_json, json_codec=None):
+        '''
+        Make a HandleRecord from a handle record's JSON.
+
+        :param handlerecord_json: The handle record as dict, or as JSON
+            document (string or bytes), or a HandleRecord (returned as it is),
+            or None.
+        :param json_codec: Optional. The JSON codec used to parse a JSON
+            document (see :func:`~pyhandle.jsoncodec.get_json_codec`).
+        :return: A HandleRecord, or None if None was passed.
+        '''
+        if handlerecord_json is None or isinstance(handlerecord_json, HandleRecord):
+            return handlerecord_json
+        if isinstance(handlerecord_json, (str, bytes)):
+            handlerecord_json = get_json_codec(json_codec).loads(handlerecord_json)
+        return HandleRecord(handlerecord_json)
+
+    @staticmethod
+    def from_dict(handle, record_as_dict):
+        '''
+        Make a HandleRecord from key-value pairs, in the format returned by
+            :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.retrieve_handle_record`.
+            URL gets the index 1, HS_ADMIN an index from 100, all other
+            types the free indices from 2, in the order of the dict.
+
+        :param handle: The handle.
+        :param record_as_dict: A dict whose keys are the types and whose
+            values are the values.
+        :return: A HandleRecord.
+        '''
+        used_indices = set()
+        values = []
+        for key, value in record_as_dict.items():
+            index = get_free_index(used_indices, url=key == 'URL', hs_admin=key == 'HS_ADMIN')
+            used_indices.add(index)
+            data_format = 'admin' if key == 'HS_ADMIN' else 'string'
+            values.append({'index': index, 'type': key, 'data': {'format': data_format, 'value': value}})
+        return HandleRecord({'handle': handle, 'values': values})
+
+    @property
+    def values(self):
+        '''
+        The list of entries.
+        '''
+        return self.__json.get('values', [])
+
+    def to_json(self):
+        '''
+        :return: The handle record as dict (the one it was built from, not
+            a copy).
+        '''
+        return self.__json
+
+    def dumps(self, json_codec=None):
+        '''
+        :param json_codec: Optional. The JSON codec to use.
+        :return: The handle record as JSON document.
+        '''
+        return get_json_codec(json_codec).dumps(self.__json)
+
+    def to_dict(self, types=None):
+        '''
+        Convert the record to the format returned by
+            :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.retrieve_handle_record`.
+
+        :param types: Optional. A list of the types to include. Defaults to
+            None (all types).
+        :return: A dict where the keys are the types and every value is the
+            string of the first entry of the type.
+        '''
+        record_as_dict = {}
+        for key, entries in self.__by_type.items():
+            if types is None or key in types:
+                entry = entries[0] if isinstance(entries, list) else entries
+                record_as_dict[key] = str(get_entry_value(entry))
+        return record_as_dict
+
+    def get(self, entry_type, default=None):
+        '''
+        :param entry_type: The type (key).
+        :param default: Optional. Returned if there is no entry of the type.
+        :return: The value of the first entry of the type.
+        '''
+        entries = self.__by_type.get(entry_type)
+        if entries is None:
+            return default
+        if isinstance(entries, list):
+            return get_entry_value(entries[0])
+        return get_entry_value(entries)
+
+    def get_all(self, entry_type):
+        '''
+        :param entry_type: The type (key).
+        :return: A list of the values of all entries of the type.
+        '''
+        return [get_entry_value(entry) for entry in self.get_entries(entry_type)]
+
+    def get_entries(self, entry_type):
+        '''
+        :param entry_type: The type (key).
+        :return: A list of the entries of the type.
+        '''
+        entries = self.__by_type.get(entry_type)
+        if entries is None:
+            return []
+        if isinstance(entries, list):
+            return list(entries)
+        return [entries]
+
+    def indices(self, entry_type):
+        '''
+        :param entry_type: The type (key).
+        :return: A list of the (Handle System) indices of the entries of the
+            type.
+        '''
+        return [entry['index'] for entry in self.get_entries(entry_type)]
+
+    def by_index(self, index):
+        '''
+        :param index: The index, as integer or string.
+        :return: The entry with this index, or None.
+        '''
+        return self.__by_index.get(int(index))
+
+    def used_indices(self):
+        '''
+        :return: A set of the indices in use, as integers.
+        '''
+        return set(self.__by_index)
+
+    def types(self):
+        '''
+        :return: A list of the types in the record.
+        '''
+        return list(self.__by_type)
+
+    def __contains__(self, entry_type):
+        return entry_type in self.__by_type
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return '<HandleRecord '+str(self.handle)+' ('+str(len(self))+' entries)>'
@@ -0,0 +1,113 @@
+'''
+This module provides the HandleResponse, a wrapper around the
+    HTTP responses of the Handle Server and of the reverse lookup
+    servlet that decodes and parses the body only once, however
+    often it is inspected afterwards (e.g. by the helpers in
+    hsresponses, and then again to extract the handle record).
+
+'''
+
+from pyhandle.compatibility_helper import decoded_response
+from pyhandle.jsoncodec import get_json_codec
+
+
+class HandleResponse(object):
+    '''
+    A response whose decoded body, parsed JSON body and Handle Server
+    "responseCode" are computed on first access and then kept.
+
+    All other attributes (e.g. headers, url, request) are those of the
+    wrapped response, so a HandleResponse can be used wherever the
+    library expects a requests.Response.
+
+    The attribute "retries" is the number of times the request was
+    retried before this response was received.
+    '''
+
+    def __init__(self, response, json_codec=None):
+        '''
+        :param response: The wrapped response, e.g. a requests.Response.
+        :param json_codec: Optional. The JSON codec used to parse the body
+            (see :func:`~pyhandle.jsoncodec.get_json_codec`). Defaults to
+            the fastest one installed.
+        '''
+        self.response = response
+        self.json_codec = get_json_codec(json_codec)
+        self.status_code = response.status_code
+        self.retries = 0
+        self.__text = None
+        self.__body = None
+        self.__error = None
+        self.__parsed = False
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the wrapper itself:
+        if name == 'response':
+            raise AttributeError(name)
+        return getattr(self.response, name)
+
+    @property
+    def text(self):
+        '''
+        The body of the response as a string.
+        '''
+        if self.__text is None:
+            self.__text = decoded_response(self.response)
+        return self.__text
+
+    @property
+    def body(self):
+        '''
+        The body of the response, parsed as JSON.
+
+        :raises: :exc:`~ValueError`: If the body is not JSON.
+        '''
+        if not self.__parsed:
+            try:
+                # The codec accepts bytes, so there is no need to decode first:
+                self.__body = self.json_codec.loads(self.response.content)
+            except ValueError as exc:
+                self.__error = exc
+            self.__parsed = True
+        if self.__error is not None:
+            raise self.__error
+        return self.__body
+
+    def json(self):
+        '''
+        The body of the response, parsed as JSON (like
+            requests.Response.json(), but parsed only once).
+
+        :raises: :exc:`~ValueError`: If the body is not JSON.
+        '''
+        return self.body
+
+    @property
+    def response_code(self):
+        '''
+        The Handle Server's "responseCode", or None if the body is no JSON
+            object or has no responseCode.
+        '''
+        try:
+            body = self.body
+        except ValueError:
+            return None
+        if isinstance(body, dict):
+            return body.get('responseCode')
+        return None
+
+    def __repr__(self):
+        return '<HandleResponse ['+str(self.status_code)+']>'
+
+
+def get_handle_response(response, json_codec=None):
+    '''
+    Wrap a response in a HandleResponse, unless it is one already.
+
+    :param response: A response, or None.
+    :param json_codec: Optional. The JSON codec used to parse the body.
+    :return: A HandleResponse, or None.
+    '''
+    if response is None or isinstance(response, HandleResponse):
+        return response
+    return HandleResponse(response, json_codec)
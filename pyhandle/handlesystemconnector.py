@@ -7,13 +7,23 @@ Author: Merret Buurman (DKRZ), 2015-2016
 
 '''
 
-import json
 import logging
 import requests
 import os
+import time
 import pyhandle
+import pyhandle.hsresponses
+import pyhandle.utilhandle
+from pyhandle.util.sessionutils import SESSION_ARGS, TIMEOUT_ARGS, get_session_settings, make_session
+from pyhandle.util.sessionutils import get_timeout_settings, get_request_timeout
+from pyhandle.retrypolicy import RETRY_ARGS, RetryPolicy
+from pyhandle.ratelimiter import RATE_LIMIT_ARGS, RateLimiter
+from pyhandle.jsoncodec import JSON_CODEC_ARGS, get_json_codec
+from pyhandle.requestlog import REQUEST_LOG_ARGS, RequestLog
+from pyhandle.requeststats import REQUEST_STATS_ARGS, RequestStatistics
+from pyhandle.hooks import REQUEST_HOOK_ARGS, HookChain
 from pyhandle.handleexceptions import HandleNotFoundException, GenericHandleError, HandleAuthenticationError, CredentialsFormatError
-from pyhandle.compatibility_helper import decoded_response
+from pyhandle.handleresponse import get_handle_response
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(pyhandle.util.NullHandler())
 REQUESTLOGGER = logging.getLogger('log_all_requests_of_testcases_to_file')
@@ -28,6 +38,13 @@ class HandleSystemConnector(object):
     information (URL, credentials, defaults) and handles
     some exceptions.
 
+    A connector can be shared by any number of threads. Its settings
+    are fixed at instantiation, and every request passes its headers,
+    timeout and client certificate explicitly, so that the one HTTP
+    session is never modified after it was created. The threads share
+    the session's connection pool (see "pool_maxsize"); the retry
+    policy, circuit breaker and rate limiter synchronize themselves.
+
     '''
 
     def __init__(self, **args):
@@ -44,7 +61,7 @@ class HandleSystemConnector(object):
             'private_key',
             'certificate_only',
             'certificate_and_key'
-        ]
+        ] + SESSION_ARGS + TIMEOUT_ARGS + RETRY_ARGS + RATE_LIMIT_ARGS + JSON_CODEC_ARGS + REQUEST_LOG_ARGS + REQUEST_STATS_ARGS + REQUEST_HOOK_ARGS
         pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
 
         # Defaults for args:
@@ -71,13 +88,38 @@ class HandleSystemConnector(object):
         self.__has_write_access = False
         self.__auth_methods = dict(user_pw='user_pw', cert='client_cert')
         self.__authentication_method = None
-        self.__session = requests.Session()
+        self.__session = None
         self.__no_auth_message = 'No credentials passed. Read access only.'
-        self.__first_request = True
 
         # Needed for read and write access:
         self.__store_args_or_set_to_defaults(args, defaults)
 
+        # HTTP session with connection pool:
+        self.__session_settings = get_session_settings(args)
+        self.__session = make_session(**self.__session_settings)
+
+        # Default (connect, read) timeout of the requests:
+        self.__timeout = get_timeout_settings(args)
+        LOGGER.debug(' - timeout set to: %s', self.__timeout)
+
+        # Retries and circuit breaker:
+        self.__retry_policy = RetryPolicy.from_args(args)
+
+        # Client-side rate limit (possibly shared with other connectors):
+        self.__rate_limiter = RateLimiter.from_args(args)
+
+        # JSON codec for payloads and responses:
+        self.__json_codec = get_json_codec(args['json_codec'])
+
+        # Structured request log (possibly shared with other connectors):
+        self.__request_log = RequestLog.from_args(args)
+
+        # Request statistics (shared with the searcher of the same client):
+        self.__statistics = RequestStatistics.from_args(args)
+
+        # Hooks around every request (e.g. for tracing):
+        self.__hooks = HookChain.from_args(args)
+
         # If write access, do some additional setup:
         if self.__check_if_write_access(args):
             self.__setup_for_writeaccess(args)
@@ -94,28 +136,28 @@ class HandleSystemConnector(object):
 
         if args['handle_server_url']:
             self.__handle_server_url = args['handle_server_url']
-            LOGGER.debug(' - handle_server_url set to '+self.__handle_server_url)
+            LOGGER.debug(' - handle_server_url set to %s', self.__handle_server_url)
         else:
             self.__handle_server_url = defaults['handle_server_url']
-            LOGGER.debug(' - handle_server_url set to default: '+self.__handle_server_url)
+            LOGGER.debug(' - handle_server_url set to default: %s', self.__handle_server_url)
 
 
         if args['REST_API_url_extension']:
             self.__REST_API_url_extension = args['REST_API_url_extension']
-            LOGGER.debug(' - url_extension_REST_API set to: '+self.__REST_API_url_extension)
+            LOGGER.debug(' - url_extension_REST_API set to: %s', self.__REST_API_url_extension)
         else:
             self.__REST_API_url_extension = defaults['REST_API_url_extension']
-            LOGGER.debug(' - url_extension_REST_API set to default: '+self.__REST_API_url_extension)
+            LOGGER.debug(' - url_extension_REST_API set to default: %s', self.__REST_API_url_extension)
 
 
         if args['HTTPS_verify'] is not None:
             self.__HTTPS_verify = pyhandle.util.get_valid_https_verify(
                 args['HTTPS_verify']
             )
-            LOGGER.debug(' - https_verify set to: '+str(self.__HTTPS_verify))
+            LOGGER.debug(' - https_verify set to: %s', self.__HTTPS_verify)
         else:
             self.__HTTPS_verify = defaults['HTTPS_verify']
-            LOGGER.debug(' - https_verify set to default: '+str(self.__HTTPS_verify))
+            LOGGER.debug(' - https_verify set to default: %s', self.__HTTPS_verify)
 
 
         # Useful for write:
@@ -126,25 +168,25 @@ class HandleSystemConnector(object):
 
         if args['username']:
             self.__username = args['username']
-            LOGGER.debug(' - username set to: '+self.__username)
+            LOGGER.debug(' - username set to: %s', self.__username)
 
         if args['certificate_only']:
             self.__certificate_only = args['certificate_only']
-            LOGGER.debug(' - certificate_only set to: '+str(self.__certificate_only))
+            LOGGER.debug(' - certificate_only set to: %s', self.__certificate_only)
 
         if args['private_key']:
             self.__private_key = args['private_key']
-            LOGGER.debug(' - private_key set to: '+str(self.__private_key))
+            LOGGER.debug(' - private_key set to: %s', self.__private_key)
 
         if args['certificate_and_key']:
             self.__certificate_and_key = args['certificate_and_key']
-            LOGGER.debug(' - certificate_and_key set to: '+str(self.__certificate_and_key))
+            LOGGER.debug(' - certificate_and_key set to: %s', self.__certificate_and_key)
 
     def __check_if_write_access(self, args):
         write_access_argnames = ['username', 'password', 'certificate_only', 'private_key', 'certificate_and_key']
         for argname in write_access_argnames:
             if argname in args.keys() and args[argname] is not None:
-                LOGGER.debug('Connector got argument "'+argname+'", so write access is desired.')
+                LOGGER.debug('Connector got argument "%s", so write access is desired.', argname)
                 return True
         return False
 
@@ -233,7 +275,7 @@ class HandleSystemConnector(object):
             LOGGER.debug(msg)
             self.__has_write_access = False
         else:
-            LOGGER.debug('Authentication method: '+authentication_method)
+            LOGGER.debug('Authentication method: %s', authentication_method)
 
         return authentication_method
 
@@ -253,7 +295,7 @@ class HandleSystemConnector(object):
 
     # API methods:
 
-    def send_handle_get_request(self, handle, indices=None, **hs_options):
+    def send_handle_get_request(self, handle, indices=None, timeout=None, deadline=None, **hs_options):
         '''
         Send a HTTP GET request to the handle server to read either an entire
             handle or to some specified values from a handle record, using the
@@ -263,28 +305,36 @@ class HandleSystemConnector(object):
         :param indices: Optional. A list of indices to retrieve. Defaults to
             None (i.e. the entire handle record is retrieved). The list can contain
             integers or strings.
+        :param timeout: Optional. The timeout in seconds for this request, as
+            one number or as a (connect, read) pair. Defaults to the timeout
+            passed to the constructor.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished. The timeout is
+            shortened accordingly, and no retries are started after it.
         :param hs_options: Optional. A list of key-value pairs which will be appended
             to the URL as parameters, to be passed to the Handle Server during the
             GET request (e.g. "&auth=true"). Please see the Handle Tech Manual for
             possible values.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
         :return: The server's response.
         '''
 
         # Assemble required info:
         url = self.make_handle_URL(handle, indices, **hs_options)
-        LOGGER.debug('GET Request to '+url)
+        LOGGER.debug('GET Request to %s', url)
         head = self.__get_headers('GET')
         veri = self.__HTTPS_verify
 
-        # Send the request
-        if self.__cert_needed_for_get_request():
-            # If this is the first request and the connector uses client cert authentication, we need to send the cert along
-            # in the first request that builds the session.
-            resp = self.__session.get(url, headers=head, verify=veri, cert=self.__cert_object)
-        else:
-            # Normal case:
-            resp = self.__session.get(url, headers=head, verify=veri)
-    
+        # Send the request. If the connector uses client cert authentication,
+        # the cert is sent along with every request, as reads with "auth=true"
+        # need it, and as requests with and without cert do not share their
+        # pooled connections:
+        cert = self.__cert_object
+        send_request = lambda: self.__session.get(url, headers=head, verify=veri, cert=cert,
+            timeout=self.get_timeout(timeout, deadline, handle, 'GET'))
+        send_request = self.__rate_limited(send_request, 'read', deadline, handle, 'GET')
+        resp, latency = self.__send(send_request, 'GET', handle, url, deadline)
+
         # Log and return
         self.__log_request_response_to_file(
             logger=REQUESTLOGGER,
@@ -293,17 +343,11 @@ class HandleSystemConnector(object):
             url=url,
             headers=head,
             verify=veri,
-            resp=resp
+            resp=resp,
+            latency=latency
             )
-        self.__first_request = False
         return resp
 
-    def __cert_needed_for_get_request(self):
-        if (self.__first_request) and (self.__has_write_access) and (self.__authentication_method == self.__auth_methods['cert']):
-            return True
-        else:
-            return False
-
     def send_handle_put_request(self, **args):
         '''
         Send a HTTP PUT request to the handle server to write either an entire
@@ -318,6 +362,11 @@ class HandleSystemConnector(object):
          contain integers or strings.
         :param overwrite: Optional. Whether the handle should be overwritten
          if it exists already.
+        :param timeout: Optional. The timeout in seconds for this request, as
+         one number or as a (connect, read) pair.
+        :param deadline: Optional. The point in time (as returned by
+         time.time()) by which the request must be finished.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
         :return: The server's response.
         '''
 
@@ -327,7 +376,7 @@ class HandleSystemConnector(object):
 
         # Check args:
         mandatory_args = ['handle', 'list_of_entries']
-        optional_args = ['indices', 'op', 'overwrite']
+        optional_args = ['indices', 'op', 'overwrite', 'timeout', 'deadline']
         pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
         pyhandle.util.check_presence_of_mandatory_args(args, mandatory_args)
         handle = args['handle']
@@ -335,39 +384,47 @@ class HandleSystemConnector(object):
         indices = args['indices']
         op = args['op']
         overwrite = args['overwrite'] or False
+        timeout = args['timeout']
+        deadline = args['deadline']
 
         # Make necessary values:
         url = self.make_handle_URL(handle, indices, overwrite=overwrite)
-        LOGGER.debug('PUT Request to '+url)
-        payload = json.dumps({'values':list_of_entries})
-        LOGGER.debug('PUT Request payload: '+payload)
+        LOGGER.debug('PUT Request to %s', url)
+        payload = self.__json_codec.dumps({'values':list_of_entries})
+        LOGGER.debug('PUT Request payload: %s', payload)
         head = self.__get_headers('PUT')
-        LOGGER.debug('PUT Request headers: '+str(head))
+        LOGGER.debug('PUT Request headers: %s', head)
         veri = self.__HTTPS_verify
 
         # Send request to server:
-        resp = self.__send_put_request_to_server(url, payload, head, veri, handle)
+        # Only a PUT that overwrites is idempotent, so only that one may be retried:
+        idempotent = overwrite is True
+        resp = self.__send_put_request_to_server(url, payload, head, veri, handle, idempotent, timeout, deadline)
         if pyhandle.hsresponses.is_redirect_from_http_to_https(resp):
-            resp = self.__resend_put_request_on_302(payload, head, veri, handle, resp)
+            resp = self.__resend_put_request_on_302(payload, head, veri, handle, resp, idempotent, timeout, deadline)
 
         # Check response for authentication issues:
-        if pyhandle.hsresponses.not_authenticated(resp):
-            raise HandleAuthenticationError(
-                operation=op,
-                handle=handle,
-                response=resp,
-                username=self.__username
-            )
-        self.__first_request = False
+        self.check_authentication(resp, op, handle)
         return resp, payload
 
-    def __send_put_request_to_server(self, url, payload, head, veri, handle):
+    def __send_put_request_to_server(self, url, payload, head, veri, handle, idempotent, timeout, deadline):
         resp = None
         allow_redirects = False
+        send_request = None
+        get_timeout = lambda: self.get_timeout(timeout, deadline, handle, 'PUT')
+        # Send UTF-8, as requests would encode a string as Latin-1 (and the
+        # payload may contain non-ASCII characters, depending on the codec):
+        data = payload.encode('utf-8')
         if self.__authentication_method == self.__auth_methods['user_pw']:
-            resp = self.__session.put(url, data=payload, headers=head, verify=veri, allow_redirects=allow_redirects)
+            send_request = lambda: self.__session.put(url, data=data, headers=head, verify=veri, allow_redirects=allow_redirects,
+                timeout=get_timeout())
         elif self.__authentication_method == self.__auth_methods['cert']:
-            resp = self.__session.put(url, data=payload, headers=head, verify=veri, cert=self.__cert_object, allow_redirects=allow_redirects)
+            send_request = lambda: self.__session.put(url, data=data, headers=head, verify=veri, cert=self.__cert_object, allow_redirects=allow_redirects,
+                timeout=get_timeout())
+        latency = None
+        if send_request is not None:
+            send_request = self.__rate_limited(send_request, 'write', deadline, handle, 'PUT')
+            resp, latency = self.__send(send_request, 'PUT', handle, url, deadline, idempotent, len(data))
         self.__log_request_response_to_file(
             logger=REQUESTLOGGER,
             op='PUT',
@@ -376,16 +433,17 @@ class HandleSystemConnector(object):
             headers=head,
             verify=veri,
             resp=resp,
+            latency=latency,
             payload=payload)
         return resp
 
-    def __resend_put_request_on_302(self, payload, head, veri, handle, resp):
+    def __resend_put_request_on_302(self, payload, head, veri, handle, resp, idempotent, timeout, deadline):
         # Check response for 302 redirect.
         # In that case we have to manually reissue the request to make
         # sure it is done via PUT and not GET
         # as the requests library makes all 302 redirects to GET and then we get a wrong 200-OK!
         newurl = resp.headers['location']
-        resp = self.__send_put_request_to_server(newurl, payload, head, veri, handle)
+        return self.__send_put_request_to_server(newurl, payload, head, veri, handle, idempotent, timeout, deadline)
 
     def send_handle_delete_request(self, **args):
         '''
@@ -397,6 +455,11 @@ class HandleSystemConnector(object):
         :param indices: Optional. A list of indices to delete. Defaults to
             None (i.e. the entire handle is deleted.). The list can contain
             integers or strings.
+        :param timeout: Optional. The timeout in seconds for this request, as
+            one number or as a (connect, read) pair.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
         :return: The server's response.
         '''
 
@@ -406,29 +469,37 @@ class HandleSystemConnector(object):
 
         # Check args:
         mandatory_args = ['handle']
-        optional_args = ['indices', 'op']
+        optional_args = ['indices', 'op', 'timeout', 'deadline']
         pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
         pyhandle.util.check_presence_of_mandatory_args(args, mandatory_args)
         handle = args['handle']
         indices = args['indices']
         op = args['op']
+        timeout = args['timeout']
+        deadline = args['deadline']
 
         # Make necessary values:
         url = self.make_handle_URL(handle, indices)
         if indices is not None and len(indices) > 0:
-            LOGGER.debug('__send_handle_delete_request: Deleting values '+str(indices)+' from handle '+handle+'.')
+            LOGGER.debug('__send_handle_delete_request: Deleting values %s from handle %s.', indices, handle)
         else:
-            LOGGER.debug('__send_handle_delete_request: Deleting handle '+handle+'.')
-        LOGGER.debug('DELETE Request to '+url)
+            LOGGER.debug('__send_handle_delete_request: Deleting handle %s.', handle)
+        LOGGER.debug('DELETE Request to %s', url)
         head = self.__get_headers('DELETE')
         veri = self.__HTTPS_verify
 
         # Make request:
         resp = None
+        send_request = None
+        get_timeout = lambda: self.get_timeout(timeout, deadline, handle, 'DELETE')
         if self.__authentication_method == self.__auth_methods['user_pw']:
-            resp = self.__session.delete(url, headers=head, verify=veri)
+            send_request = lambda: self.__session.delete(url, headers=head, verify=veri, timeout=get_timeout())
         elif self.__authentication_method == self.__auth_methods['cert']:
-            resp = self.__session.delete(url, headers=head, verify=veri, cert=self.__cert_object)
+            send_request = lambda: self.__session.delete(url, headers=head, verify=veri, cert=self.__cert_object, timeout=get_timeout())
+        latency = None
+        if send_request is not None:
+            send_request = self.__rate_limited(send_request, 'write', deadline, handle, 'DELETE')
+            resp, latency = self.__send(send_request, 'DELETE', handle, url, deadline)
         self.__log_request_response_to_file(
             logger=REQUESTLOGGER,
             op='DELETE',
@@ -436,10 +507,24 @@ class HandleSystemConnector(object):
             url=url,
             headers=head,
             verify=veri,
-            resp=resp
+            resp=resp,
+            latency=latency
         )
 
         # Check response for authentication issues:
+        self.check_authentication(resp, op, handle)
+        return resp
+
+    def check_authentication(self, resp, op, handle):
+        '''
+        Raise an exception if the Handle Server's response to a write
+            request says that we are not authenticated.
+
+        :param resp: The server's response.
+        :param op: Name of the operation, only used in the exception.
+        :param handle: The handle, only used in the exception.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`
+        '''
         if pyhandle.hsresponses.not_authenticated(resp):
             raise HandleAuthenticationError(
                 operation=op,
@@ -447,8 +532,131 @@ class HandleSystemConnector(object):
                 response=resp,
                 username=self.__username
             )
-        self.__first_request = False
-        return resp
+
+    def get_request_settings(self, action):
+        '''
+        Return what is needed to send a request of the given kind to the
+            Handle Server, so that requests can also be sent with other HTTP
+            libraries (e.g. by the asynchronous connector).
+
+        :param action: 'GET', 'PUT' or 'DELETE'.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleAuthenticationError`:
+            If a write request is prepared without write access.
+        :return: A tuple of the headers (dict), the HTTPS verification setting
+            (True, False or a path) and the client certificate (None, a path or
+            a tuple of paths to certificate and key).
+        '''
+        if action in ('PUT', 'DELETE') and not self.__has_write_access:
+            raise HandleAuthenticationError(msg=self.__no_auth_message)
+        cert = None
+        if self.__authentication_method == self.__auth_methods['cert']:
+            cert = self.__cert_object
+        return self.__get_headers(action), self.__HTTPS_verify, cert
+
+    def get_json_codec(self):
+        '''
+        :return: The JSON codec used for payloads and responses (see
+            :func:`~pyhandle.jsoncodec.get_json_codec`).
+        '''
+        return self.__json_codec
+
+    def get_request_log(self):
+        '''
+        :return: The structured request log (see
+            :class:`~pyhandle.requestlog.RequestLog`), or None.
+        '''
+        return self.__request_log
+
+    def get_retry_policy(self):
+        '''
+        :return: The retry policy of the requests (see
+            :class:`~pyhandle.retrypolicy.RetryPolicy`).
+        '''
+        return self.__retry_policy
+
+    def get_statistics(self):
+        '''
+        :return: The request statistics (see
+            :class:`~pyhandle.requeststats.RequestStatistics`).
+        '''
+        return self.__statistics
+
+    def get_request_hooks(self):
+        '''
+        :return: The hooks called around every request (see
+            :class:`~pyhandle.hooks.HookChain`), or None.
+        '''
+        return self.__hooks
+
+    def get_timeout(self, timeout=None, deadline=None, handle=None, op=None):
+        '''
+        Return the (connect, read) timeout to use for a request.
+
+        :param timeout: Optional. The timeout passed for this request. Defaults
+            to the timeout passed to the constructor.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :param handle: Optional. The handle, only used in the exception.
+        :param op: Optional. The operation, only used in the exception.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
+        :return: A tuple (connect timeout, read timeout) in seconds.
+        '''
+        return get_request_timeout(self.__timeout, timeout, deadline, handle, op)
+
+    def get_rate_limit_wait(self, kind, deadline=None, handle=None, op=None):
+        '''
+        Reserve the right to send a request under the client-side rate
+            limit, for connectors that wait on their own (e.g. the
+            asynchronous connector).
+
+        :param kind: 'read' or 'write'.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :param handle: Optional. The handle, only used in the exception.
+        :param op: Optional. The operation, only used in the exception.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
+        :return: The number of seconds to wait before sending the request.
+        '''
+        if self.__rate_limiter is None:
+            return 0
+        return self.__rate_limiter.get_wait_time(kind, deadline, handle, op)
+
+    def __send(self, send_request, op, handle, url, deadline, idempotent=True, bytes_sent=0):
+        # Send with retries, and count the request (also if it failed):
+        hooked_request = None
+        if self.__hooks is not None:
+            hooked_request = self.__hooks.before_request(op, handle, url)
+        retries = [0]
+        def on_retry(op):
+            retries[0] += 1
+            self.__statistics.record_retry(op)
+            if hooked_request is not None:
+                hooked_request.retries += 1
+        start = time.monotonic()
+        try:
+            resp = self.__retry_policy.send(send_request, idempotent=idempotent, handle=handle, op=op,
+                deadline=deadline, on_retry=on_retry)
+        except Exception as error:
+            self.__statistics.record_response(op, None, time.monotonic() - start, bytes_sent)
+            if hooked_request is not None:
+                self.__hooks.after_request(hooked_request, error=error)
+            raise
+        latency = time.monotonic() - start
+        resp = get_handle_response(resp, self.__json_codec)
+        resp.retries = retries[0]
+        self.__statistics.record_response(op, resp, latency, bytes_sent)
+        if hooked_request is not None:
+            self.__hooks.after_request(hooked_request, resp)
+        return resp, latency
+
+    def __rate_limited(self, send_request, kind, deadline, handle, op):
+        # Every attempt (also every retry) needs a token:
+        if self.__rate_limiter is None:
+            return send_request
+        def send_rate_limited_request():
+            self.__rate_limiter.acquire(kind, deadline, handle, op)
+            return send_request()
+        return send_rate_limited_request
 
     def check_if_username_exists(self, username):
         '''
@@ -468,9 +676,8 @@ class HandleSystemConnector(object):
         _, handle = pyhandle.utilhandle.remove_index_from_handle(username)
 
         resp = self.send_handle_get_request(handle)
-        resp_content = decoded_response(resp)
         if pyhandle.hsresponses.does_handle_exist(resp):
-            handlerecord_json = json.loads(resp_content)
+            handlerecord_json = resp.body
             if not handlerecord_json['handle'] == handle:
                 raise GenericHandleError(
                     operation='Checking if username exists',
@@ -519,7 +726,7 @@ class HandleSystemConnector(object):
 
 
         else:
-            LOGGER.debug('__getHeader: ACTION is unknown ('+action+')')
+            LOGGER.debug('__getHeader: ACTION is unknown (%s)', action)
         return header
 
     def make_handle_URL(self, handle, indices=None, overwrite=None, other_url=None, **options):
@@ -610,5 +817,11 @@ class HandleSystemConnector(object):
         return url
 
     def __log_request_response_to_file(self, **args):
-        message = pyhandle.utilhandle.make_request_log_message(**args)
-        args['logger'].info(message)
+        if self.__request_log is not None:
+            self.__request_log.log_request(args['op'], args['handle'], args['url'], args['resp'],
+                args.get('latency'), args.get('payload'))
+
+        # Only build the message if someone is listening:
+        if args['logger'].isEnabledFor(logging.INFO):
+            message = pyhandle.utilhandle.make_request_log_message(**args)
+            args['logger'].info(message)
@@ -0,0 +1,142 @@
+'''
+This module provides the request hooks, through which tracing,
+    metrics or fault injection can be plugged into the connectors
+    and searchers without monkeypatching.
+
+A hook is an object with the methods before_request(request) and
+    after_request(request), called around every request sent to the
+    Handle Server (or to the search servlet). Hooks are called in the
+    order in which they are given before the request, and in reverse
+    order after it, like a middleware chain. Exceptions raised by a
+    hook propagate to the caller, so a hook can also make requests
+    fail (hooks that were called before already get their
+    after_request call).
+
+Without hooks, sending a request costs one extra attribute check.
+
+'''
+
+import time
+
+REQUEST_HOOK_ARGS = ['request_hooks']
+
+
+class RequestHook(object):
+    '''
+    Base class for request hooks, whose methods do nothing. Hooks do not
+    have to inherit from it, but may override only what they need.
+    '''
+
+    def before_request(self, request):
+        '''
+        Called before the request is sent.
+
+        :param request: The :class:`HookedRequest`.
+        '''
+        pass
+
+    def after_request(self, request):
+        '''
+        Called when the request is finished, also if it failed.
+
+        :param request: The :class:`HookedRequest`, with the response (or
+            the error), the status and the latency.
+        '''
+        pass
+
+
+class HookedRequest(object):
+    '''
+    The information about one request passed to the hooks. Hooks may
+    keep their own data (e.g. a trace span) in the dict "context".
+    '''
+
+    __slots__ = ('op', 'handle', 'url', 'start', 'latency', 'retries', 'response', 'error', 'context')
+
+    def __init__(self, op, handle, url):
+        '''
+        :param op: The operation: 'GET', 'PUT', 'DELETE' or 'SEARCH'.
+        :param handle: The handle ('' for searches).
+        :param url: The URL.
+        '''
+        self.op = op
+        self.handle = handle
+        self.url = url
+        self.start = time.monotonic()
+        self.latency = None
+        self.retries = 0
+        self.response = None
+        self.error = None
+        self.context = {}
+
+    @property
+    def status(self):
+        '''
+        The HTTP status code of the response, or None.
+        '''
+        if self.response is None:
+            return None
+        return self.response.status_code
+
+
+class HookChain(object):
+    '''
+    Calls a list of hooks around the requests.
+    '''
+
+    def __init__(self, hooks):
+        '''
+        :param hooks: A list of hooks (see :class:`RequestHook`).
+        '''
+        self.hooks = tuple(hooks)
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Get the hook chain for the arguments passed to a client or
+            connector.
+
+        :param args: A dictionary that may contain the key 'request_hooks'
+            (a list of hooks, or a HookChain to use as it is).
+        :return: A HookChain, or None if there are no hooks.
+        '''
+        hooks = args.get('request_hooks')
+        if hooks is None or isinstance(hooks, HookChain):
+            return hooks
+        if len(hooks) == 0:
+            return None
+        return HookChain(hooks)
+
+    def before_request(self, op, handle, url):
+        '''
+        Call the hooks before a request.
+
+        :return: The :class:`HookedRequest` to pass to :meth:`after_request`.
+        '''
+        request = HookedRequest(op, handle, url)
+        for i, hook in enumerate(self.hooks):
+            try:
+                hook.before_request(request)
+            except Exception as error:
+                # The request will not be sent. Finish it for the hooks
+                # that have seen it:
+                self.__finish(request, None, error, self.hooks[:i])
+                raise
+        return request
+
+    def after_request(self, request, response=None, error=None):
+        '''
+        Call the hooks (in reverse order) after a request.
+
+        :param request: The :class:`HookedRequest`.
+        :param response: Optional. The response.
+        :param error: Optional. The exception the request raised.
+        '''
+        self.__finish(request, response, error, self.hooks)
+
+    def __finish(self, request, response, error, hooks):
+        request.latency = time.monotonic() - request.start
+        request.response = response
+        request.error = error
+        for hook in reversed(hooks):
+            hook.after_request(request)
@@ -8,8 +8,7 @@ Author: Merret Buurman (DKRZ), 2015-2016
 
 '''
 
-import json
-from pyhandle.compatibility_helper import decoded_response
+from pyhandle.handleresponse import get_handle_response
 
 def is_redirect_from_http_to_https(response):
     if response.status_code == 302:
@@ -25,8 +24,8 @@ def is_temporary_redirect(response):
     return False
 
 def handle_success(response):
-    response_content = decoded_response(response)
-    if (response.status_code == 200 or response.status_code == 201) and json.loads(response_content)["responseCode"] == 1:
+    response = get_handle_response(response)
+    if (response.status_code == 200 or response.status_code == 201) and response.response_code == 1:
         return True
     return False
 
@@ -36,41 +35,39 @@ def does_handle_exist(response):
     return False
 
 def is_handle_empty(response):
-    response_content = decoded_response(response)
-    if response.status_code == 200 and json.loads(response_content)["responseCode"] == 200:
+    response = get_handle_response(response)
+    if response.status_code == 200 and response.response_code == 200:
         return True
     return False
 
 def was_handle_created(response):
-    response_content = decoded_response(response)
-    if response.status_code == 201 and json.loads(response_content)["responseCode"] == 1:
+    response = get_handle_response(response)
+    if response.status_code == 201 and response.response_code == 1:
         return True
     return False
 
 def handle_not_found(response):
-    response_content = decoded_response(response)
-    if response.status_code == 404 and json.loads(response_content)["responseCode"] == 100:
+    response = get_handle_response(response)
+    if response.status_code == 404 and response.response_code == 100:
         return True
     return False
 
 def not_authenticated(response):
-    response_content = decoded_response(response)
-    try:
-        if response.status_code == 401 or json.loads(response_content)["responseCode"] == 402:
-            # need to put 'OR' because the HS responseCode is not always received!
-            return True
-    except ValueError as e:  # If there is no JSON response.
-        pass 
+    response = get_handle_response(response)
+    # need to put 'OR' because the HS responseCode is not always received!
+    # (response_code is None if there is no JSON response.)
+    if response.status_code == 401 or response.response_code == 402:
+        return True
     return False
 
 def values_not_found(response):
-    response_content = decoded_response(response)
-    if response.status_code == 400 and json.loads(response_content)["responseCode"] == 200:
+    response = get_handle_response(response)
+    if response.status_code == 400 and response.response_code == 200:
         return True
     return False
 
 def handle_already_exists(response):
-    response_content = decoded_response(response)
-    if response.status_code == 409 & json.loads(response_content)["responseCode"] == 101:
+    response = get_handle_response(response)
+    if response.status_code == 409 and response.response_code == 101:
         return True
     return False
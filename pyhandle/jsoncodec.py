@@ -0,0 +1,124 @@
+'''
+This module provides the JSON codecs used to serialize the
+    payloads sent to the Handle Server and to parse its responses.
+
+By default, the fast JSON library "orjson" is used if it is
+    installed, otherwise the "json" module of the standard library.
+    Both produce and accept the same JSON documents.
+
+'''
+
+import json
+import logging
+import pyhandle
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+JSON_CODEC_ARGS = [
+    'json_codec'
+]
+
+
+class StdlibJSONCodec(object):
+    '''
+    Serializes and parses JSON with the "json" module of the standard
+    library.
+    '''
+
+    name = 'json'
+
+    def dumps(self, obj):
+        '''
+        :param obj: The object to serialize.
+        :return: The JSON document as a string.
+        '''
+        return json.dumps(obj)
+
+    def loads(self, data):
+        '''
+        :param data: A JSON document as string or as (UTF-8 encoded) bytes.
+        :raises: :exc:`~ValueError`: If the document is not valid JSON.
+        :return: The parsed object.
+        '''
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    '''
+    Serializes and parses JSON with "orjson". The rare documents that
+    orjson does not support (e.g. integers beyond 64 bit) are handled
+    by the standard library instead.
+    '''
+
+    name = 'orjson'
+
+    def __init__(self):
+        check_orjson_available()
+
+    def dumps(self, obj):
+        '''
+        :param obj: The object to serialize.
+        :return: The JSON document as a string.
+        '''
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            return json.dumps(obj)
+
+    def loads(self, data):
+        '''
+        :param data: A JSON document as string or as (UTF-8 encoded) bytes.
+        :raises: :exc:`~ValueError`: If the document is not valid JSON.
+        :return: The parsed object.
+        '''
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+
+
+def check_orjson_available():
+    '''
+    Check that the optional dependency orjson is installed.
+
+    :raise: :exc:`~ImportError`
+    '''
+    if orjson is None:
+        raise ImportError('The JSON codec "orjson" needs the package "orjson".'
+                          ' Please install it, e.g. using "pip install orjson".')
+
+
+def get_json_codec(codec=None):
+    '''
+    Get the JSON codec for the value passed to a client or connector.
+
+    :param codec: Optional. 'json' (standard library), 'orjson', 'auto'
+        (orjson if installed, otherwise the standard library) or a codec
+        object with the methods dumps() and loads(). Defaults to 'auto'.
+    :raises: :exc:`~ValueError`: If the name is not known.
+    :raises: :exc:`~ImportError`: If 'orjson' is requested, but not
+        installed.
+    :return: A codec object.
+    '''
+    if codec is None or codec == 'auto':
+        if orjson is None:
+            return _STDLIB_CODEC
+        return _ORJSON_CODEC
+    if not isinstance(codec, str):
+        return codec
+    if codec == 'json':
+        return _STDLIB_CODEC
+    if codec == 'orjson':
+        check_orjson_available()
+        return _ORJSON_CODEC
+    raise ValueError('Unknown JSON codec: "'+codec+'". Please use "json", "orjson" or "auto".')
+
+
+_STDLIB_CODEC = StdlibJSONCodec()
+_ORJSON_CODEC = OrjsonCodec() if orjson is not None else None
@@ -7,9 +7,15 @@ class HandleClient(object):
     def retrieve_handle_record(self, handle):
         raise NotImplementedError()
 
+    def retrieve_handle_records(self, handles, max_workers=10, total_timeout=None):
+        raise NotImplementedError()
+
     def modify_handle_value(self, handle, ttl=None, add_if_not_exist=True, **kvpairs):
         raise NotImplementedError()
 
+    def sync_handle_record(self, handle, desired, ttl=None):
+        raise NotImplementedError()
+
     def list_all_handles(self):
         raise NotImplementedError()
 
@@ -22,6 +28,12 @@ class HandleClient(object):
     def delete_handle(self, handle):
         raise NotImplementedError()
 
+    def delete_handles(self, handles, max_workers=10):
+        raise NotImplementedError()
+
+    def delete_handle_values(self, items, max_workers=10):
+        raise NotImplementedError()
+
     def instantiate_with_username_and_password(self, handle_server_url, username, password, **config):
         raise NotImplementedError()
 
@@ -38,6 +50,9 @@ class HandleClient(object):
     def register_handle(self, handle, url, overwrite=False, **args):
         raise NotImplementedError()
 
+    def register_handles(self, items, overwrite=False, max_workers=10):
+        raise NotImplementedError()
+
     def add_admin_entry(self, handle, admin_handle, admin_handle_index, perm):
         raise NotImplementedError()
 
@@ -62,6 +77,12 @@ class HandleClient(object):
     def search_handle_multiple_keys(self, **args):
         raise NotImplementedError()
 
+    def stats(self):
+        raise NotImplementedError()
+
+    def get_slow_requests(self):
+        raise NotImplementedError()
+
 
     @classmethod
     def check_client(cls, client):
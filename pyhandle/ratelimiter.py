@@ -0,0 +1,199 @@
+'''
+This module provides the client-side rate limiter, which keeps
+    the requests sent to the Handle Server (and to the search
+    servlet) below a given rate, so that bulk jobs run at the
+    highest rate the server accepts instead of being throttled.
+
+One RateLimiter can be shared by several clients and threads,
+    either by passing the same instance to all of them, or by
+    giving them the same "rate_limit_group" name.
+
+'''
+
+import logging
+import threading
+import time
+import pyhandle
+from pyhandle.handleexceptions import DeadlineExceededError
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+RATE_LIMIT_ARGS = [
+    'rate_limit',
+    'read_rate_limit',
+    'write_rate_limit',
+    'search_rate_limit',
+    'rate_limit_burst',
+    'rate_limit_group',
+    'rate_limiter'
+]
+
+READ = 'read'
+WRITE = 'write'
+SEARCH = 'search'
+
+
+class TokenBucket(object):
+    '''
+    A thread-safe token bucket: Tokens are added at a constant rate, up
+    to the capacity, and every request takes one. If the bucket is
+    empty, the request waits until the next token is due.
+
+    Waiting requests reserve their token in advance, so that they are
+    served in order and the rate is kept also under contention.
+    '''
+
+    def __init__(self, rate, capacity=None):
+        '''
+        :param rate: The number of tokens added per second.
+        :param capacity: Optional. The maximum number of tokens, i.e. the
+            number of requests that may be sent at once after a pause.
+            Defaults to the rate (one second's worth), but at least 1.
+        '''
+        if rate <= 0:
+            raise ValueError('The rate must be positive, not '+str(rate))
+        if capacity is None:
+            capacity = max(1, rate)
+        if capacity < 1:
+            raise ValueError('The capacity must be at least 1, not '+str(capacity))
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        '''
+        Take a token, possibly one that is only due in the future.
+
+        :return: The number of seconds to wait before the request may be
+            sent (0 if a token was available).
+        '''
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__last) * self.rate)
+            self.__last = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0
+            return -self.__tokens / self.rate
+
+    def cancel(self):
+        '''
+        Give back a reserved token that will not be used.
+        '''
+        with self.__lock:
+            self.__tokens = min(self.capacity, self.__tokens + 1)
+
+
+class RateLimiter(object):
+    '''
+    Limits the rate of requests per kind of operation: reading (GET),
+    writing (PUT and DELETE) and searching. Every kind has its own
+    token bucket; kinds without a rate are not limited.
+    '''
+
+    def __init__(self, read=None, write=None, search=None, burst=None):
+        '''
+        :param read: Optional. The maximum number of read requests per
+            second. Defaults to None (no limit).
+        :param write: Optional. The maximum number of write requests per
+            second. Defaults to None (no limit).
+        :param search: Optional. The maximum number of search requests per
+            second. Defaults to None (no limit).
+        :param burst: Optional. The number of requests (of each kind) that may
+            be sent at once after a pause. Defaults to one second's worth.
+        '''
+        self.__buckets = {}
+        for kind, rate in ((READ, read), (WRITE, write), (SEARCH, search)):
+            if rate is not None:
+                self.__buckets[kind] = TokenBucket(rate, burst)
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Get the rate limiter for the arguments passed to a client or
+            connector. Values may also be strings, as read from a JSON
+            credentials file.
+
+        :param args: A dictionary that may contain the keys 'rate_limiter'
+            (a RateLimiter to use as it is), 'rate_limit' (the default
+            for all kinds), 'read_rate_limit', 'write_rate_limit',
+            'search_rate_limit', 'rate_limit_burst' and 'rate_limit_group'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A RateLimiter, or None if no rate is given.
+        '''
+        if args.get('rate_limiter') is not None:
+            return args['rate_limiter']
+
+        default = args.get('rate_limit')
+        rates = {}
+        for kind in (READ, WRITE, SEARCH):
+            rate = args.get(kind+'_rate_limit')
+            if rate is None:
+                rate = default
+            if rate is not None:
+                rates[kind] = float(rate)
+        if len(rates) == 0:
+            return None
+        if args.get('rate_limit_burst') is not None:
+            rates['burst'] = float(args['rate_limit_burst'])
+
+        if args.get('rate_limit_group') is not None:
+            return get_shared_rate_limiter(args['rate_limit_group'], **rates)
+        return RateLimiter(**rates)
+
+    def get_wait_time(self, kind, deadline=None, handle=None, op=None):
+        '''
+        Reserve the right to send one request of the given kind.
+
+        :param kind: 'read', 'write' or 'search'.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the request must be finished.
+        :param handle: Optional. The handle, only used in the exception.
+        :param op: Optional. The operation, only used in the exception.
+        :raises: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`: If
+            the request could only be sent after the deadline.
+        :return: The number of seconds to wait before sending the request.
+        '''
+        bucket = self.__buckets.get(kind)
+        if bucket is None:
+            return 0
+        wait = bucket.reserve()
+        if deadline is not None and time.time() + wait >= deadline:
+            bucket.cancel()
+            raise DeadlineExceededError(handle=handle, operation=op,
+                msg='Rate limit would delay the request beyond the deadline')
+        if wait > 0:
+            LOGGER.debug('Rate limit (%s): Waiting %.3f s.', kind, wait)
+        return wait
+
+    def acquire(self, kind, deadline=None, handle=None, op=None):
+        '''
+        Wait until one request of the given kind may be sent (see
+            :meth:`get_wait_time`).
+        '''
+        wait = self.get_wait_time(kind, deadline, handle, op)
+        if wait > 0:
+            time.sleep(wait)
+
+
+_SHARED_RATE_LIMITERS = {}
+_SHARED_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_shared_rate_limiter(name, **rates):
+    '''
+    Get the rate limiter of the given group, so that all clients of the
+        group share one rate. The first call for a group creates its
+        rate limiter, the rates passed in later calls are ignored.
+
+    :param name: The name of the group.
+    :param rates: The arguments for the RateLimiter.
+    :return: A RateLimiter.
+    '''
+    with _SHARED_RATE_LIMITERS_LOCK:
+        if name not in _SHARED_RATE_LIMITERS:
+            _SHARED_RATE_LIMITERS[name] = RateLimiter(**rates)
+        return _SHARED_RATE_LIMITERS[name]
@@ -0,0 +1,380 @@
+'''
+This module provides the in-memory cache in which the REST client
+    can keep the handle records it has read, so that hot handles
+    are not requested from the Handle Server again and again.
+
+The cache is bounded (least recently used entries are evicted
+    first) and every entry expires after the shortest "ttl" of
+    the values of its handle record, but never later than a
+    configurable maximum.
+
+Handles that were not found can be remembered in a separate,
+    short-lived cache, so that repeated lookups of dangling
+    references do not cost a round trip each.
+
+A read that was sent before a handle was modified must not store its
+    (outdated) result after the modification: Readers take a
+    generation before sending the request and pass it when storing
+    the result, which is then dropped if the handle was invalidated
+    in between.
+
+'''
+
+import collections
+import copy
+import logging
+import threading
+import time
+import pyhandle
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+RECORD_CACHE_ARGS = [
+    'record_cache_size',
+    'record_cache_max_ttl',
+    'not_found_cache_size',
+    'not_found_cache_ttl'
+]
+
+
+class TTLCache(object):
+    '''
+    A thread-safe, size-bounded LRU cache whose entries expire after
+    a time to live given per entry.
+    '''
+
+    def __init__(self, maxsize):
+        '''
+        :param maxsize: The maximum number of entries.
+        '''
+        if maxsize < 1:
+            raise ValueError('The cache size must be at least 1, not '+str(maxsize))
+        self.__maxsize = maxsize
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        # The generation at which each key was last invalidated, for
+        # the most recently invalidated keys only. Keys forgotten from
+        # there count as invalidated at the newest forgotten generation:
+        self.__generation = 0
+        self.__invalidated_at = collections.OrderedDict()
+        self.__forgotten_at = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        self.__invalidations = 0
+
+    def get(self, key):
+        '''
+        :param key: The key.
+        :return: A tuple (True, value) if the key is cached and not
+            expired, otherwise (False, None).
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self.__entries.move_to_end(key)
+                    self.__hits += 1
+                    return True, value
+                del self.__entries[key]
+                self.__expirations += 1
+            self.__misses += 1
+            return False, None
+
+    def generation(self):
+        '''
+        :return: The current generation, to pass to :meth:`put` for a
+            value that is read after this call.
+        '''
+        with self.__lock:
+            return self.__generation
+
+    def put(self, key, value, ttl, generation=None):
+        '''
+        Store a value. If the cache is full, the least recently used
+            entry is evicted.
+
+        :param key: The key.
+        :param value: The value.
+        :param ttl: The number of seconds the entry is valid. If it is
+            not positive, the value is not stored (and an older entry
+            is removed).
+        :param generation: Optional. The generation taken before the
+            value was read. If the key was invalidated since, the value
+            is outdated and not stored.
+        '''
+        with self.__lock:
+            if generation is not None:
+                if self.__invalidated_at.get(key, self.__forgotten_at) > generation:
+                    return
+            if ttl <= 0:
+                self.__entries.pop(key, None)
+                return
+            self.__entries[key] = (value, time.monotonic() + ttl)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__maxsize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, key):
+        '''
+        Remove an entry, if it exists.
+
+        :param key: The key.
+        :return: True if an entry was removed.
+        '''
+        with self.__lock:
+            self.__generation += 1
+            self.__invalidated_at[key] = self.__generation
+            self.__invalidated_at.move_to_end(key)
+            if len(self.__invalidated_at) > self.__maxsize:
+                _, self.__forgotten_at = self.__invalidated_at.popitem(last=False)
+            if self.__entries.pop(key, None) is None:
+                return False
+            self.__invalidations += 1
+            return True
+
+    def clear(self):
+        '''
+        Remove all entries. The statistics are kept.
+        '''
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        '''
+        :return: A dict with the number of hits, misses, evictions
+            (because the cache was full), expirations, invalidations,
+            the current size and the maximum size.
+        '''
+        with self.__lock:
+            return dict(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                expirations=self.__expirations,
+                invalidations=self.__invalidations,
+                size=len(self.__entries),
+                maxsize=self.__maxsize
+            )
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+
+class RecordCache(object):
+    '''
+    Caches handle records (as nested dicts, as returned by
+    :meth:`~pyhandle.client.resthandleclient.RESTHandleClient.retrieve_handle_record_json`).
+
+    A record expires after the smallest "ttl" of its values, capped by
+    max_ttl. Records are copied when stored and when returned, so
+    callers may modify them freely.
+    '''
+
+    def __init__(self, maxsize=1000, max_ttl=300):
+        '''
+        :param maxsize: Optional. The maximum number of cached records.
+            Defaults to 1000.
+        :param max_ttl: Optional. The maximum number of seconds a record is
+            cached, even if its values have a longer ttl. Defaults to 300.
+        '''
+        self.__cache = TTLCache(maxsize)
+        self.__max_ttl = max_ttl
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Create a record cache from the arguments passed to the client.
+            Values may also be strings, as read from a JSON credentials
+            file.
+
+        :param args: A dictionary that may contain the keys
+            'record_cache_size' and 'record_cache_max_ttl'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A RecordCache, or None if no (or a zero) cache size
+            is given.
+        '''
+        size = args.get('record_cache_size')
+        if size is None or str(size) == '0':
+            return None
+        cache_args = dict(maxsize=pyhandle.util.get_valid_positive_int(size))
+        if args.get('record_cache_max_ttl') is not None:
+            cache_args['max_ttl'] = float(args['record_cache_max_ttl'])
+        return RecordCache(**cache_args)
+
+    def get_ttl(self, handlerecord_json):
+        '''
+        Compute how long a handle record may be cached.
+
+        :param handlerecord_json: The handle record as a nested dict.
+        :return: The smallest "ttl" of the record's values, capped by
+            max_ttl. Values without a (relative) ttl are ignored.
+        '''
+        ttl = self.__max_ttl
+        for entry in handlerecord_json.get('values', []):
+            value_ttl = entry.get('ttl')
+            if isinstance(value_ttl, (int, float)) and not isinstance(value_ttl, bool):
+                ttl = min(ttl, value_ttl)
+        return ttl
+
+    def get(self, handle):
+        '''
+        :param handle: The handle.
+        :return: A copy of the cached handle record, or None if the handle
+            is not cached (or expired).
+        '''
+        found, record = self.__cache.get(self.__key(handle))
+        if not found:
+            return None
+        LOGGER.debug('Handle record of %s taken from cache.', handle)
+        return copy.deepcopy(record)
+
+    def generation(self):
+        '''
+        :return: The generation to pass to :meth:`put` for a record that
+            is read after this call.
+        '''
+        return self.__cache.generation()
+
+    def put(self, handle, handlerecord_json, generation=None):
+        '''
+        Store (a copy of) a handle record.
+
+        :param handle: The handle.
+        :param handlerecord_json: The handle record as a nested dict.
+        :param generation: Optional. The generation taken before reading
+            the record. If the handle was invalidated since, the record is
+            not stored.
+        '''
+        self.__cache.put(self.__key(handle), copy.deepcopy(handlerecord_json), self.get_ttl(handlerecord_json),
+                         generation)
+
+    def invalidate(self, handle):
+        '''
+        Remove a handle record, e.g. after the handle was modified.
+
+        :param handle: The handle.
+        '''
+        if self.__cache.invalidate(self.__key(handle)):
+            LOGGER.debug('Handle record of %s removed from cache.', handle)
+
+    def clear(self):
+        '''
+        Remove all handle records.
+        '''
+        self.__cache.clear()
+
+    def stats(self):
+        '''
+        :return: A dict with the statistics of the cache (hits, misses,
+            evictions, expirations, invalidations, size, maxsize).
+        '''
+        return self.__cache.stats()
+
+    def __key(self, handle):
+        return _get_key(handle)
+
+
+class NotFoundCache(object):
+    '''
+    Remembers handles that do not exist (i.e. for which the Handle
+    Server answered "handle not found") for a fixed, short time.
+
+    The time to live is separate from the one of the record cache, as
+    a handle that does not exist yet may be registered by someone else
+    at any time.
+    '''
+
+    def __init__(self, maxsize=1000, ttl=30):
+        '''
+        :param maxsize: Optional. The maximum number of cached handles.
+            Defaults to 1000.
+        :param ttl: Optional. The number of seconds a handle is remembered
+            as not existing. Defaults to 30.
+        '''
+        self.__cache = TTLCache(maxsize)
+        self.__ttl = ttl
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Create a not-found cache from the arguments passed to the client.
+            Values may also be strings, as read from a JSON credentials
+            file.
+
+        :param args: A dictionary that may contain the keys
+            'not_found_cache_size' and 'not_found_cache_ttl'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A NotFoundCache, or None if no (or a zero) cache size
+            is given.
+        '''
+        size = args.get('not_found_cache_size')
+        if size is None or str(size) == '0':
+            return None
+        cache_args = dict(maxsize=pyhandle.util.get_valid_positive_int(size))
+        if args.get('not_found_cache_ttl') is not None:
+            cache_args['ttl'] = float(args['not_found_cache_ttl'])
+        return NotFoundCache(**cache_args)
+
+    def contains(self, handle):
+        '''
+        :param handle: The handle.
+        :return: True if the handle was recently found not to exist.
+        '''
+        found, _ = self.__cache.get(_get_key(handle))
+        if found:
+            LOGGER.debug('Handle %s not found (cached).', handle)
+        return found
+
+    def generation(self):
+        '''
+        :return: The generation to pass to :meth:`add` for a handle that
+            is looked up after this call.
+        '''
+        return self.__cache.generation()
+
+    def add(self, handle, generation=None):
+        '''
+        Remember that a handle does not exist.
+
+        :param handle: The handle.
+        :param generation: Optional. The generation taken before looking
+            up the handle. If the handle was invalidated since, it is not
+            remembered.
+        '''
+        self.__cache.put(_get_key(handle), True, self.__ttl, generation)
+
+    def invalidate(self, handle):
+        '''
+        Forget that a handle does not exist, e.g. after it was registered.
+
+        :param handle: The handle.
+        '''
+        if self.__cache.invalidate(_get_key(handle)):
+            LOGGER.debug('Handle %s removed from not-found cache.', handle)
+
+    def clear(self):
+        '''
+        Forget all handles.
+        '''
+        self.__cache.clear()
+
+    def stats(self):
+        '''
+        :return: A dict with the statistics of the cache (hits, misses,
+            evictions, expirations, invalidations, size, maxsize).
+        '''
+        return self.__cache.stats()
+
+
+def _get_key(handle):
+    # "hdl:prefix/suffix" and "prefix/suffix" are the same handle:
+    for scheme in ('hdl:', 'doi:'):
+        if handle.startswith(scheme):
+            return handle[len(scheme):]
+    return handle
@@ -0,0 +1,208 @@
+'''
+This module provides the structured request log, which writes one
+    JSON line per request sent to the Handle Server (and to the search
+    servlet): operation, handle, URL, status, latency and byte sizes.
+
+Unlike the text dump of the logger "log_all_requests_of_testcases_to_file",
+    it is meant to stay switched on in production: Response bodies are
+    omitted (or truncated), only a sample of the requests may be logged,
+    and the lines are written by a background thread, so that requests
+    never wait for the disk.
+
+One RequestLog can be shared by several clients and threads. Clients
+    that are given the same file name share one RequestLog.
+
+'''
+
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import pyhandle
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+REQUEST_LOG_ARGS = [
+    'request_log',
+    'request_log_sample_rate',
+    'request_log_body_bytes'
+]
+
+_STOP = object()
+
+
+class RequestLog(object):
+    '''
+    Writes one JSON line per logged request to a file. Entries are put
+    into a bounded queue and written (and flushed at least every
+    flush_interval seconds) by a daemon thread. If the queue is full,
+    entries are dropped instead of slowing down the requests.
+    '''
+
+    def __init__(self, path, sample_rate=1.0, body_bytes=0, buffer_size=10000, flush_interval=1.0):
+        '''
+        :param path: The file to append the JSON lines to.
+        :param sample_rate: Optional. The fraction of requests that are
+            logged, between 0 and 1. Defaults to 1 (all requests).
+        :param body_bytes: Optional. The number of bytes of the response
+            body to include. Defaults to 0 (no body).
+        :param buffer_size: Optional. The maximum number of entries waiting
+            to be written. Defaults to 10000.
+        :param flush_interval: Optional. The maximum number of seconds an
+            entry is kept in the file buffer. Defaults to 1.
+        '''
+        if not 0 <= sample_rate <= 1:
+            raise ValueError('The sample rate must be between 0 and 1, not '+str(sample_rate))
+        if body_bytes < 0:
+            raise ValueError('The number of body bytes must not be negative, not '+str(body_bytes))
+        self.path = path
+        self.sample_rate = sample_rate
+        self.body_bytes = body_bytes
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.__queue = queue.Queue(buffer_size)
+        self.__file = open(path, 'a', encoding='utf-8')
+        self.__closed = False
+        self.__close_lock = threading.Lock()
+        self.__writer = threading.Thread(target=self.__write_entries, name='pyhandle-request-log')
+        self.__writer.daemon = True
+        self.__writer.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Get the request log for the arguments passed to a client or
+            connector. Values may also be strings, as read from a JSON
+            credentials file.
+
+        :param args: A dictionary that may contain the keys 'request_log'
+            (a RequestLog to use as it is, or the name of the file to write
+            to), 'request_log_sample_rate' and 'request_log_body_bytes'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A RequestLog, or None if no request log is given.
+        '''
+        request_log = args.get('request_log')
+        if request_log is None or isinstance(request_log, RequestLog):
+            return request_log
+
+        settings = {}
+        if args.get('request_log_sample_rate') is not None:
+            settings['sample_rate'] = float(args['request_log_sample_rate'])
+        if args.get('request_log_body_bytes') is not None:
+            settings['body_bytes'] = int(args['request_log_body_bytes'])
+        return get_shared_request_log(request_log, **settings)
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def log_request(self, op, handle, url, resp, latency=None, payload=None):
+        '''
+        Log one request, if it is part of the sample.
+
+        :param op: The HTTP method, or 'SEARCH'.
+        :param handle: The handle that the request is about.
+        :param url: The URL the request was sent to.
+        :param resp: The response, or None if no request was sent.
+        :param latency: Optional. The number of seconds until the response
+            was there (including retries).
+        :param payload: Optional. The payload sent with the request.
+        '''
+        if self.__closed:
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        content = None if resp is None else resp.content
+        entry = {
+            'time': time.time(),
+            'op': op,
+            'handle': handle,
+            'url': url,
+            'status': None if resp is None else resp.status_code,
+            'latency_ms': None if latency is None else round(latency * 1000, 3),
+            'request_bytes': 0 if payload is None else len(payload.encode('utf-8')),
+            'response_bytes': 0 if content is None else len(content)
+        }
+        if self.body_bytes > 0 and content:
+            if isinstance(content, bytes):
+                content = content.decode('utf-8', 'replace')
+            entry['body'] = content[:self.body_bytes]
+            entry['body_truncated'] = len(content) > self.body_bytes
+
+        try:
+            self.__queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        '''
+        Wait until all entries logged so far are written to the file.
+        '''
+        written = threading.Event()
+        with self.__close_lock:
+            if self.__closed:
+                return
+            self.__queue.put(written)
+        written.wait()
+
+    def close(self):
+        '''
+        Write the remaining entries and close the file. Requests logged
+            afterwards are ignored.
+        '''
+        with self.__close_lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        self.__queue.put(_STOP)
+        self.__writer.join()
+        self.__file.close()
+        if self.dropped > 0:
+            LOGGER.warning('Request log %s: %s entries were dropped, as the buffer was full.',
+                           self.path, self.dropped)
+
+    def __write_entries(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                entry = self.__queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                entry = None
+            if entry is _STOP:
+                self.__file.flush()
+                return
+            elif isinstance(entry, threading.Event):
+                self.__file.flush()
+                entry.set()
+            elif entry is not None:
+                self.__file.write(json.dumps(entry)+'\n')
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.__file.flush()
+                last_flush = time.monotonic()
+
+
+_SHARED_REQUEST_LOGS = {}
+_SHARED_REQUEST_LOGS_LOCK = threading.Lock()
+
+
+def get_shared_request_log(path, **settings):
+    '''
+    Get the request log writing to the given file, so that all clients
+        logging to one file share one writer. The first call for a file
+        creates its request log, the settings passed in later calls are
+        ignored (unless the request log of the file was closed).
+
+    :param path: The name of the file.
+    :param settings: The arguments for the RequestLog.
+    :return: A RequestLog.
+    '''
+    with _SHARED_REQUEST_LOGS_LOCK:
+        if path not in _SHARED_REQUEST_LOGS or _SHARED_REQUEST_LOGS[path].closed:
+            _SHARED_REQUEST_LOGS[path] = RequestLog(path, **settings)
+        return _SHARED_REQUEST_LOGS[path]
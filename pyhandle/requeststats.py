@@ -0,0 +1,279 @@
+'''
+This module provides the request statistics of the clients: the
+    number of requests per operation and outcome, latency histograms,
+    the bytes sent and received, the retries, and the statistics of
+    the clients' caches.
+
+Recording a request costs one lock and a few additions, so the
+    statistics are always on. They can be exported as dict or in the
+    Prometheus text format.
+
+'''
+
+import bisect
+import logging
+import threading
+import pyhandle
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+REQUEST_STATS_ARGS = ['statistics']
+
+# Upper bounds (in seconds) of the latency histogram buckets:
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SUCCESS = 'success'
+NOT_FOUND = 'not_found'
+CLIENT_ERROR = 'client_error'
+SERVER_ERROR = 'server_error'
+ERROR = 'error'
+
+
+def get_outcome(response):
+    '''
+    Classify the response to a request.
+
+    :param response: The response, or None if no response was received.
+    :return: 'success', 'not_found', 'client_error', 'server_error' or
+        'error' (no response).
+    '''
+    if response is None:
+        return ERROR
+    status_code = response.status_code
+    if status_code < 400:
+        return SUCCESS
+    if status_code == 404:
+        return NOT_FOUND
+    if status_code < 500:
+        return CLIENT_ERROR
+    return SERVER_ERROR
+
+
+class LatencyHistogram(object):
+    '''
+    A histogram with fixed buckets. It is not thread-safe by itself.
+    '''
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        '''
+        :param bounds: Optional. The ascending upper bounds of the buckets,
+            in seconds. One more bucket collects all larger values.
+        '''
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        '''
+        :param value: The latency in seconds.
+        '''
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        '''
+        Estimate a percentile by linear interpolation within its bucket.
+
+        :param percent: The percentile, e.g. 95.
+        :return: The estimated latency in seconds, or None if nothing was
+            observed.
+        '''
+        if self.count == 0:
+            return None
+        rank = percent / 100.0 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count > 0 and cumulative + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+
+class RequestStatistics(object):
+    '''
+    Thread-safe statistics of the requests sent by one client (shared by
+    its connector and searcher).
+    '''
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS):
+        '''
+        :param latency_buckets: Optional. The upper bounds of the latency
+            histogram buckets, in seconds.
+        '''
+        self.__latency_buckets = latency_buckets
+        self.__lock = threading.Lock()
+        self.__caches = {}
+        self.reset()
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Get the statistics for the arguments passed to a client or
+            connector.
+
+        :param args: A dictionary that may contain the key 'statistics' (a
+            RequestStatistics to use, e.g. to share it between clients).
+        :return: A RequestStatistics.
+        '''
+        if args.get('statistics') is not None:
+            return args['statistics']
+        return RequestStatistics()
+
+    def reset(self):
+        '''
+        Set all counters to zero. The caches' statistics are not affected.
+        '''
+        with self.__lock:
+            self.__requests = {}
+            self.__latencies = {}
+            self.__retries = {}
+            self.__bytes_sent = 0
+            self.__bytes_received = 0
+
+    def add_cache(self, name, cache):
+        '''
+        Include the statistics of a cache in the export.
+
+        :param name: The name of the cache, e.g. 'record_cache'.
+        :param cache: An object whose method stats() returns a dict with
+            (at least) the number of hits and misses.
+        '''
+        with self.__lock:
+            self.__caches[name] = cache
+
+    def record_request(self, op, outcome, latency=None, bytes_sent=0, bytes_received=0):
+        '''
+        Count one request.
+
+        :param op: The operation, e.g. 'GET' or 'SEARCH'.
+        :param outcome: The outcome (see :func:`get_outcome`).
+        :param latency: Optional. The number of seconds the request took.
+        :param bytes_sent: Optional. The size of the payload.
+        :param bytes_received: Optional. The size of the response body.
+        '''
+        with self.__lock:
+            key = (op, outcome)
+            self.__requests[key] = self.__requests.get(key, 0) + 1
+            if latency is not None:
+                histogram = self.__latencies.get(op)
+                if histogram is None:
+                    histogram = self.__latencies[op] = LatencyHistogram(self.__latency_buckets)
+                histogram.observe(latency)
+            self.__bytes_sent += bytes_sent
+            self.__bytes_received += bytes_received
+
+    def record_response(self, op, response, latency=None, bytes_sent=0):
+        '''
+        Count one request by its response (see :meth:`record_request`).
+
+        :param response: The response, or None if none was received.
+        '''
+        content = None if response is None else response.content
+        self.record_request(op, get_outcome(response), latency, bytes_sent,
+                            0 if content is None else len(content))
+
+    def record_retry(self, op):
+        '''
+        Count one retry of a request.
+
+        :param op: The operation.
+        '''
+        with self.__lock:
+            self.__retries[op] = self.__retries.get(op, 0) + 1
+
+    def as_dict(self):
+        '''
+        :return: A dict with the number of requests per operation and
+            outcome ('requests'), the number of requests with count, sum,
+            p50, p95, p99 and max of the latencies per operation
+            ('latency', in seconds), 'bytes_sent', 'bytes_received',
+            the retries per operation ('retries') and the statistics of
+            each cache ('caches').
+        '''
+        with self.__lock:
+            requests = {}
+            for (op, outcome), count in self.__requests.items():
+                requests.setdefault(op, {})[outcome] = count
+            latency = {}
+            for op, histogram in self.__latencies.items():
+                latency[op] = dict(
+                    count=histogram.count,
+                    sum=histogram.sum,
+                    p50=histogram.percentile(50),
+                    p95=histogram.percentile(95),
+                    p99=histogram.percentile(99),
+                    max=histogram.max
+                )
+            result = dict(
+                requests=requests,
+                latency=latency,
+                bytes_sent=self.__bytes_sent,
+                bytes_received=self.__bytes_received,
+                retries=dict(self.__retries)
+            )
+            caches = list(self.__caches.items())
+        result['caches'] = dict((name, cache.stats()) for name, cache in caches)
+        return result
+
+    def to_prometheus(self, prefix='pyhandle'):
+        '''
+        Export the statistics in the Prometheus text format.
+
+        :param prefix: Optional. The prefix of the metric names. Defaults
+            to 'pyhandle'.
+        :return: A string.
+        '''
+        with self.__lock:
+            requests = sorted(self.__requests.items())
+            histograms = sorted((op, list(h.counts), h.sum, h.count) for op, h in self.__latencies.items())
+            bytes_sent = self.__bytes_sent
+            bytes_received = self.__bytes_received
+            retries = sorted(self.__retries.items())
+            caches = sorted(self.__caches.items())
+
+        lines = []
+        def add_metric(name, kind, description):
+            lines.append('# HELP %s_%s %s' % (prefix, name, description))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+        add_metric('requests_total', 'counter', 'Requests sent, by operation and outcome.')
+        for (op, outcome), count in requests:
+            lines.append('%s_requests_total{op="%s",outcome="%s"} %d' % (prefix, op, outcome, count))
+
+        add_metric('request_duration_seconds', 'histogram', 'Latency of the requests, by operation.')
+        bounds = [repr(float(bound)) for bound in self.__latency_buckets] + ['+Inf']
+        for op, counts, total, count in histograms:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append('%s_request_duration_seconds_bucket{op="%s",le="%s"} %d' % (prefix, op, bound, cumulative))
+            lines.append('%s_request_duration_seconds_sum{op="%s"} %r' % (prefix, op, total))
+            lines.append('%s_request_duration_seconds_count{op="%s"} %d' % (prefix, op, count))
+
+        add_metric('sent_bytes_total', 'counter', 'Bytes sent as request payload.')
+        lines.append('%s_sent_bytes_total %d' % (prefix, bytes_sent))
+        add_metric('received_bytes_total', 'counter', 'Bytes received as response body.')
+        lines.append('%s_received_bytes_total %d' % (prefix, bytes_received))
+
+        add_metric('retries_total', 'counter', 'Retries of failed requests, by operation.')
+        for op, count in retries:
+            lines.append('%s_retries_total{op="%s"} %d' % (prefix, op, count))
+
+        add_metric('cache_hits_total', 'counter', 'Cache hits, by cache.')
+        cache_stats = [(name, cache.stats()) for name, cache in caches]
+        for name, stats in cache_stats:
+            lines.append('%s_cache_hits_total{cache="%s"} %d' % (prefix, name, stats['hits']))
+        add_metric('cache_misses_total', 'counter', 'Cache misses, by cache.')
+        for name, stats in cache_stats:
+            lines.append('%s_cache_misses_total{cache="%s"} %d' % (prefix, name, stats['misses']))
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,312 @@
+'''
+This module provides the retry policy and the circuit breaker
+    used by the HandleSystemConnector to cope with temporary
+    failures of the Handle Server (e.g. 502/503 responses or
+    reset connections).
+
+'''
+
+import email.utils
+import logging
+import random
+import threading
+import time
+import requests
+import pyhandle
+from pyhandle.handleexceptions import HandleServerUnavailableError
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+RETRY_ARGS = [
+    'max_retries',
+    'retry_backoff_factor',
+    'retry_backoff_max',
+    'retry_status_codes',
+    'circuit_breaker_threshold',
+    'circuit_breaker_timeout'
+]
+
+
+class CircuitBreaker(object):
+    '''
+    Fails fast while the Handle Server is down.
+
+    After "threshold" consecutive failed requests, the breaker opens and
+    all requests fail immediately. After "timeout" seconds, one trial
+    request is let through: if it succeeds, the breaker closes again,
+    otherwise it stays open for another "timeout" seconds.
+    '''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=0, timeout=30):
+        '''
+        :param threshold: Optional. The number of consecutive failures
+            that open the breaker. 0 disables the breaker. Defaults to 0.
+        :param timeout: Optional. The number of seconds the breaker stays
+            open before a trial request is allowed. Defaults to 30.
+        '''
+        self.__threshold = threshold
+        self.__timeout = timeout
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_running = False
+        self.__lock = threading.Lock()
+
+    def get_state(self):
+        '''
+        :return: 'closed', 'open' or 'half-open'.
+        '''
+        with self.__lock:
+            return self.__get_state()
+
+    def __get_state(self):
+        if self.__opened_at is None:
+            return self.CLOSED
+        if time.time() - self.__opened_at >= self.__timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self, handle=None):
+        '''
+        Check whether a request may be sent.
+
+        :param handle: Optional. The handle, only used in the exception.
+        :raises: :exc:`~pyhandle.handleexceptions.HandleServerUnavailableError`:
+            If the breaker is open.
+        '''
+        with self.__lock:
+            state = self.__get_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self.__trial_running:
+                LOGGER.info('Circuit breaker half-open, sending a trial request.')
+                self.__trial_running = True
+                return
+            remaining = max(0, self.__timeout - (time.time() - self.__opened_at))
+        raise HandleServerUnavailableError(
+            handle=handle,
+            msg='Circuit breaker is open after '+str(self.__failures)+
+                ' consecutive failures, retry in '+str(int(remaining)+1)+' s'
+        )
+
+    def record_success(self):
+        '''
+        Record a request that reached a working Handle Server.
+        '''
+        with self.__lock:
+            if self.__opened_at is not None:
+                LOGGER.info('Circuit breaker closed.')
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial_running = False
+
+    def cancel_trial(self):
+        '''
+        Record a request that failed for a reason that says nothing
+            about the Handle Server, so that another trial request
+            may be sent.
+        '''
+        with self.__lock:
+            self.__trial_running = False
+
+    def record_failure(self):
+        '''
+        Record a request that failed because of the Handle Server.
+        '''
+        with self.__lock:
+            self.__failures += 1
+            self.__trial_running = False
+            if self.__threshold and self.__failures >= self.__threshold:
+                if self.__opened_at is None:
+                    LOGGER.warning('Circuit breaker opened after %s consecutive failures.', self.__failures)
+                self.__opened_at = time.time()
+
+
+class RetryPolicy(object):
+    '''
+    Retries idempotent requests that failed temporarily, waiting with
+    exponential backoff and full jitter in between. A "Retry-After"
+    header sent by the server is honoured.
+
+    Only idempotent requests (GET, DELETE, PUT that overwrites) are
+    retried, as retrying a request that may have reached the server
+    could otherwise have a different result.
+    '''
+
+    def __init__(self, max_retries=0, backoff_factor=0.5, backoff_max=30,
+                 status_codes=(429, 502, 503, 504), circuit_breaker=None):
+        '''
+        :param max_retries: Optional. How often a request is retried. 0
+            disables retries. Defaults to 0.
+        :param backoff_factor: Optional. The base of the waiting time in
+            seconds. Before the n-th retry, a random time between 0 and
+            backoff_factor * 2^(n-1) seconds is waited. Defaults to 0.5.
+        :param backoff_max: Optional. The maximum waiting time in seconds,
+            also for Retry-After. Defaults to 30.
+        :param status_codes: Optional. The HTTP status codes that are
+            retried. Defaults to 429, 502, 503 and 504.
+        :param circuit_breaker: Optional. A CircuitBreaker. Defaults to None
+            (no circuit breaker).
+        '''
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.status_codes = frozenset(status_codes)
+        self.circuit_breaker = circuit_breaker
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Create a retry policy (with circuit breaker) from the arguments
+            passed to a connector. Values may also be strings, as read
+            from a JSON credentials file.
+
+        :param args: A dictionary that may contain the keys 'max_retries',
+            'retry_backoff_factor', 'retry_backoff_max', 'retry_status_codes',
+            'circuit_breaker_threshold' and 'circuit_breaker_timeout'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A RetryPolicy.
+        '''
+        policy_args = {}
+        breaker_args = {}
+        if args.get('max_retries') is not None:
+            policy_args['max_retries'] = int(args['max_retries'])
+        if args.get('retry_backoff_factor') is not None:
+            policy_args['backoff_factor'] = float(args['retry_backoff_factor'])
+        if args.get('retry_backoff_max') is not None:
+            policy_args['backoff_max'] = float(args['retry_backoff_max'])
+        if args.get('retry_status_codes') is not None:
+            codes = args['retry_status_codes']
+            if isinstance(codes, str):
+                codes = codes.split(',')
+            policy_args['status_codes'] = [int(code) for code in codes]
+        if args.get('circuit_breaker_threshold') is not None:
+            breaker_args['threshold'] = int(args['circuit_breaker_threshold'])
+        if args.get('circuit_breaker_timeout') is not None:
+            breaker_args['timeout'] = float(args['circuit_breaker_timeout'])
+
+        for name, value in list(policy_args.items()) + list(breaker_args.items()):
+            if name != 'status_codes' and value < 0:
+                raise ValueError('Negative value for '+name+': '+str(value))
+
+        return RetryPolicy(circuit_breaker=CircuitBreaker(**breaker_args), **policy_args)
+
+    def get_backoff_time(self, retry_number, response=None):
+        '''
+        Compute how long to wait before a retry.
+
+        :param retry_number: The number of the retry (starting at 1).
+        :param response: Optional. The failed response, to read the
+            Retry-After header from.
+        :return: The number of seconds to wait.
+        '''
+        retry_after = self.__get_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        cap = min(self.backoff_max, self.backoff_factor * (2 ** (retry_number - 1)))
+        return random.uniform(0, cap)
+
+    def __get_retry_after(self, response):
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+        value = headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date is None:
+            return None
+        return max(0, date.timestamp() - time.time())
+
+    def is_retryable_response(self, response):
+        '''
+        :return: True if the response is a temporary failure.
+        '''
+        return response is not None and response.status_code in self.status_codes
+
+    def send(self, send_request, idempotent=True, handle=None, op=None, deadline=None, on_retry=None):
+        '''
+        Send a request, retrying it on temporary failures.
+
+        :param send_request: A function without arguments that sends the
+            request and returns the response.
+        :param idempotent: Optional. If False, the request is sent only once.
+            Defaults to True.
+        :param handle: Optional. The handle, only used in log messages and
+            exceptions.
+        :param op: Optional. The name of the operation, only used in log
+            messages.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) after which no retry is started.
+        :param on_retry: Optional. A function that is called with the
+            operation before every retry (e.g. to count the retries).
+        :raises: :exc:`~pyhandle.handleexceptions.HandleServerUnavailableError`:
+            If the circuit breaker is open.
+        :raises: :exc:`~requests.exceptions.ConnectionError` or
+            :exc:`~requests.exceptions.Timeout`: If the last attempt failed
+            to connect.
+        :return: The last response.
+        '''
+        retries = self.max_retries if idempotent else 0
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request(handle)
+
+            response = None
+            error = None
+            try:
+                response = send_request()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                error = exc
+                self.__record(failed=True)
+                if attempt >= retries:
+                    raise
+                LOGGER.info('Request failed (%s, handle %s): %s.', op, handle, exc.__class__.__name__)
+            except Exception:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.cancel_trial()
+                raise
+            else:
+                failed = self.is_retryable_response(response)
+                if response.status_code == 429:
+                    # Being rate limited says nothing about whether the
+                    # server is down or up again:
+                    if self.circuit_breaker is not None:
+                        self.circuit_breaker.cancel_trial()
+                else:
+                    self.__record(failed=failed)
+                if not failed or attempt >= retries:
+                    return response
+                LOGGER.info('Request failed (%s, handle %s): HTTP %s.', op, handle, response.status_code)
+
+            attempt += 1
+            wait = self.get_backoff_time(attempt, response)
+            if deadline is not None and time.time() + wait >= deadline:
+                LOGGER.info('No retry, as the deadline would be exceeded.')
+                if error is not None:
+                    raise error
+                return response
+            LOGGER.info('Retry %s/%s in %.2f s.', attempt, retries, wait)
+            time.sleep(wait)
+            if on_retry is not None:
+                on_retry(op)
+
+    def __record(self, failed):
+        if self.circuit_breaker is None:
+            return
+        if failed:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
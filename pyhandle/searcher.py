@@ -9,11 +9,20 @@ Author: Merret Buurman (DKRZ), 2015-2016
 
 import logging
 import re
+import time
 import requests
-import json
 import pyhandle
+import pyhandle.utilhandle
 
+from pyhandle.util.sessionutils import SESSION_ARGS, TIMEOUT_ARGS, get_session_settings, make_session
+from pyhandle.util.sessionutils import get_timeout_settings, get_request_timeout
 from pyhandle.handleexceptions import ReverseLookupException
+from pyhandle.handleresponse import get_handle_response
+from pyhandle.ratelimiter import RATE_LIMIT_ARGS, RateLimiter
+from pyhandle.jsoncodec import JSON_CODEC_ARGS, get_json_codec
+from pyhandle.requestlog import REQUEST_LOG_ARGS, RequestLog
+from pyhandle.requeststats import REQUEST_STATS_ARGS, RequestStatistics
+from pyhandle.hooks import REQUEST_HOOK_ARGS, HookChain
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(pyhandle.util.NullHandler())
@@ -46,7 +55,7 @@ class Searcher(object):
             'password',
             'allowed_search_keys',
             'HTTPS_verify'
-        ]
+        ] + SESSION_ARGS + TIMEOUT_ARGS + RATE_LIMIT_ARGS + JSON_CODEC_ARGS + REQUEST_LOG_ARGS + REQUEST_STATS_ARGS + REQUEST_HOOK_ARGS
         pyhandle.util.add_missing_optional_args_with_value_none(args, optional_args)
 
         # Args that the constructor understands:
@@ -75,13 +84,20 @@ class Searcher(object):
 
         # Set them:
         self.__store_args_or_set_to_defaults(args, defaults)
+        self.__session_settings = get_session_settings(args)
+        self.__timeout = get_timeout_settings(args)
+        self.__rate_limiter = RateLimiter.from_args(args)
+        self.__json_codec = get_json_codec(args['json_codec'])
+        self.__request_log = RequestLog.from_args(args)
+        self.__statistics = RequestStatistics.from_args(args)
+        self.__hooks = HookChain.from_args(args)
         self.__setup_search_access()
 
         LOGGER.debug('End of instantiation of the search module.')
 
     def __setup_search_access(self):
         self.__check_and_set_search_access()
-        self.__session = requests.Session()
+        self.__session = make_session(**self.__session_settings)
         if self.__session is None:
             LOGGER.debug('Search session could not be created.')
         else:
@@ -106,11 +122,11 @@ class Searcher(object):
         else:
             msg = 'Reverse lookup not possible.'
             if self.__user is None and self.__password is None:
-                LOGGER.debug(msg+' Neither username nor password were provided.')
+                LOGGER.debug('%s Neither username nor password were provided.', msg)
             elif self.__user is None:
-                LOGGER.debug(msg+' Username not provided. Password is '+str(self.__password))
+                LOGGER.debug('%s Username not provided. Password is %s', msg, self.__password)
             else:
-                LOGGER.debug(msg+' Password not provided. Username is '+str(self.__user))
+                LOGGER.debug('%s Password not provided. Username is %s', msg, self.__user)
             return False
 
     def __check_and_set_search_url(self):
@@ -122,29 +138,95 @@ class Searcher(object):
                 self.__reverselookup_url_extension.strip('/')
             )
             return True
-            LOGGER.debug('Reverse lookup endpoint set to '+str(self.__search_url))
+            LOGGER.debug('Reverse lookup endpoint set to %s', self.__search_url)
         else:
             msg = 'Reverse lookup not possible.'
             if (self.__reverselookup_baseuri is None and
                 self.__reverselookup_url_extension is None):
-                LOGGER.debug(msg+' No URL for reverse lookup provided.')
+                LOGGER.debug('%s No URL for reverse lookup provided.', msg)
             elif self.__reverselookup_baseuri is None:
-                LOGGER.debug(msg+' No URL for reverse lookup provided.')
+                LOGGER.debug('%s No URL for reverse lookup provided.', msg)
             else:
-                LOGGER.debug(msg+' No URL path for reverse lookup provided.')
+                LOGGER.debug('%s No URL path for reverse lookup provided.', msg)
             return False
 
     def get_search_endpoint(self):
         if self.__has_search_access:
             return self.__search_url
         else:
-            LOGGER.error(
-                'Searching not possible. Reason: No access '+
-                'to search system (endpoint: '+
-                str(self.__search_url)+').'
-            )
+            LOGGER.error('Searching not possible. Reason: No access to search system (endpoint: %s).',
+                self.__search_url)
             return None
 
+    def get_search_request_settings(self, query):
+        '''
+        Return what is needed to send a search request to the reverse
+            lookup servlet, so that requests can also be sent with other
+            HTTP libraries (e.g. by the asynchronous searcher).
+
+        :param query: The query string, as created by create_revlookup_query.
+        :return: A tuple of the complete URL, the headers (dict) and the
+            HTTPS verification setting.
+        '''
+        entirequery = self.__search_url+'?'+query.lstrip('?')
+        return entirequery, self.__header, self.__HTTPS_verify
+
+    def get_json_codec(self):
+        '''
+        :return: The JSON codec used to parse the responses.
+        '''
+        return self.__json_codec
+
+    def get_request_log(self):
+        '''
+        :return: The structured request log, or None.
+        '''
+        return self.__request_log
+
+    def get_statistics(self):
+        '''
+        :return: The request statistics.
+        '''
+        return self.__statistics
+
+    def get_request_hooks(self):
+        '''
+        :return: The hooks called around every search request, or None.
+        '''
+        return self.__hooks
+
+    def get_timeout(self, timeout=None, deadline=None):
+        '''
+        Return the (connect, read) timeout to use for a search request.
+
+        :param timeout: Optional. The timeout passed for this search. Defaults
+            to the timeout passed to the constructor.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the search must be finished.
+        :raise: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
+        :return: A tuple (connect timeout, read timeout) in seconds.
+        '''
+        return get_request_timeout(self.__timeout, timeout, deadline, op='searching handles')
+
+    def get_rate_limit_wait(self, deadline=None):
+        '''
+        Reserve the right to send a search request under the client-side
+            rate limit, for searchers that wait on their own (e.g. the
+            asynchronous searcher).
+
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the search must be finished.
+        :raise: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
+        :return: The number of seconds to wait before sending the request.
+        '''
+        if self.__rate_limiter is None:
+            return 0
+        return self.__rate_limiter.get_wait_time('search', deadline, op='searching handles')
+
+    def has_search_access(self):
+        # pylint: disable=missing-docstring
+        return self.__has_search_access
+
     def __store_args_or_set_to_defaults(self, args, defaults):
 
         LOGGER.debug('Setting the attributes:')
@@ -153,33 +235,33 @@ class Searcher(object):
             self.__HTTPS_verify = pyhandle.util.get_valid_https_verify(
                 args['HTTPS_verify']
             )
-            LOGGER.debug(' - https_verify set to: '+str(self.__HTTPS_verify))
+            LOGGER.debug(' - https_verify set to: %s', self.__HTTPS_verify)
         else:
             self.__HTTPS_verify = defaults['HTTPS_verify']
-            LOGGER.debug(' - https_verify set to default: '+str(self.__HTTPS_verify))
+            LOGGER.debug(' - https_verify set to default: %s', self.__HTTPS_verify)
 
         if args['allowed_search_keys'] is not None: # Without this check, empty lists are not found!
             self.__allowed_search_keys = args['allowed_search_keys']
-            LOGGER.debug(' - allowed_search_keys set to: '+str(self.__allowed_search_keys))
+            LOGGER.debug(' - allowed_search_keys set to: %s', self.__allowed_search_keys)
         else:
             self.__allowed_search_keys = defaults['allowed_search_keys']
-            LOGGER.debug(' - allowed_search_keys set to default: '+str(self.__allowed_search_keys))
+            LOGGER.debug(' - allowed_search_keys set to default: %s', self.__allowed_search_keys)
 
         if args['reverselookup_baseuri']:
             self.__reverselookup_baseuri = args['reverselookup_baseuri']
-            LOGGER.debug(' - solrbaseurl set to: '+self.__reverselookup_baseuri)
+            LOGGER.debug(' - solrbaseurl set to: %s', self.__reverselookup_baseuri)
         elif 'handle_server_url' in args.keys() and args['handle_server_url'] is not None:
             self.__reverselookup_baseuri = args['handle_server_url']
-            LOGGER.debug(' - solrbaseurl set to same as handle server: '+str(self.__reverselookup_baseuri))
+            LOGGER.debug(' - solrbaseurl set to same as handle server: %s', self.__reverselookup_baseuri)
         else:
             LOGGER.debug(' - solrbaseurl: No default.')
 
         if args['reverselookup_url_extension']:
             self.__reverselookup_url_extension = args['reverselookup_url_extension']
-            LOGGER.debug(' - reverselookup_url_extension set to: '+self.__reverselookup_url_extension)
+            LOGGER.debug(' - reverselookup_url_extension set to: %s', self.__reverselookup_url_extension)
         else:
             self.__reverselookup_url_extension = defaults['reverselookup_url_extension']
-            LOGGER.debug(' - reverselookup_url_extension set to default: '+self.__reverselookup_url_extension)
+            LOGGER.debug(' - reverselookup_url_extension set to default: %s', self.__reverselookup_url_extension)
 
         # Authentication reverse lookup:
         #   If specified, use it.
@@ -188,11 +270,11 @@ class Searcher(object):
 
         if args['reverselookup_username']:
             self.__user = args['reverselookup_username']
-            LOGGER.debug(' - reverselookup_username set to: '+self.__user)
+            LOGGER.debug(' - reverselookup_username set to: %s', self.__user)
         elif args['username']:
             self.__user = args['username']
             self.__handle_system_username_used = True
-            LOGGER.debug(' - reverselookup_username set to handle server username: '+self.__user)
+            LOGGER.debug(' - reverselookup_username set to handle server username: %s', self.__user)
         else:
             LOGGER.debug(' - reverselookup_username: Not specified. No default.')
 
@@ -236,8 +318,14 @@ class Searcher(object):
         :param key_value_pairs: Optional. Several search fields and values can
             be specified as key-value-pairs,
             e.g. CHECKSUM=123456, URL=www.foo.com
+        :param timeout: Optional. The timeout in seconds for this search, as
+            one number or as a (connect, read) pair. Defaults to the timeout
+            passed to the constructor.
+        :param deadline: Optional. The point in time (as returned by
+            time.time()) by which the search must be finished.
         :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`: If a search field is specified that
             cannot be used, or if something else goes wrong.
+        :raise: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`
         :return: A list of all Handles (strings) that bear the given key with
             given value of given prefix or server. The list may be empty and
             may also contain more than one element.
@@ -246,14 +334,26 @@ class Searcher(object):
         if self.__has_search_access:
             return self.__search_handle(**args)
         else:
-            LOGGER.error(
-                'Searching not possible. Reason: No access '+
-                'to search system (endpoint: '+
-                str(self.__search_url)+').'
-            )
+            LOGGER.error('Searching not possible. Reason: No access to search system (endpoint: %s).',
+                self.__search_url)
             return None
 
-    def __search_handle(self, **args):
+    def __search_handle(self, timeout=None, deadline=None, **args):
+        query, prefix = self.prepare_search(**args)
+        resp = self.__send_revlookup_get_request(query, timeout, deadline)
+        return self.interpret_search_response(resp, query, prefix)
+
+    def prepare_search(self, **args):
+        '''
+        Check the search terms and create the query for the reverse
+            lookup servlet.
+
+        :param args: The arguments passed to search_handle.
+        :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`: If no
+            (valid) search terms were specified.
+        :return: A tuple of the query string and the prefix to which the
+            results should be restricted (or None).
+        '''
 
         # Prefix specified? Remove them from the key value pairs to be searched.
         prefix = None
@@ -274,7 +374,7 @@ class Searcher(object):
         else:
             isnone = pyhandle.util.return_keys_of_value_none(args)
             if len(isnone) > 0:
-                LOGGER.debug('search_handle: These keys had value None: '+str(isnone))
+                LOGGER.debug('search_handle: These keys had value None: %s', isnone)
                 args = pyhandle.util.remove_value_none_from_dict(args)
                 if len(args) == 0:
                     LOGGER.debug('search_handle: No key value pair with valid value was specified.')
@@ -283,27 +383,40 @@ class Searcher(object):
                     raise ReverseLookupException(msg=msg)
 
         # Perform the search:
-        list_of_handles = []
-        LOGGER.debug('search_handle: key-value-pairs: '+str(args))
+        LOGGER.debug('search_handle: key-value-pairs: %s', args)
         query = self.create_revlookup_query(*fulltext_searchterms, **args)
 
         if query is None:
             msg = 'No search query was specified'
             raise ReverseLookupException(msg=msg)
 
-        resp = self.__send_revlookup_get_request(query)
+        return query, prefix
+
+    def interpret_search_response(self, resp, query, prefix=None):
+        '''
+        Extract the list of handles from the reverse lookup servlet's
+            response.
+
+        :param resp: The servlet's response.
+        :param query: The query that was sent, only used in exceptions.
+        :param prefix: Optional. Only handles with this prefix are returned.
+        :raise: :exc:`~pyhandle.handleexceptions.ReverseLookupException`
+        :return: A list of handles (strings).
+        '''
+        resp = get_handle_response(resp, self.__json_codec)
+        list_of_handles = []
 
         # Check for undefined fields
         regex = 'RemoteSolrException: Error from server at .+: undefined field .+'
         match = re.compile(regex).search(str(resp.content))
         if match is not None:
-            undefined_field = resp.content.split('undefined field ')[1]
+            undefined_field = resp.text.split('undefined field ')[1]
             msg = 'Tried to search in undefined field "'+undefined_field+'"..'
             raise ReverseLookupException(msg=msg, query=query, response=resp)
 
         if resp.status_code == 200:
             try:
-                list_of_handles = json.loads(resp.content)
+                list_of_handles = resp.body
             except ValueError:
                 msg = 'The response is not JSON.'
                 raise ReverseLookupException(msg=msg, query=query, response=resp)
@@ -332,7 +445,7 @@ class Searcher(object):
 
         # Filter prefixes:
         if prefix is not None:
-            LOGGER.debug('search_handle: Restricting search to prefix '+prefix)
+            LOGGER.debug('search_handle: Restricting search to prefix %s', prefix)
             filteredlist_of_handles = []
             for i in range(len(list_of_handles)):
                 if list_of_handles[i].split('/')[0] == prefix:
@@ -399,7 +512,7 @@ class Searcher(object):
                 counter += 1
 
         query = query.replace('?&', '?')
-        LOGGER.debug('create_revlookup_query: query: '+query)
+        LOGGER.debug('create_revlookup_query: query: %s', query)
         if counter == 0: # unreachable?
             msg = 'No valid search terms have been specified.'
             raise ReverseLookupException(msg=msg)
@@ -417,14 +530,27 @@ class Searcher(object):
         auth = pyhandle.utilhandle.create_authentication_string(username, password)
         self.__revlookup_auth_string = auth
 
-    def __send_revlookup_get_request(self, query):
-
-        solrurl = self.__search_url
-        entirequery = solrurl+'?'+query.lstrip('?')
-
-        head = self.__header
-        veri = self.__HTTPS_verify
-        resp = self.__session.get(entirequery, headers=head, verify=veri)
+    def __send_revlookup_get_request(self, query, timeout=None, deadline=None):
+
+        entirequery, head, veri = self.get_search_request_settings(query)
+        if self.__rate_limiter is not None:
+            self.__rate_limiter.acquire('search', deadline, op='searching handles')
+        hooked_request = None
+        if self.__hooks is not None:
+            hooked_request = self.__hooks.before_request('SEARCH', '', entirequery)
+        start = time.monotonic()
+        try:
+            resp = self.__session.get(entirequery, headers=head, verify=veri,
+                timeout=self.get_timeout(timeout, deadline))
+        except Exception as error:
+            self.__statistics.record_response('SEARCH', None, time.monotonic() - start)
+            if hooked_request is not None:
+                self.__hooks.after_request(hooked_request, error=error)
+            raise
+        latency = time.monotonic() - start
+        self.__statistics.record_response('SEARCH', resp, latency)
+        if hooked_request is not None:
+            self.__hooks.after_request(hooked_request, resp)
         self.__log_request_response_to_file(
             logger=REQUESTLOGGER,
             op='SEARCH',
@@ -432,11 +558,18 @@ class Searcher(object):
             url=entirequery,
             headers=head,
             verify=veri,
-            resp=resp
+            resp=resp,
+            latency=latency
         )
         return resp
 
     def __log_request_response_to_file(self, **args):
-        message = pyhandle.utilhandle.make_request_log_message(**args)
-        args['logger'].info(message)
+        if self.__request_log is not None:
+            self.__request_log.log_request(args['op'], args['handle'], args['url'], args['resp'],
+                args.get('latency'))
+
+        # Only build the message if someone is listening:
+        if args['logger'].isEnabledFor(logging.INFO):
+            message = pyhandle.utilhandle.make_request_log_message(**args)
+            args['logger'].info(message)
 
@@ -0,0 +1,168 @@
+'''
+This module provides the slow-request detector: Requests (or database
+    queries) that take longer than a threshold are captured as compact
+    records - operation, handle, URL, status, phase timings, retries
+    and response size - kept in a bounded in-memory ring and logged as
+    warnings to the logger "pyhandle.slowrequests".
+
+Fast requests only cost one comparison, so the detector can stay
+    switched on in production.
+
+The phases of an HTTP request are:
+
+    * 'response': The time from sending the (last) attempt until its
+      response headers were there, as measured by the HTTP library. It
+      includes connecting and the TLS handshake, which the HTTP library
+      does not time separately, and the server's processing.
+    * 'other': The rest of the total: rate limiting, failed attempts
+      and the backoff before retries, and downloading the body.
+    * 'parse': Parsing the JSON body. The body is parsed only once, so
+      parsing it for the record costs the client nothing.
+
+'''
+
+import collections
+import logging
+import threading
+import time
+import pyhandle
+from pyhandle.hooks import RequestHook
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(pyhandle.util.NullHandler())
+
+SLOW_REQUEST_ARGS = [
+    'slow_request_threshold',
+    'slow_request_ring_size'
+]
+
+
+class SlowRequestDetector(RequestHook):
+    '''
+    A request hook that captures the requests that took longer than a
+    threshold. It is thread-safe, and can be shared by several clients.
+    '''
+
+    def __init__(self, threshold, ring_size=100):
+        '''
+        :param threshold: The number of seconds above which a request is
+            slow.
+        :param ring_size: Optional. The number of slow requests that are
+            kept. Older ones are discarded. Defaults to 100.
+        '''
+        if threshold < 0:
+            raise ValueError('The slow request threshold must not be negative, not '+str(threshold))
+        if ring_size < 1:
+            raise ValueError('The slow request ring size must be positive, not '+str(ring_size))
+        self.threshold = threshold
+        self.ring_size = ring_size
+        self.__ring = collections.deque(maxlen=ring_size)
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def from_args(args):
+        '''
+        Get the slow-request detector for the arguments passed to a client.
+            Values may also be strings, as read from a JSON credentials
+            file.
+
+        :param args: A dictionary that may contain the keys
+            'slow_request_threshold' (the number of seconds, or a
+            SlowRequestDetector to use as it is) and 'slow_request_ring_size'.
+        :raises: :exc:`~ValueError`: If a value is not valid.
+        :return: A SlowRequestDetector, or None if no threshold is given.
+        '''
+        threshold = args.get('slow_request_threshold')
+        if threshold is None or isinstance(threshold, SlowRequestDetector):
+            return threshold
+        settings = {}
+        if args.get('slow_request_ring_size') is not None:
+            settings['ring_size'] = int(args['slow_request_ring_size'])
+        return SlowRequestDetector(float(threshold), **settings)
+
+    def after_request(self, request):
+        '''
+        Capture the request if it was slow (see
+            :class:`~pyhandle.hooks.RequestHook`).
+        '''
+        if request.latency < self.threshold:
+            return
+
+        response = request.response
+        phases = {'response': None, 'other': None, 'parse': None}
+        response_bytes = None
+        if response is not None:
+            elapsed = getattr(response, 'elapsed', None)
+            if elapsed is not None:
+                phases['response'] = elapsed.total_seconds()
+                phases['other'] = max(request.latency - phases['response'], 0.0)
+            if response.content is not None:
+                response_bytes = len(response.content)
+            if hasattr(response, 'body'):
+                start = time.monotonic()
+                try:
+                    response.body
+                except ValueError:
+                    pass
+                phases['parse'] = time.monotonic() - start
+
+        self.capture(request.op, request.handle, request.url, request.latency,
+                     phases=phases,
+                     retries=request.retries,
+                     status=request.status,
+                     error=None if request.error is None else repr(request.error),
+                     response_bytes=response_bytes)
+
+    def capture(self, op, handle, url, latency, phases=None, retries=0, status=None, error=None,
+                response_bytes=None):
+        '''
+        Keep and log a record of a slow request, without checking the
+            threshold.
+
+        :param op: The operation, e.g. 'GET', 'SEARCH' or 'SELECT'.
+        :param handle: The handle, or None.
+        :param url: The URL (or the query).
+        :param latency: The number of seconds the request took.
+        :param phases: Optional. A dict with the number of seconds spent in
+            each phase of the request (None if unknown).
+        :param retries: Optional. The number of retries.
+        :param status: Optional. The status of the response.
+        :param error: Optional. The error, if the request failed.
+        :param response_bytes: Optional. The size of the response.
+        :return: The record, a dict.
+        '''
+        record = {
+            'time': time.time(),
+            'op': op,
+            'handle': handle,
+            'url': url,
+            'status': status,
+            'error': error,
+            'latency': latency,
+            'phases': phases or {},
+            'retries': retries,
+            'response_bytes': response_bytes
+        }
+        with self.__lock:
+            self.__ring.append(record)
+        LOGGER.warning('Slow request: %s %s took %.3f s (status %s, %d retries, phases %s, %s bytes).',
+                       op, url, latency, error if status is None else status, retries,
+                       ', '.join('%s=%s' % (name, 'n/a' if value is None else '%.3f s' % value)
+                                 for name, value in sorted(record['phases'].items())),
+                       response_bytes)
+        return record
+
+    def records(self):
+        '''
+        :return: A list of the records of the slow requests that are kept,
+            the oldest first.
+        '''
+        with self.__lock:
+            return list(self.__ring)
+
+    def clear(self):
+        '''
+        Discard the records of the slow requests.
+        '''
+        with self.__lock:
+            self.__ring.clear()
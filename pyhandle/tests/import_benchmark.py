@@ -0,0 +1,83 @@
+'''
+Benchmark of the import time of the library: "import pyhandle" (which
+    must not load the clients and their dependencies), and the
+    imports that a REST-only or a DB-only application needs, each
+    timed in fresh interpreters, minus the start of the interpreter.
+
+Run it with:
+
+    python -m pyhandle.tests.import_benchmark [-n NUMBER] [--max-ms MS]
+
+With --max-ms, it exits with status 1 if "import pyhandle" takes longer
+    or loads one of the heavy modules, so that it can guard against
+    regressions in a CI job.
+
+'''
+
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Modules that "import pyhandle" must not load:
+HEAVY_MODULES = ['requests', 'urllib3', 'pymysql', 'future', 'aiohttp',
+                 'pyhandle.handleclient', 'pyhandle.client']
+
+STATEMENTS = [
+    ('interpreter', 'pass'),
+    ('pyhandle', 'import pyhandle'),
+    ('REST client', 'import pyhandle.client.resthandleclient'),
+    ('DB client', 'import pyhandle.client.dbhandleclient'),
+    ('PyHandleClient', 'import pyhandle.handleclient')
+]
+
+
+def time_statement(statement, number):
+    # Median of the wall time of fresh interpreters, in milliseconds:
+    times = []
+    for _ in range(number):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', statement])
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def get_loaded_heavy_modules(statement='import pyhandle'):
+    '''
+    :return: The heavy modules that the statement loads, in a fresh
+        interpreter.
+    '''
+    script = statement+'\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))'
+    output = subprocess.check_output([sys.executable, '-c', script])
+    loaded = set(json.loads(output.decode('utf-8').splitlines()[-1]))
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def run(number, max_ms=None):
+    results = [(name, time_statement(statement, number)) for name, statement in STATEMENTS]
+    interpreter = results[0][1]
+    print('%-16s %12s' % ('import', 'time [ms]'))
+    for name, milliseconds in results[1:]:
+        print('%-16s %12.1f' % (name, milliseconds - interpreter))
+
+    heavy = get_loaded_heavy_modules()
+    print('Heavy modules loaded by "import pyhandle": %s' % (', '.join(heavy) or 'none'))
+    if max_ms is not None:
+        import_ms = results[1][1] - interpreter
+        if heavy or import_ms > max_ms:
+            print('FAILED: "import pyhandle" takes %.1f ms (at most %.1f ms allowed).' % (import_ms, max_ms))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the import time.')
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help='the number of interpreters per measurement (default: 20)')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if "import pyhandle" takes longer than this')
+    param = parser.parse_args()
+    sys.exit(run(param.number, param.max_ms))
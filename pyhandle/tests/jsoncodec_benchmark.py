@@ -0,0 +1,68 @@
+'''
+Benchmark of the JSON codecs (see pyhandle.jsoncodec) on the
+    handle records in tests/resources: parsing them as they come
+    from the Handle Server, and serializing their values as PUT
+    payload.
+
+Run it with:
+
+    python -m pyhandle.tests.jsoncodec_benchmark [-n NUMBER]
+
+'''
+
+from __future__ import print_function
+
+import argparse
+import glob
+import json
+import os
+import timeit
+from pyhandle.jsoncodec import StdlibJSONCodec, OrjsonCodec, orjson
+
+PATH_RES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+
+
+def load_records():
+    records = {}
+    for filename in sorted(glob.glob(os.path.join(PATH_RES, 'handlerecord_*.json'))):
+        with open(filename, 'rb') as json_file:
+            content = json_file.read()
+        name = os.path.basename(filename)[len('handlerecord_'):-len('_PUBLIC.json')]
+        # As sent by the Handle Server (compact, bytes):
+        records[name] = json.dumps(json.loads(content.decode('utf-8'))).encode('utf-8')
+    return records
+
+
+def time_per_call(function, number):
+    # Best of three runs, in microseconds per call:
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def run(number):
+    codecs = [StdlibJSONCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    else:
+        print('orjson is not installed, only the standard library is measured.')
+
+    print('%-25s %-6s %12s %12s' % ('record', 'codec', 'loads [us]', 'dumps [us]'))
+    for name, content in load_records().items():
+        payload = {'values': json.loads(content)['values']}
+        baseline = None
+        for codec in codecs:
+            loads = time_per_call(lambda: codec.loads(content), number)
+            dumps = time_per_call(lambda: codec.dumps(payload), number)
+            line = '%-25s %-6s %12.2f %12.2f' % (name, codec.name, loads, dumps)
+            if baseline is None:
+                baseline = (loads, dumps)
+            else:
+                line += '   (x%.1f, x%.1f faster)' % (baseline[0] / loads, baseline[1] / dumps)
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the JSON codecs on the test handle records.')
+    parser.add_argument('-n', '--number', type=int, default=10000,
+                        help='the number of calls per measurement (default: 10000)')
+    param = parser.parse_args()
+    run(param.number)
@@ -0,0 +1,109 @@
+'''
+Benchmark of the per-request logging overhead when neither debug
+    nor request logging is enabled (the default): the work that used
+    to be done eagerly for every request (building the request log
+    message and concatenating the debug messages) compared to the
+    lazy checks that replace it, and the time of a whole GET and PUT
+    through the connector against a stand-in session, for scale.
+
+Run it with:
+
+    python -m pyhandle.tests.logging_benchmark [-n NUMBER]
+
+'''
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import timeit
+import mock
+import pyhandle.handlesystemconnector as connector
+from pyhandle.utilhandle import make_request_log_message
+
+PATH_RES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+SERVER = 'http://foo.com'
+
+
+class StandInResponse(object):
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.request = None
+
+
+def load_record():
+    with open(os.path.join(PATH_RES, 'handlerecord_for_reading_PUBLIC.json')) as json_file:
+        return json.load(json_file)
+
+
+def time_per_call(function, number):
+    # Best of three runs, in microseconds per call:
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def run(number):
+    record = load_record()
+    handle = record['handle']
+    url = SERVER+'/api/handles/'+handle
+    content = json.dumps(record).encode('utf-8')
+    get_response = StandInResponse(200, content)
+    put_response = StandInResponse(201, json.dumps({'responseCode': 1, 'handle': handle}).encode('utf-8'))
+    payload = json.dumps({'values': record['values']})
+    headers = {'Content-Type': 'application/json', 'Authorization': 'Basic dXNlcjpwYXNz'}
+
+    # Make sure nobody listens, as by default:
+    connector.LOGGER.setLevel(logging.WARNING)
+    connector.REQUESTLOGGER.setLevel(logging.WARNING)
+
+    def eager_get():
+        connector.LOGGER.debug('GET Request to '+url)
+        connector.REQUESTLOGGER.info(make_request_log_message(
+            logger=connector.REQUESTLOGGER, op='GET', handle=handle, url=url,
+            headers=headers, verify=True, resp=get_response))
+
+    def lazy_get():
+        connector.LOGGER.debug('GET Request to %s', url)
+        if connector.REQUESTLOGGER.isEnabledFor(logging.INFO):
+            pass
+
+    def eager_put():
+        connector.LOGGER.debug('PUT Request to '+url)
+        connector.LOGGER.debug('PUT Request payload: '+payload)
+        connector.REQUESTLOGGER.info(make_request_log_message(
+            logger=connector.REQUESTLOGGER, op='PUT', handle=handle, url=url,
+            headers=headers, verify=True, resp=put_response, payload=payload))
+
+    def lazy_put():
+        connector.LOGGER.debug('PUT Request to %s', url)
+        connector.LOGGER.debug('PUT Request payload: %s', payload)
+        if connector.REQUESTLOGGER.isEnabledFor(logging.INFO):
+            pass
+
+    with mock.patch('requests.Session.get', new=lambda *args, **kwargs: get_response), \
+         mock.patch('requests.Session.put', new=lambda *args, **kwargs: put_response):
+        inst = connector.HandleSystemConnector(
+            handle_server_url=SERVER,
+            username='300:'+handle,
+            password='pass'
+        )
+        whole_get = time_per_call(lambda: inst.send_handle_get_request(handle), number)
+        whole_put = time_per_call(lambda: inst.send_handle_put_request(
+            handle=handle, list_of_entries=record['values'], overwrite=True), number)
+
+    print('%-5s %12s %12s %12s %14s' % ('op', 'eager [us]', 'lazy [us]', 'saved [us]', 'request [us]'))
+    for op, eager_logging, lazy_logging, whole in [('GET', eager_get, lazy_get, whole_get),
+                                                   ('PUT', eager_put, lazy_put, whole_put)]:
+        eager = time_per_call(eager_logging, number)
+        lazy = time_per_call(lazy_logging, number)
+        print('%-5s %12.2f %12.2f %12.2f %14.2f' % (op, eager, lazy, eager - lazy, whole))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the logging overhead per request.')
+    parser.add_argument('-n', '--number', type=int, default=10000,
+                        help='the number of calls per measurement (default: 10000)')
+    param = parser.parse_args()
+    run(param.number)
@@ -5,14 +5,27 @@ import logging
 import time
 import unittest
 
+from .testcases.asynchandleclient_patched_unit_test import AsyncRESTHandleClientPatchedTestCase
 from .testcases.clientcredentials_unit_test import PIDClientCredentialsTestCase
 from .testcases.handleclient_2_read_patched_unit_test import RESTHandleClientReadaccessPatchedTestCase
+from .testcases.handleclient_concurrency_unit_test import RESTHandleClientConcurrencyTestCase
 from .testcases.handleclient_read_patched_unit_test import RESTHandleClientReadaccessFakedTestCase
 from .testcases.handleclient_search_unit_test import RESTHandleClientSearchNoAccessTestCase
 from .testcases.handleclient_unit_test import RESTHandleClientNoaccessTestCase
 from .testcases.handleclient_write_patched_unit_test import RESTHandleClientWriteaccessPatchedTestCase
 from .testcases.handleconnector_patched_unit_test import RESTHandleConnectorAccessPatchedTestCase
 from .testcases.handleconnector_unit_test import RESTHandleConnectorNoaccessTestCase
+from .testcases.handlerecord_unit_test import HandleRecordTestCase
+from .testcases.handleresponse_unit_test import HandleResponseTestCase
+from .testcases.hooks_unit_test import RequestHooksTestCase
+from .testcases.import_unit_test import LazyImportTestCase
+from .testcases.jsoncodec_unit_test import JSONCodecTestCase
+from .testcases.retrypolicy_unit_test import RetryPolicyTestCase, CircuitBreakerTestCase
+from .testcases.recordcache_unit_test import RecordCacheTestCase, NotFoundCacheTestCase
+from .testcases.ratelimiter_unit_test import TokenBucketTestCase, RateLimiterTestCase
+from .testcases.requestlog_unit_test import RequestLogTestCase
+from .testcases.requeststats_unit_test import LatencyHistogramTestCase, RequestStatisticsTestCase
+from .testcases.slowrequests_unit_test import SlowRequestDetectorTestCase
 from .testcases.utilconfig_unit_test import UtilConfigTestCase
 
 # Integration tests:
@@ -87,6 +100,102 @@ if __name__ == '__main__':
         numtests += utilconfig_testcase.countTestCases()
         print('Number of tests for utilconfig (no access required):\t\t\t\t' + str(n))
 
+        retrypolicy = unittest.TestLoader().loadTestsFromTestCase(RetryPolicyTestCase)
+        tests_to_run.append(retrypolicy)
+        n = retrypolicy.countTestCases()
+        numtests += n
+        print('Number of tests for retry policy (no access required):\t\t\t\t' + str(n))
+
+        breaker = unittest.TestLoader().loadTestsFromTestCase(CircuitBreakerTestCase)
+        tests_to_run.append(breaker)
+        n = breaker.countTestCases()
+        numtests += n
+        print('Number of tests for circuit breaker (no access required):\t\t\t' + str(n))
+
+        recordcache = unittest.TestLoader().loadTestsFromTestCase(RecordCacheTestCase)
+        tests_to_run.append(recordcache)
+        n = recordcache.countTestCases()
+        numtests += n
+        print('Number of tests for record cache (no access required):\t\t\t\t' + str(n))
+
+        notfoundcache = unittest.TestLoader().loadTestsFromTestCase(NotFoundCacheTestCase)
+        tests_to_run.append(notfoundcache)
+        n = notfoundcache.countTestCases()
+        numtests += n
+        print('Number of tests for not-found cache (no access required):\t\t\t' + str(n))
+
+        tokenbucket = unittest.TestLoader().loadTestsFromTestCase(TokenBucketTestCase)
+        tests_to_run.append(tokenbucket)
+        n = tokenbucket.countTestCases()
+        numtests += n
+        print('Number of tests for token bucket (no access required):\t\t\t\t' + str(n))
+
+        ratelimiter = unittest.TestLoader().loadTestsFromTestCase(RateLimiterTestCase)
+        tests_to_run.append(ratelimiter)
+        n = ratelimiter.countTestCases()
+        numtests += n
+        print('Number of tests for rate limiter (no access required):\t\t\t\t' + str(n))
+
+        concurrency = unittest.TestLoader().loadTestsFromTestCase(RESTHandleClientConcurrencyTestCase)
+        tests_to_run.append(concurrency)
+        n = concurrency.countTestCases()
+        numtests += n
+        print('Number of tests for client shared by threads (local stand-in server):\t' + str(n))
+
+        handleresponse = unittest.TestLoader().loadTestsFromTestCase(HandleResponseTestCase)
+        tests_to_run.append(handleresponse)
+        n = handleresponse.countTestCases()
+        numtests += n
+        print('Number of tests for handle response (no access required):\t\t\t' + str(n))
+
+        jsoncodec = unittest.TestLoader().loadTestsFromTestCase(JSONCodecTestCase)
+        tests_to_run.append(jsoncodec)
+        n = jsoncodec.countTestCases()
+        numtests += n
+        print('Number of tests for JSON codecs (no access required):\t\t\t\t' + str(n))
+
+        requestlog = unittest.TestLoader().loadTestsFromTestCase(RequestLogTestCase)
+        tests_to_run.append(requestlog)
+        n = requestlog.countTestCases()
+        numtests += n
+        print('Number of tests for request log (no access required):\t\t\t\t' + str(n))
+
+        histogram = unittest.TestLoader().loadTestsFromTestCase(LatencyHistogramTestCase)
+        tests_to_run.append(histogram)
+        n = histogram.countTestCases()
+        numtests += n
+        print('Number of tests for latency histogram (no access required):\t\t\t' + str(n))
+
+        requeststats = unittest.TestLoader().loadTestsFromTestCase(RequestStatisticsTestCase)
+        tests_to_run.append(requeststats)
+        n = requeststats.countTestCases()
+        numtests += n
+        print('Number of tests for request statistics (no access required):\t\t\t' + str(n))
+
+        hooks = unittest.TestLoader().loadTestsFromTestCase(RequestHooksTestCase)
+        tests_to_run.append(hooks)
+        n = hooks.countTestCases()
+        numtests += n
+        print('Number of tests for request hooks (no access required):\t\t\t' + str(n))
+
+        slowrequests = unittest.TestLoader().loadTestsFromTestCase(SlowRequestDetectorTestCase)
+        tests_to_run.append(slowrequests)
+        n = slowrequests.countTestCases()
+        numtests += n
+        print('Number of tests for slow request detection (no access required):\t\t' + str(n))
+
+        lazyimport = unittest.TestLoader().loadTestsFromTestCase(LazyImportTestCase)
+        tests_to_run.append(lazyimport)
+        n = lazyimport.countTestCases()
+        numtests += n
+        print('Number of tests for lazy imports (no access required):\t\t\t' + str(n))
+
+        handlerecord = unittest.TestLoader().loadTestsFromTestCase(HandleRecordTestCase)
+        tests_to_run.append(handlerecord)
+        n = handlerecord.countTestCases()
+        numtests += n
+        print('Number of tests for the handle record (no access required):\t\t\t' + str(n))
+
         noaccess = unittest.TestLoader().loadTestsFromTestCase(RESTHandleClientNoaccessTestCase)
         tests_to_run.append(noaccess)
         n = noaccess.countTestCases()
@@ -136,6 +245,12 @@ if __name__ == '__main__':
         numtests += n
         print('Number of tests for patched access (connector):\t\t\t\t\t' + str(n))
 
+        patched_async = unittest.TestLoader().loadTestsFromTestCase(AsyncRESTHandleClientPatchedTestCase)
+        tests_to_run.append(patched_async)
+        n = patched_async.countTestCases()
+        numtests += n
+        print('Number of tests for patched access (async client):\t\t\t\t' + str(n))
+
     if read_access:
         read = unittest.TestLoader().loadTestsFromTestCase(RESTHandleClientReadaccessTestCase)
         tests_to_run.append(read)
@@ -0,0 +1,181 @@
+"""Testing the asynchronous client, by patching the requests sent
+to the Handle Server."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import asyncio
+import json
+import mock
+import pyhandle
+from pyhandle.handleexceptions import HandleAlreadyExistsException, HandleNotFoundException
+from pyhandle.tests.mockresponses import MockResponse, MockSearchResponse
+from pyhandle.tests.utilities import failure_message, replace_timestamps
+
+try:
+    import aiohttp
+    from pyhandle.client.asyncresthandleclient import AsyncRESTHandleClient
+except ImportError:
+    aiohttp = None
+
+# Load some data that is needed for testing
+PATH_RES = pyhandle.util.get_neighbour_directory(__file__, 'resources')
+RECORD = open(PATH_RES+'/handlerecord_for_reading_PUBLIC.json').read()
+
+
+class MockAsyncSender(object):
+    '''
+    Replaces the function that sends the requests with aiohttp.
+    Returns the responses given for each HTTP method and records
+    the calls.
+    '''
+    def __init__(self, **responses):
+        self.responses = responses
+        self.calls = []
+
+    async def __call__(self, session, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses[method]
+
+    def calls_for(self, method):
+        return [call for call in self.calls if call[0] == method]
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncRESTHandleClientPatchedTestCase(unittest.TestCase):
+
+    @mock.patch('pyhandle.handlesystemconnector.HandleSystemConnector.check_if_username_exists')
+    def setUp(self, username_check_patch):
+        self.loop = asyncio.new_event_loop()
+        self.inst = AsyncRESTHandleClient.instantiate_with_username_and_password(
+            'http://handle.server', '999:user/name', 'apassword')
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.inst.close())
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_retrieve_handle_record_json(self):
+        """Test retrieving a handle record asynchronously."""
+
+        # Test variables:
+        expected = json.loads(RECORD)
+
+        # Run code to be tested:
+        sender = MockAsyncSender(GET=MockResponse(success=True, content=RECORD))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            received = self.run_async(self.inst.retrieve_handle_record_json(expected['handle']))
+
+        # Check desired outcome:
+        self.assertEqual(received, expected,
+            'Unexpected return from handle retrieval.')
+        self.assertTrue(sender.calls[0][1].endswith('/api/handles/'+expected['handle']),
+            'Unexpected URL: '+sender.calls[0][1])
+
+    def test_retrieve_handle_record_json_concurrently(self):
+        """Test retrieving several handle records on one event loop."""
+
+        # Run code to be tested:
+        sender = MockAsyncSender(GET=MockResponse(notfound=True))
+        handles = ['my/handle'+str(i) for i in range(50)]
+        async def retrieve_all():
+            return await asyncio.gather(*[self.inst.retrieve_handle_record_json(h) for h in handles])
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            received = self.run_async(retrieve_all())
+
+        # Check desired outcome:
+        self.assertEqual(received, [None]*50)
+        self.assertEqual(len(sender.calls), 50)
+
+    def test_register_handle_kv(self):
+        """Test registering a handle asynchronously."""
+
+        # Run code to be tested:
+        sender = MockAsyncSender(
+            GET=MockResponse(notfound=True),
+            PUT=MockResponse(wascreated=True))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            handle = self.run_async(self.inst.register_handle_kv('my/testhandle', URL='http://foo.bar'))
+
+        # Check desired outcome:
+        self.assertEqual(handle, 'my/testhandle')
+        method, url, kwargs = sender.calls_for('PUT')[0]
+        self.assertIn('overwrite=false', url)
+        passed_payload = json.loads(kwargs['data'])
+        replace_timestamps(passed_payload)
+        expected_payload = {"values": [
+            {"index": 100, "type": "HS_ADMIN", "data": {"value": {"index": "200", "handle": "0.NA/my", "permissions": "011111110011"}, "format": "admin"}},
+            {"index": 1, "type": "URL", "data": "http://foo.bar"}]}
+        self.assertEqual(passed_payload, expected_payload,
+            failure_message(expected=expected_payload, passed=passed_payload, methodname='register_handle_kv'))
+        self.assertIn('Authorization', kwargs['headers'])
+
+    def test_register_handle_kv_already_exists(self):
+        """Test that an existing handle is not overwritten asynchronously."""
+
+        # Run code to be tested:
+        sender = MockAsyncSender(GET=MockResponse(success=True))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            with self.assertRaises(HandleAlreadyExistsException):
+                self.run_async(self.inst.register_handle_kv('my/testhandle', URL='http://foo.bar'))
+
+        # Check desired outcome:
+        self.assertEqual(len(sender.calls_for('PUT')), 0)
+
+    def test_modify_handle_value(self):
+        """Test modifying a handle value asynchronously."""
+
+        # Run code to be tested:
+        cont = {"responseCode":1, "handle":"my/testhandle", "values":[{"index":111, "type": "TEST1", "data":{"format":"string", "value":"val1"}, "ttl":86400, "timestamp":"2015-09-29T15:51:08Z"}, {"index":4, "type": "TEST4", "data":{"format":"string", "value":"val4"}, "ttl":86400, "timestamp":"2015-09-29T15:51:08Z"}]}
+        sender = MockAsyncSender(
+            GET=MockResponse(status_code=200, content=json.dumps(cont)),
+            PUT=MockResponse(status_code=201, content=json.dumps({"responseCode":1, "handle":"my/testhandle"})))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            self.run_async(self.inst.modify_handle_value('my/testhandle', TEST4='newvalue'))
+
+        # Check desired outcome:
+        method, url, kwargs = sender.calls_for('PUT')[0]
+        self.assertIn('index=4', url)
+        passed_payload = json.loads(kwargs['data'])
+        expected_payload = {"values": [{"index": 4, "ttl": 86400, "type": "TEST4", "data": "newvalue"}]}
+        self.assertEqual(passed_payload, expected_payload,
+            failure_message(expected=expected_payload, passed=passed_payload, methodname='modify_handle_value'))
+
+    def test_sync_handle_record(self):
+        """Test syncing a handle record asynchronously, with only the needed writes."""
+
+        # Run code to be tested:
+        cont = {"responseCode":1, "handle":"my/testhandle", "values":[{"index":2, "type": "TEST1", "data":{"format":"string", "value":"val1"}}, {"index":4, "type": "TEST4", "data":{"format":"string", "value":"val4"}}]}
+        sender = MockAsyncSender(
+            GET=MockResponse(status_code=200, content=json.dumps(cont)),
+            DELETE=MockResponse(status_code=200, content=json.dumps({"responseCode":1, "handle":"my/testhandle"})))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            changes = self.run_async(self.inst.sync_handle_record('my/testhandle', {'TEST1': 'val1'}))
+
+        # Check desired outcome:
+        self.assertEqual(changes, {'modified': [], 'deleted': [4]})
+        self.assertEqual(len(sender.calls_for('PUT')), 0)
+        self.assertIn('index=4', sender.calls_for('DELETE')[0][1])
+
+    def test_delete_handle_not_found(self):
+        """Test deleting a nonexistent handle asynchronously."""
+
+        sender = MockAsyncSender(DELETE=MockResponse(notfound=True))
+        with mock.patch('pyhandle.asynchandlesystemconnector.send_buffered_request', sender):
+            with self.assertRaises(HandleNotFoundException):
+                self.run_async(self.inst.delete_handle('my/testhandle'))
+
+    def test_search_handle(self):
+        """Test searching for handles asynchronously."""
+
+        sender = MockAsyncSender(GET=MockSearchResponse(success=True))
+        with mock.patch('pyhandle.asyncsearcher.send_buffered_request', sender):
+            received = self.run_async(self.inst.search_handle(URL='*dkrz*', prefix='prefix2'))
+
+        self.assertEqual(received, ["prefix2/suffix2", "prefix2/suffix2b"])
+        self.assertIn('URL=*dkrz*', sender.calls[0][1])
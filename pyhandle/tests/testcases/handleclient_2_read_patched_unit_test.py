@@ -9,9 +9,11 @@ else:
 
 import mock
 import json
+import threading
+import time
 import pyhandle
 from pyhandle.client.resthandleclient import RESTHandleClient
-from pyhandle.handleexceptions import HandleSyntaxError, GenericHandleError, HandleNotFoundException
+from pyhandle.handleexceptions import HandleSyntaxError, GenericHandleError, HandleNotFoundException, DeadlineExceededError
 from pyhandle.tests.mockresponses import MockResponse, MockSearchResponse, MockCredentials
 
 # Load some data that is needed for testing
@@ -29,7 +31,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
 
     # retrieve_handle_record_json:
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_json_normal(self, getpatch):
         """Test if retrieve_handle_record_json returns the correct things.."""
 
@@ -46,7 +48,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertEqual(received, expected,
             'Unexpected return from handle retrieval.')
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_json_handle_does_not_exist(self, getpatch):
         """Test return value (None) if handle does not exist (retrieve_handle_record_json)."""
 
@@ -62,7 +64,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertIsNone(json_record,
             'The return value should be None if the handle does not exist, not: '+str(json_record))
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_json_handle_empty(self, getpatch):
         """Test return value if handle is empty (retrieve_handle_record_json)."""
 
@@ -78,7 +80,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertEqual(json_record['responseCode'],200,
             'Unexpected return value: '+str(json_record))
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_json_genericerror(self, getpatch):
         """Test exception if retrieve_handle_record_json returns a strange HTTP code."""
 
@@ -96,7 +98,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
     # retrieve_handle_record:
 
     #@mock.patch('pyhandle.handleclient.RESTHandleClient._EUDATHandleClient__send_handle_get_request')
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_when_json_not_given(self, getpatch):
         """Test retrieving a handle record"""
 
@@ -132,7 +134,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertEqual(len(dict_record), 4,
             'The record should have a length of 5 (as the duplicate is ignored.')
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_when_handle_is_wrong(self, getpatch):
         """Test error when retrieving a handle record with contradicting inputs."""
         
@@ -149,7 +151,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         with self.assertRaises(GenericHandleError):
             self.inst.retrieve_handle_record(testhandle)
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_when_handle_is_None(self, getpatch):
         """Test error when retrieving a handle record with a None input."""
 
@@ -160,7 +162,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         with self.assertRaises(HandleSyntaxError):
             self.inst.retrieve_handle_record(testhandle)
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_when_handle_is_wrong(self, getpatch):
         """Test error when retrieving a nonexistent handle record."""
         
@@ -176,7 +178,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertIsNone(hrec,
             'The handle record for a nonexistent handle should be None!')
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_retrieve_handle_record_when_handlerecord_is_None(self, getpatch):
         """Test error when retrieving a handle record, giving a None type."""
 
@@ -213,9 +215,94 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertEqual(len(dict_record), 4,
             'The record should have a length of 5 (as the duplicate is ignored.')
 
+    def retrieve_concurrently(self, inst, getpatch, num_threads):
+        # The GET only returns when all threads have started:
+        started = threading.Barrier(num_threads + 1)
+        release = threading.Event()
+        def get_response(url, **kwargs):
+            release.wait(5)
+            return MockResponse(success=True, content=RECORD)
+        getpatch.side_effect = get_response
+        testhandle = json.loads(RECORD)['handle']
+
+        results = []
+        def retrieve():
+            started.wait(5)
+            results.append(inst.retrieve_handle_record_json(testhandle))
+        threads = [threading.Thread(target=retrieve) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        time.sleep(0.1) # let all threads reach the GET
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_record_json_coalesced(self, getpatch):
+        """Test that concurrent reads of the same handle share one request."""
+
+        # Call method and check result:
+        results = self.retrieve_concurrently(self.inst, getpatch, 5)
+        self.assertEqual(getpatch.call_count, 1)
+        self.assertEqual(len(results), 5)
+        for record in results:
+            self.assertEqual(record, json.loads(RECORD))
+        self.assertEqual(len(set(id(record) for record in results)), 5,
+            'Every caller should receive its own copy of the record.')
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_record_json_not_coalesced(self, getpatch):
+        """Test that coalescing can be switched off."""
+
+        # Call method and check result:
+        inst = RESTHandleClient(coalesce_requests='false')
+        results = self.retrieve_concurrently(inst, getpatch, 3)
+        self.assertEqual(getpatch.call_count, 3)
+        self.assertEqual(len(results), 3)
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_record_json_coalesced_leader_modifies(self, getpatch):
+        """Test that the thread that sent the request can modify its record
+        while the threads that joined it are still waking up."""
+
+        # The first thread's GET blocks until the others have joined it:
+        in_get = threading.Event()
+        release = threading.Event()
+        def get_response(url, **kwargs):
+            in_get.set()
+            release.wait(5)
+            return MockResponse(success=True, content=RECORD)
+        getpatch.side_effect = get_response
+        testhandle = json.loads(RECORD)['handle']
+
+        results = []
+        def retrieve_and_modify():
+            record = self.inst.retrieve_handle_record_json(testhandle)
+            del record['values'][:]
+        def retrieve():
+            results.append(self.inst.retrieve_handle_record_json(testhandle))
+        leader = threading.Thread(target=retrieve_and_modify)
+        leader.start()
+        in_get.wait(5)
+        followers = [threading.Thread(target=retrieve) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.1) # let the followers join the request
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        # Check result:
+        self.assertEqual(getpatch.call_count, 1)
+        self.assertEqual(len(results), 4)
+        for record in results:
+            self.assertEqual(record, json.loads(RECORD))
+
     # get_value_from_handle
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_get_value_from_handle_when_handle_inexistent(self, getpatch):
         """Test error when retrieving a handle record, giving a None type."""
         
@@ -231,9 +318,157 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         with self.assertRaises(HandleNotFoundException):
             self.inst.get_value_from_handle(testhandle, key=key)
 
-        # Instantiation
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_get_value_from_handle_requests_type(self, getpatch):
+        """Test that only the entries of the key's type are requested."""
+
+        # Define the replacement for the patched method:
+        cont = {"responseCode":1, "handle":"my/testhandle", "values":[{"index":2, "type": "TEST1", "data":{"format":"string", "value":"val1"}, "ttl":86400, "timestamp":"2015-09-29T15:51:08Z"}]}
+        getpatch.return_value = MockResponse(status_code=200, content=json.dumps(cont))
+
+        # Call method and check result:
+        val = self.inst.get_value_from_handle('my/testhandle', 'TEST1')
+        self.assertEqual(val, 'val1')
+        passed_url = getpatch.call_args[0][0]
+        self.assertTrue(passed_url.endswith('my/testhandle?type=TEST1'), passed_url)
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_get_value_from_handle_type_not_in_record(self, getpatch):
+        """Test the return value if the handle has no entry of the requested type."""
+
+        # Define the replacement for the patched method ("Values Not Found"):
+        cont = {"responseCode":200, "handle":"my/testhandle"}
+        getpatch.return_value = MockResponse(status_code=200, content=json.dumps(cont))
+
+        # Call method and check result:
+        self.assertIsNone(self.inst.get_value_from_handle('my/testhandle', 'TEST100'))
+        self.assertEqual(self.inst.retrieve_handle_record('my/testhandle', types=['TEST100']), {})
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_record_types(self, getpatch):
+        """Test retrieving only some types of a handle record."""
+
+        # Test variables
+        handlerecord_json = json.loads(RECORD)
+        testhandle = handlerecord_json['handle']
+        getpatch.return_value = MockResponse(success=True, content=RECORD)
+
+        # Call method and check result (the types are also filtered locally):
+        dict_record = self.inst.retrieve_handle_record(testhandle, types=['TEST1', 'TESTDUP'])
+        self.assertEqual(sorted(dict_record.keys()), ['TEST1', 'TESTDUP'])
+        passed_url = getpatch.call_args[0][0]
+        self.assertIn('?type=TEST1&type=TESTDUP', passed_url)
+
+        # A given record is filtered without request:
+        dict_record = self.inst.retrieve_handle_record(testhandle, handlerecord_json, types=['TEST2'])
+        self.assertEqual(dict_record, {'TEST2': 'val2'})
+        self.assertEqual(getpatch.call_count, 1)
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_get_value_from_handle_uses_cached_record(self, getpatch):
+        """Test that a cached entire record is used instead of requesting the type."""
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+        # Test variables
+        handlerecord_json = json.loads(RECORD)
+        testhandle = handlerecord_json['handle']
+        getpatch.return_value = MockResponse(success=True, content=RECORD)
+        inst = RESTHandleClient(record_cache_size=10)
+
+        # Call method and check result:
+        inst.retrieve_handle_record_json(testhandle)
+        self.assertEqual(inst.get_value_from_handle(testhandle, 'TEST1'), 'val1')
+        self.assertEqual(getpatch.call_count, 1)
+
+    # retrieve_handle_records
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_records(self, getpatch):
+        """Test retrieving several handle records concurrently."""
+
+        # Test variables
+        handlerecord_json = json.loads(RECORD)
+        testhandle = handlerecord_json['handle']
+
+        # Define the replacement for the patched method:
+        def get_response(url, **kwargs):
+            if url.endswith(testhandle):
+                return MockResponse(success=True, content=RECORD)
+            return MockResponse(notfound=True)
+        getpatch.side_effect = get_response
+
+        # Call method and check result:
+        handles = (h for h in [testhandle, 'who/cares', 'nonsense', testhandle])
+        results = list(self.inst.retrieve_handle_records(handles, max_workers=3))
+        self.assertEqual(len(results), 4,
+            'Expected one result per handle, got: '+str(results))
+        self.assertEqual(getpatch.call_count, 3,
+            'The invalid handle should not have been requested.')
+        for handle, record, error in results:
+            if handle == testhandle:
+                self.assertEqual(record, handlerecord_json)
+                self.assertIsNone(error)
+            elif handle == 'who/cares':
+                self.assertIsNone(record)
+                self.assertIsNone(error)
+            else:
+                self.assertIsNone(record)
+                self.assertIsInstance(error, HandleSyntaxError)
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_records_bounded_input(self, getpatch):
+        """Test that retrieve_handle_records consumes its input lazily."""
+
+        # Define the replacement for the patched method:
+        getpatch.return_value = MockResponse(notfound=True)
+
+        # An endless generator of handles:
+        def endless_handles():
+            i = 0
+            while True:
+                i += 1
+                yield 'my/handle'+str(i)
+
+        # Call method and check result:
+        results = self.inst.retrieve_handle_records(endless_handles(), max_workers=2, max_in_flight=4)
+        first = [next(results) for _ in range(10)]
+        results.close()
+        self.assertEqual(len(first), 10)
+        self.assertLessEqual(getpatch.call_count, 14,
+            'Too many requests were sent ahead: '+str(getpatch.call_count))
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_retrieve_handle_records_total_timeout(self, getpatch):
+        """Test that pending handles are given up when the total timeout is exceeded."""
+
+        # Define the replacement for the patched method: The first handle
+        # is answered, the others hang until the test releases them.
+        release = threading.Event()
+        timeouts = []
+        def get_response(url, **kwargs):
+            timeouts.append(kwargs['timeout'])
+            if not url.endswith('fast'):
+                release.wait(5)
+            return MockResponse(notfound=True)
+        getpatch.side_effect = get_response
+
+        # Call method and check result:
+        handles = ['my/fast', 'my/slow1', 'my/slow2', 'my/slow3']
+        try:
+            results = list(self.inst.retrieve_handle_records(handles, max_workers=2, total_timeout=0.3))
+        finally:
+            release.set()
+        errors = dict((handle, error) for handle, _, error in results)
+        self.assertEqual(sorted(errors.keys()), sorted(handles))
+        self.assertIsNone(errors['my/fast'])
+        for handle in handles[1:]:
+            self.assertIsInstance(errors[handle], DeadlineExceededError)
+        # The request timeouts were shortened to the total timeout:
+        for connect_timeout, read_timeout in timeouts:
+            self.assertLessEqual(read_timeout, 0.3)
+
+    # Instantiation
+
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_instantiate_with_username_and_password_wrongpw(self, getpatch):
         
 
@@ -246,7 +481,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
 
         self.assertIsInstance(inst, RESTHandleClient)
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_instantiate_with_username_and_password_inexistentuser(self, getpatch):
         
         # Define the replacement for the patched method:
@@ -257,7 +492,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
             inst = RESTHandleClient.instantiate_with_username_and_password(
                 'http://someurl', '100:john/doe', 'passywordy')
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_instantiate_with_credentials_inexistentuser(self, getpatch):
         """Test instantiation of client: Exception if username does not exist."""
 
@@ -281,7 +516,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         # If the user name has no index, exception is already thrown in credentials creation!
         #self.assertRaises(HandleSyntaxError, pyhandle.PIDClientCredentials, 'url', 'prefix/suffix', randompassword)
 
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_instantiate_with_credentials(self, getpatch):
         """Test instantiation of client: No exception if password wrong."""
 
@@ -323,7 +558,7 @@ class RESTHandleClientReadaccessPatchedTestCase(unittest.TestCase):
         self.assertIsInstance(inst, RESTHandleClient)
 
     @mock.patch('pyhandle.handlesystemconnector.HandleSystemConnector.check_if_username_exists')
-    @mock.patch('pyhandle.handleclient.requests.Session.get')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
     def test_instantiate_with_credentials_config_override(self, getpatch, checkpatch):
         """Test instantiation of client: We pass a config value in the credentials
         and also as an arg in the instantiation. We want the latter to override the
@@ -0,0 +1,162 @@
+"""Testing one client shared by many threads, against a local stand-in
+for the Handle Server (no access to a real server required)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pyhandle
+from pyhandle.client.resthandleclient import RESTHandleClient
+
+PATH_CRED = pyhandle.util.get_neighbour_directory(__file__, 'testcredentials')
+CRED_FILE = PATH_CRED+'/fake_certs_and_keys/fake_certi_and_bothkeys.pem'
+
+NUM_THREADS = 16
+NUM_ROUNDS = 10
+SHARED_HANDLE = 'my/shared'
+
+
+class StandInHandleServer(object):
+    '''
+    A minimal, thread-safe in-memory imitation of the Handle Server's
+    REST API (GET, PUT and DELETE of handle records and of values).
+    '''
+
+    def __init__(self):
+        self.records = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stand_in.handle_request(self, 'GET')
+
+            def do_PUT(self):
+                stand_in.handle_request(self, 'PUT')
+
+            def do_DELETE(self):
+                stand_in.handle_request(self, 'DELETE')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:'+str(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle_request(self, handler, method):
+        url = urlsplit(handler.path)
+        handle = url.path.split('/api/handles/', 1)[1]
+        query = parse_qs(url.query)
+        indices = [int(index) for index in query.get('index', [])]
+        body = handler.rfile.read(int(handler.headers.get('Content-Length') or 0))
+        with self.lock:
+            self.requests.append((method, handle, handler.headers.get('Authorization')))
+            status, content = getattr(self, method.lower())(handle, indices, query, body)
+        payload = json.dumps(content).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def get(self, handle, indices, query, body):
+        if handle not in self.records:
+            return 404, {'responseCode': 100, 'handle': handle}
+        values = self.records[handle]
+        if indices:
+            values = [value for value in values if value['index'] in indices]
+        if 'type' in query:
+            values = [value for value in values if value['type'] in query['type']]
+        return 200, {'responseCode': 1, 'handle': handle, 'values': values}
+
+    def put(self, handle, indices, query, body):
+        values = json.loads(body.decode('utf-8'))['values']
+        for value in values:
+            if not isinstance(value['data'], dict):
+                value['data'] = {'format': 'string', 'value': value['data']}
+        exists = handle in self.records
+        if exists and query.get('overwrite') == ['false']:
+            return 409, {'responseCode': 101, 'handle': handle}
+        if indices and exists:
+            kept = [value for value in self.records[handle] if value['index'] not in indices]
+            values = kept + values
+        self.records[handle] = sorted(values, key=lambda value: value['index'])
+        return (200 if exists else 201), {'responseCode': 1, 'handle': handle}
+
+    def delete(self, handle, indices, query, body):
+        if handle not in self.records:
+            return 404, {'responseCode': 100, 'handle': handle}
+        if indices:
+            self.records[handle] = [value for value in self.records[handle] if value['index'] not in indices]
+        else:
+            del self.records[handle]
+        return 200, {'responseCode': 1, 'handle': handle}
+
+
+class RESTHandleClientConcurrencyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInHandleServer()
+        self.server.records[SHARED_HANDLE] = [
+            {'index': 1, 'type': 'URL', 'data': {'format': 'string', 'value': 'http://shared.foo'}}
+        ]
+        self.server.start()
+        self.inst = RESTHandleClient(
+            handle_server_url=self.server.url,
+            certificate_and_key=CRED_FILE,
+            pool_maxsize=NUM_THREADS,
+            pool_block=True
+        )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def hammer(self, number, errors):
+        handle = 'my/stress-'+str(number)
+        try:
+            self.inst.register_handle_kv(handle, URL='http://foo.foo/'+str(number))
+            for i in range(NUM_ROUNDS):
+                self.inst.modify_handle_value(handle, TEST=str(number)+'-'+str(i))
+                self.assertEqual(self.inst.get_value_from_handle(handle, 'TEST'), str(number)+'-'+str(i))
+                self.assertEqual(self.inst.get_value_from_handle(SHARED_HANDLE, 'URL'), 'http://shared.foo')
+            self.assertEqual(self.inst.get_value_from_handle(handle, 'URL'), 'http://foo.foo/'+str(number))
+            self.inst.delete_handle(handle)
+            self.assertIsNone(self.inst.retrieve_handle_record_json(handle))
+        except Exception as exc:
+            errors.append((handle, exc))
+
+    def test_many_threads_one_client(self):
+        """Test that one client can be used by many threads at the same time."""
+        errors = []
+        threads = [threading.Thread(target=self.hammer, args=(n, errors)) for n in range(NUM_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(list(self.server.records.keys()), [SHARED_HANDLE])
+        # Every write carried the client cert authorization:
+        writes = [req for req in self.server.requests if req[0] != 'GET']
+        self.assertEqual(len(writes), NUM_THREADS*(NUM_ROUNDS+2))
+        for _, handle, authorization in writes:
+            self.assertEqual(authorization, 'Handle clientCert="true"', handle)
@@ -8,9 +8,10 @@ else:
 
 import json
 import mock
+import time
 import pyhandle
 import pyhandle.handlesystemconnector as connector
-from pyhandle.handleexceptions import HandleSyntaxError, CredentialsFormatError, GenericHandleError, HandleNotFoundException
+from pyhandle.handleexceptions import HandleSyntaxError, CredentialsFormatError, GenericHandleError, HandleNotFoundException, DeadlineExceededError
 from pyhandle.utilhandle import check_handle_syntax, check_handle_syntax_with_index, remove_index_from_handle
 from pyhandle.tests.mockresponses import MockResponse, MockSearchResponse
 from pyhandle.tests.utilities import replace_timestamps, failure_message
@@ -69,6 +70,20 @@ class RESTHandleConnectorAccessPatchedTestCase(unittest.TestCase):
         self.assertEqual(getpatch.call_count, 1,
             'The method "requests.get" was not called once, but '+str(getpatch.call_count)+' times.')
 
+    @mock.patch('requests.Session.get')
+    def test_get_request_sends_cert_every_time(self, getpatch):
+
+        # Define the replacement for the patched GET method:
+        getpatch.return_value = MockResponse()
+
+        # Run code to be tested
+        self.inst.send_handle_get_request('123/456')
+        self.inst.send_handle_get_request('123/456', auth=True)
+
+        # Check desired outcome (not only the first request carries the cert):
+        for call in getpatch.call_args_list:
+            self.assertEqual(call[1]['cert'], CRED_FILE)
+
     @mock.patch('requests.Session.put')
     def test_put_request(self, putpatch):
 
@@ -231,3 +246,102 @@ class RESTHandleConnectorAccessPatchedTestCase(unittest.TestCase):
         # Call method and check result:
         with self.assertRaises(HandleNotFoundException):
             self.inst.check_if_username_exists(testhandle)
+
+    # Retries:
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_get_request_retried(self, getpatch, sleeppatch):
+
+        # Define the replacement for the patched GET method:
+        getpatch.side_effect = [MockResponse(status_code=503), MockResponse(success=True)]
+        inst = connector.HandleSystemConnector(handle_server_url='http://foo.com', max_retries=3)
+
+        # Run code to be tested
+        resp = inst.send_handle_get_request('123/456')
+
+        # Check desired outcome:
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(getpatch.call_count, 2)
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_get_request_not_retried_by_default(self, getpatch, sleeppatch):
+
+        # Define the replacement for the patched GET method:
+        getpatch.return_value = MockResponse(status_code=503)
+
+        # Run code to be tested
+        for _ in range(6):
+            resp = self.inst.send_handle_get_request('123/456')
+
+        # Check desired outcome (no retries, no circuit breaker):
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(getpatch.call_count, 6)
+        self.assertEqual(sleeppatch.call_count, 0)
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.put')
+    def test_put_request_not_retried_without_overwrite(self, putpatch, sleeppatch):
+
+        # Define the replacement for the patched PUT method:
+        putpatch.return_value = MockResponse(status_code=503)
+
+        inst = connector.HandleSystemConnector(
+            certificate_and_key=CRED_FILE,
+            handle_server_url='http://foo.com',
+            max_retries=3
+        )
+
+        # Run code to be tested
+        entries = [{'index':2, 'type':'XYZ', 'data':'xyz'}]
+        inst.send_handle_put_request(handle='123/456', list_of_entries=entries, overwrite=False)
+        self.assertEqual(putpatch.call_count, 1)
+        inst.send_handle_put_request(handle='123/456', list_of_entries=entries, overwrite=True)
+        self.assertEqual(putpatch.call_count, 1+4)
+
+    # Timeouts:
+
+    @mock.patch('requests.Session.get')
+    def test_get_request_timeout(self, getpatch):
+
+        # Define the replacement for the patched GET method:
+        getpatch.return_value = MockResponse()
+
+        # Run code to be tested
+        self.inst.send_handle_get_request('123/456')
+        self.assertEqual(self.get_kw_attribute_from_mockresponse('timeout', getpatch), (10, 60))
+        self.inst.send_handle_get_request('123/456', timeout=3)
+        self.assertEqual(self.get_kw_attribute_from_mockresponse('timeout', getpatch), (3, 3))
+
+        # The timeout must not end up in the URL:
+        self.assertNotIn('timeout', self.get_pos_attribute_from_mockresponse(0, getpatch))
+
+    @mock.patch('requests.Session.delete')
+    def test_delete_request_deadline_exceeded(self, deletepatch):
+
+        # Run code to be tested
+        with self.assertRaises(DeadlineExceededError):
+            self.inst.send_handle_delete_request(handle='123/456', deadline=time.time()-1)
+
+        # Check desired outcome:
+        self.assertEqual(deletepatch.call_count, 0)
+
+    # Logging:
+
+    @mock.patch('pyhandle.utilhandle.make_request_log_message')
+    @mock.patch('requests.Session.get')
+    def test_request_log_message_only_built_if_enabled(self, getpatch, messagepatch):
+
+        # Define the replacement for the patched GET method:
+        getpatch.return_value = MockResponse()
+        messagepatch.return_value = 'GET my/testhandle'
+
+        # Run code to be tested, without and with a listener:
+        self.addCleanup(connector.REQUESTLOGGER.setLevel, connector.REQUESTLOGGER.level)
+        connector.REQUESTLOGGER.setLevel(connector.logging.WARNING)
+        self.inst.send_handle_get_request('123/456')
+        self.assertEqual(messagepatch.call_count, 0)
+        connector.REQUESTLOGGER.setLevel(connector.logging.INFO)
+        self.inst.send_handle_get_request('123/456')
+        self.assertEqual(messagepatch.call_count, 1)
@@ -7,9 +7,11 @@ else:
     import unittest
 
 import json
+import socket
+import time
 import pyhandle
 from pyhandle.handlesystemconnector import HandleSystemConnector
-from pyhandle.handleexceptions import HandleSyntaxError, CredentialsFormatError
+from pyhandle.handleexceptions import HandleSyntaxError, CredentialsFormatError, DeadlineExceededError
 from pyhandle.utilhandle import check_handle_syntax, check_handle_syntax_with_index, remove_index_from_handle
 
 # Load some data that is needed for testing
@@ -134,4 +136,57 @@ class RESTHandleConnectorNoaccessTestCase(unittest.TestCase):
             inst = HandleSystemConnector(
                 certificate_and_key=PATH_CRED+'/noexist.pem',
                 handle_server_url='http://foo.com'
-            )
\ No newline at end of file
+            )
+    # Connection pool:
+
+    def test_init_pool_settings(self):
+
+        inst = HandleSystemConnector(pool_connections=2, pool_maxsize='32', pool_block='true')
+        adapter = inst._HandleSystemConnector__session.get_adapter('https://foo.com')
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertEqual(adapter._pool_block, True)
+        self.assertIs(adapter, inst._HandleSystemConnector__session.get_adapter('http://foo.com'))
+
+    def test_init_pool_settings_default(self):
+
+        session = self.inst._HandleSystemConnector__session
+        adapter = session.get_adapter('https://foo.com')
+        self.assertEqual(adapter._pool_maxsize, 10)
+        self.assertEqual(adapter._pool_block, False)
+        self.assertIsNone(adapter.socket_options)
+        self.assertEqual(session.headers['Connection'], 'keep-alive')
+
+    def test_init_keep_alive_settings(self):
+
+        inst = HandleSystemConnector(keep_alive=False, tcp_keepalive=True)
+        session = inst._HandleSystemConnector__session
+        self.assertEqual(session.headers['Connection'], 'close')
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            session.get_adapter('https://foo.com').socket_options)
+
+    def test_init_pool_settings_invalid(self):
+
+        with self.assertRaises(ValueError):
+            HandleSystemConnector(pool_maxsize=0)
+
+    # Timeouts:
+
+    def test_init_timeout_settings(self):
+
+        inst = HandleSystemConnector(timeout=['3', 30], read_timeout=20)
+        self.assertEqual(inst.get_timeout(), (3, 20))
+        self.assertEqual(self.inst.get_timeout(), (10, 60))
+
+    def test_get_timeout_deadline(self):
+
+        timeout = self.inst.get_timeout(timeout=(1, 30), deadline=time.time()+2)
+        self.assertEqual(timeout[0], 1)
+        self.assertTrue(1 < timeout[1] <= 2)
+        with self.assertRaises(DeadlineExceededError):
+            self.inst.get_timeout(deadline=time.time()-1)
+
+    def test_init_timeout_invalid(self):
+
+        with self.assertRaises(ValueError):
+            HandleSystemConnector(timeout=-1)
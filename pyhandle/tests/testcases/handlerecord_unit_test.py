@@ -0,0 +1,72 @@
+"""Testing the HandleRecord (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import json
+import mock
+import pyhandle
+from pyhandle.client.resthandleclient import RESTHandleClient
+from pyhandle.handlerecord import HandleRecord, get_free_index
+from pyhandle.tests.mockresponses import MockResponse
+
+PATH_RES = pyhandle.util.get_neighbour_directory(__file__, 'resources')
+
+
+class HandleRecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATH_RES+'/handlerecord_for_reading_PUBLIC.json') as json_file:
+            self.handlerecord_json = json.load(json_file)
+        self.record = HandleRecord(self.handlerecord_json)
+
+    def test_lookups(self):
+        """Test the lookups by type and by index."""
+        record = self.record
+        self.assertEqual(record.handle, 'someprefix/somesuffix')
+        self.assertEqual(record.get('TEST1'), 'val1')
+        self.assertEqual(record.get('TESTDUP'), 'dup1')
+        self.assertEqual(record.get_all('TESTDUP'), ['dup1', 'dup2'])
+        self.assertEqual(record.indices('TESTDUP'), [5, 6])
+        self.assertIsNone(record.get('NOTTHERE'))
+        self.assertEqual(record.get('NOTTHERE', 'default'), 'default')
+        self.assertEqual(record.get_all('NOTTHERE'), [])
+        self.assertEqual(record.by_index('3')['type'], 'TEST1')
+        self.assertIsNone(record.by_index(2))
+        self.assertEqual(record.used_indices(), set([100, 3, 4, 5, 6]))
+        self.assertIn('TEST2', record)
+        self.assertEqual(len(record), 5)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_conversions(self):
+        """Test converting to and from the dict and JSON formats."""
+        record = self.record
+        self.assertIs(record.to_json(), self.handlerecord_json)
+        self.assertIs(HandleRecord.from_json(record), record)
+        self.assertIsNone(HandleRecord.from_json(None))
+        self.assertEqual(HandleRecord.from_json(record.dumps()).to_json(), self.handlerecord_json)
+        self.assertEqual(record.to_dict(types=['TEST1', 'TESTDUP']), {'TEST1': 'val1', 'TESTDUP': 'dup1'})
+
+        record = HandleRecord.from_dict('my/testhandle', {'CHECKSUM': 'abc', 'URL': 'http://foo.bar'})
+        self.assertEqual(record.by_index(1)['type'], 'URL')
+        self.assertEqual(record.indices('CHECKSUM'), [2])
+        self.assertEqual(record.to_dict(), {'CHECKSUM': 'abc', 'URL': 'http://foo.bar'})
+        self.assertEqual(HandleRecord({'handle': 'my/testhandle'}).to_dict(), {})
+
+    def test_free_index(self):
+        """Test that new indices avoid the used and reserved ones."""
+        self.assertEqual(get_free_index(set([2, 3])), 4)
+        self.assertEqual(get_free_index(set([2]), url=True), 1)
+        self.assertEqual(get_free_index(set([100]), hs_admin=True), 101)
+
+    @mock.patch('requests.Session.get')
+    def test_client_accepts_handle_record(self, getpatch):
+        """Test that the client uses a HandleRecord that it is given, without a request."""
+        client = RESTHandleClient.instantiate_for_read_access('http://foo.com')
+        self.assertEqual(client.get_value_from_handle('someprefix/somesuffix', 'TEST2', self.record), 'val2')
+        self.assertEqual(client.retrieve_handle_record('someprefix/somesuffix', self.record)['TEST1'], 'val1')
+        self.assertEqual(client.get_handlerecord_indices_for_key('TEST1', self.record), [3])
+        self.assertEqual(getpatch.call_count, 0)
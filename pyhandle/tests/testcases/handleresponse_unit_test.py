@@ -0,0 +1,48 @@
+"""Testing the parsed response wrapper (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+from pyhandle import hsresponses
+from pyhandle.handleresponse import HandleResponse, get_handle_response
+from pyhandle.jsoncodec import StdlibJSONCodec
+from pyhandle.tests.mockresponses import MockResponse
+
+
+class HandleResponseTestCase(unittest.TestCase):
+
+    def test_parsed_once(self):
+        """Test that the body is decoded and parsed only once."""
+        codec = mock.Mock(wraps=StdlibJSONCodec())
+        resp = get_handle_response(MockResponse(success=True), codec)
+        self.assertTrue(hsresponses.handle_success(resp))
+        self.assertTrue(hsresponses.does_handle_exist(resp))
+        self.assertFalse(hsresponses.handle_not_found(resp))
+        self.assertEqual(resp.body['handle'], 'my/testhandle')
+        self.assertEqual(codec.loads.call_count, 1)
+
+    def test_wrap(self):
+        """Test that responses are wrapped once and keep their attributes."""
+        raw = MockResponse(notfound=True)
+        resp = get_handle_response(raw)
+        self.assertIs(get_handle_response(resp), resp)
+        self.assertIsNone(get_handle_response(None))
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.response_code, 100)
+        self.assertIs(resp.request, raw.request)
+        self.assertEqual(resp.json(), {'responseCode': 100, 'handle': 'my/testhandle'})
+
+    def test_not_json(self):
+        """Test responses whose body is not JSON."""
+        resp = HandleResponse(MockResponse(status_code=502, content=b'<html>Bad Gateway</html>'))
+        self.assertEqual(resp.text, '<html>Bad Gateway</html>')
+        self.assertIsNone(resp.response_code)
+        with self.assertRaises(ValueError):
+            resp.body
+        self.assertFalse(hsresponses.handle_success(resp))
+        self.assertFalse(hsresponses.not_authenticated(resp))
+        self.assertTrue(hsresponses.not_authenticated(MockResponse(status_code=401, content='Unauthorized')))
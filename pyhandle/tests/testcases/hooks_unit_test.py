@@ -0,0 +1,113 @@
+"""Testing the request hooks (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+import requests
+import pyhandle
+from pyhandle.client.resthandleclient import RESTHandleClient
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.hooks import HookChain, RequestHook
+from pyhandle.tests.mockresponses import MockResponse, MockSearchResponse
+
+PATH_CRED = pyhandle.util.get_neighbour_directory(__file__, 'testcredentials')
+CRED_FILE = PATH_CRED+'/fake_certs_and_keys/fake_certi_and_bothkeys.pem'
+
+
+class RecordingHook(RequestHook):
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def before_request(self, request):
+        self.calls.append(('before', self.name, request.op, request.handle))
+        request.context[self.name] = 'span'
+
+    def after_request(self, request):
+        self.calls.append(('after', self.name, request.status, request.error.__class__.__name__
+            if request.error is not None else None))
+
+
+class FailingHook(RequestHook):
+
+    def before_request(self, request):
+        raise requests.exceptions.ConnectionError('injected')
+
+
+class RequestHooksTestCase(unittest.TestCase):
+
+    def make_connector(self, hooks):
+        return HandleSystemConnector(
+            certificate_and_key=CRED_FILE,
+            handle_server_url='http://foo.com',
+            request_hooks=hooks
+        )
+
+    def test_from_args(self):
+        """Test that no hooks mean no hook chain."""
+        self.assertIsNone(HookChain.from_args({}))
+        self.assertIsNone(HookChain.from_args({'request_hooks': []}))
+        chain = HookChain.from_args({'request_hooks': [RequestHook()]})
+        self.assertIs(HookChain.from_args({'request_hooks': chain}), chain)
+        self.assertIsNone(self.make_connector(None).get_request_hooks())
+
+    @mock.patch('requests.Session.delete')
+    @mock.patch('requests.Session.get')
+    def test_hooks_called_in_order(self, getpatch, deletepatch):
+        """Test that hooks are called like a middleware chain, with the request's data."""
+        getpatch.return_value = MockResponse(success=True)
+        deletepatch.return_value = MockResponse(notfound=True)
+        calls = []
+        requests_seen = []
+        outer, inner = RecordingHook('outer', calls), RecordingHook('inner', calls)
+        inner.after_request = lambda request: requests_seen.append(request)
+        inst = self.make_connector([outer, inner])
+
+        inst.send_handle_get_request('my/testhandle')
+        self.assertEqual(calls, [('before', 'outer', 'GET', 'my/testhandle'),
+                                 ('before', 'inner', 'GET', 'my/testhandle'),
+                                 ('after', 'outer', 200, None)])
+        request = requests_seen[0]
+        self.assertEqual(request.url, 'http://foo.com/api/handles/my/testhandle')
+        self.assertEqual(request.context, {'outer': 'span', 'inner': 'span'})
+        self.assertGreaterEqual(request.latency, 0)
+
+        inst.send_handle_delete_request(handle='my/testhandle')
+        self.assertEqual(requests_seen[1].op, 'DELETE')
+        self.assertEqual(requests_seen[1].status, 404)
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_failed_request(self, getpatch, sleeppatch):
+        """Test that hooks see requests that raise."""
+        getpatch.side_effect = requests.exceptions.Timeout()
+        calls = []
+        inst = self.make_connector([RecordingHook('hook', calls)])
+        with self.assertRaises(requests.exceptions.Timeout):
+            inst.send_handle_get_request('my/testhandle')
+        self.assertEqual(calls[-1], ('after', 'hook', None, 'Timeout'))
+
+    @mock.patch('requests.Session.get')
+    def test_fault_injection(self, getpatch):
+        """Test that a hook can make a request fail before it is sent."""
+        calls = []
+        inst = self.make_connector([RecordingHook('outer', calls), FailingHook()])
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            inst.send_handle_get_request('my/testhandle')
+        self.assertEqual(getpatch.call_count, 0)
+        self.assertEqual(calls[-1], ('after', 'outer', None, 'ConnectionError'))
+
+    @mock.patch('requests.Session.get')
+    def test_client_passes_hooks_to_searcher(self, getpatch):
+        """Test that search requests are hooked, too."""
+        getpatch.return_value = MockSearchResponse(success=True)
+        calls = []
+        client = RESTHandleClient.instantiate_for_read_and_search('http://handle.server', 'user', 'pass',
+            request_hooks=[RecordingHook('hook', calls)])
+        client.search_handle(URL='*')
+        self.assertEqual(calls, [('before', 'hook', 'SEARCH', ''), ('after', 'hook', 200, None)])
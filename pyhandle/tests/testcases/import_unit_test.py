@@ -0,0 +1,71 @@
+"""Testing that the clients and their dependencies are imported lazily (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import subprocess
+import textwrap
+import pyhandle
+from pyhandle.client.resthandleclient import RESTHandleClient
+from pyhandle.tests.import_benchmark import get_loaded_heavy_modules
+
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_import_pyhandle_is_light(self):
+        """Test that "import pyhandle" loads neither the clients, nor requests, nor pymysql."""
+        self.assertEqual(get_loaded_heavy_modules('import pyhandle'), [])
+
+    def test_rest_client_without_pymysql(self):
+        """Test that the REST client does not need pymysql."""
+        heavy = get_loaded_heavy_modules('import pyhandle\npyhandle.handleclient.PyHandleClient("rest")')
+        self.assertIn('requests', heavy)
+        self.assertNotIn('pymysql', heavy)
+
+    def test_lazy_attributes(self):
+        """Test that the lazily imported modules and classes are still found."""
+        self.assertIs(pyhandle.handleclient.RESTHandleClient, RESTHandleClient)
+        self.assertIs(pyhandle.client.resthandleclient.RESTHandleClient, RESTHandleClient)
+        with self.assertRaises(AttributeError):
+            pyhandle.no_such_module
+        with self.assertRaises(AttributeError):
+            pyhandle.handleclient.NoSuchClient
+
+    def test_handle_clients(self):
+        """Test the list of the client classes and the error for an unknown client."""
+        self.assertEqual(get_loaded_heavy_modules('import pyhandle.handleclient'), ['pyhandle.handleclient'])
+        clients = pyhandle.handleclient.PyHandleClient.HANDLE_CLIENTS
+        self.assertEqual([client.__name__ for client in clients], ['DBHandleClient', 'RESTHandleClient', 'BatchHandleClient'])
+        self.assertIn(RESTHandleClient, clients)
+        self.assertIs(pyhandle.handleclient.PyHandleClient('rest').HANDLE_CLIENTS, clients)
+        self.assertIs(pyhandle.handleclient.get_handle_client_class('rest'), RESTHandleClient)
+        with self.assertRaisesRegex(ValueError, "Allowed clients: 'db', 'rest', 'batch'"):
+            pyhandle.handleclient.get_handle_client_class('foo')
+
+    def test_connector_alone(self):
+        """Test that the connector works without anything else importing its dependencies."""
+        script = textwrap.dedent("""
+            import mock
+            from pyhandle.handlesystemconnector import HandleSystemConnector
+
+            class Response(object):
+                def __init__(self, status_code, content):
+                    self.status_code = status_code
+                    self.content = content
+                    self.request = None
+
+            record = b'{"responseCode":1, "handle":"my/user", "values":[]}'
+            created = b'{"responseCode":1, "handle":"my/testhandle"}'
+            with mock.patch('requests.Session.get', return_value=Response(200, record)), \\
+                 mock.patch('requests.Session.put', return_value=Response(201, created)):
+                inst = HandleSystemConnector(handle_server_url='http://foo.com',
+                                             username='300:my/user', password='pass')
+                resp, _ = inst.send_handle_put_request(handle='my/testhandle',
+                    list_of_entries=[{'index': 1, 'type': 'URL', 'data': 'http://foo.bar'}])
+            print(resp.status_code)
+        """)
+        output = subprocess.check_output([sys.executable, '-c', script], stderr=subprocess.STDOUT)
+        self.assertEqual(output.decode('utf-8').strip(), '201')
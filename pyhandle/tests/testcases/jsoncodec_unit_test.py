@@ -0,0 +1,64 @@
+"""Testing the JSON codecs (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import json
+import mock
+import pyhandle
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.jsoncodec import StdlibJSONCodec, OrjsonCodec, get_json_codec, orjson
+
+PATH_CRED = pyhandle.util.get_neighbour_directory(__file__, 'testcredentials')
+CRED_FILE = PATH_CRED+'/fake_certs_and_keys/fake_certi_and_bothkeys.pem'
+PATH_RES = pyhandle.util.get_neighbour_directory(__file__, 'resources')
+RECORD = open(PATH_RES+'/handlerecord_for_reading_PUBLIC.json').read()
+
+
+class JSONCodecTestCase(unittest.TestCase):
+
+    def test_get_json_codec(self):
+        """Test selecting a codec by name."""
+        self.assertEqual(get_json_codec('json').name, 'json')
+        self.assertEqual(get_json_codec().name, 'json' if orjson is None else 'orjson')
+        codec = StdlibJSONCodec()
+        self.assertIs(get_json_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_json_codec('simplejson')
+        with mock.patch('pyhandle.jsoncodec.orjson', None):
+            self.assertEqual(get_json_codec('auto').name, 'json')
+            with self.assertRaises(ImportError):
+                get_json_codec('orjson')
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_codecs_agree(self):
+        """Test that both codecs read and write the same documents."""
+        stdlib, fast = StdlibJSONCodec(), OrjsonCodec()
+        record = stdlib.loads(RECORD)
+        self.assertEqual(fast.loads(RECORD.encode('utf-8')), record)
+        self.assertEqual(json.loads(fast.dumps(record)), record)
+
+        # Also what orjson itself does not support:
+        self.assertEqual(json.loads(fast.dumps({'value': 2**70})), {'value': 2**70})
+        self.assertEqual(fast.loads('{"value": %d}' % 2**70), {'value': 2**70})
+        with self.assertRaises(ValueError):
+            fast.loads('<html>Bad Gateway</html>')
+
+    def test_non_ascii_payload_sent_as_utf8(self):
+        """Test that payloads with non-ASCII characters are sent as UTF-8."""
+        for name in ['json', 'orjson'] if orjson is not None else ['json']:
+            inst = HandleSystemConnector(
+                certificate_and_key=CRED_FILE,
+                handle_server_url='http://foo.com',
+                json_codec=name
+            )
+            with mock.patch('requests.Session.put') as putpatch:
+                putpatch.return_value = mock.Mock(status_code=201, content=b'{"responseCode":1}')
+                _, payload = inst.send_handle_put_request(handle='my/handle',
+                    list_of_entries=[{'index': 1, 'type': 'TITLE', 'data': u'Straße'}])
+            data = putpatch.call_args[1]['data']
+            self.assertEqual(json.loads(data.decode('utf-8')), json.loads(payload))
+            self.assertEqual(json.loads(payload)['values'][0]['data'], u'Straße')
@@ -0,0 +1,91 @@
+"""Testing the client-side rate limiter (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+import time
+from pyhandle.ratelimiter import RateLimiter, TokenBucket
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.handleexceptions import DeadlineExceededError
+from pyhandle.tests.mockresponses import MockResponse
+
+
+@mock.patch('pyhandle.ratelimiter.time.monotonic')
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_burst_then_rate(self, timepatch):
+        """Test that a full bucket allows a burst, then the rate applies."""
+        timepatch.return_value = 1000
+        bucket = TokenBucket(rate=2, capacity=3)
+        waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0, 0, 0, 0.5, 1.0])
+
+    def test_refill(self, timepatch):
+        """Test that tokens are added over time, up to the capacity."""
+        timepatch.return_value = 1000
+        bucket = TokenBucket(rate=10, capacity=1)
+        self.assertEqual(bucket.reserve(), 0)
+        timepatch.return_value = 1000.05
+        self.assertAlmostEqual(bucket.reserve(), 0.05)
+        timepatch.return_value = 1100
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_cancel(self, timepatch):
+        """Test giving back a reserved token."""
+        timepatch.return_value = 1000
+        bucket = TokenBucket(rate=1)
+        bucket.reserve()
+        self.assertEqual(bucket.reserve(), 1)
+        bucket.cancel()
+        self.assertEqual(bucket.reserve(), 1)
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def test_from_args(self):
+        """Test creating a rate limiter from (string) config values."""
+        self.assertIsNone(RateLimiter.from_args({}))
+        limiter = RateLimiter.from_args({'rate_limit': '5', 'write_rate_limit': 1})
+        self.assertIs(RateLimiter.from_args({'rate_limiter': limiter, 'rate_limit': 3}), limiter)
+        with self.assertRaises(ValueError):
+            RateLimiter.from_args({'rate_limit': 0})
+
+    def test_shared_group(self):
+        """Test that clients of one group share the rate limiter."""
+        limiter1 = RateLimiter.from_args({'rate_limit': 5, 'rate_limit_group': 'test_shared_group'})
+        limiter2 = RateLimiter.from_args({'rate_limit': 7, 'rate_limit_group': 'test_shared_group'})
+        self.assertIs(limiter1, limiter2)
+
+    def test_kinds_are_separate(self):
+        """Test that only configured kinds are limited, each on its own."""
+        limiter = RateLimiter(write=1)
+        for _ in range(5):
+            self.assertEqual(limiter.get_wait_time('read'), 0)
+        self.assertEqual(limiter.get_wait_time('write'), 0)
+        self.assertGreater(limiter.get_wait_time('write'), 0)
+
+    def test_deadline(self):
+        """Test that a request that would wait beyond the deadline is refused."""
+        limiter = RateLimiter(read=1)
+        limiter.get_wait_time('read')
+        with self.assertRaises(DeadlineExceededError):
+            limiter.get_wait_time('read', deadline=time.time()+0.5, handle='my/handle')
+        # The token was given back:
+        self.assertLessEqual(limiter.get_wait_time('read'), 1)
+
+    @mock.patch('pyhandle.ratelimiter.time.sleep')
+    @mock.patch('pyhandle.handlesystemconnector.requests.Session.get')
+    def test_connector_waits(self, getpatch, sleeppatch):
+        """Test that the connector waits before sending requests beyond the rate."""
+        getpatch.return_value = MockResponse(success=True)
+        inst = HandleSystemConnector(read_rate_limit=2, rate_limit_burst=1)
+        for _ in range(3):
+            inst.send_handle_get_request('my/testhandle')
+        self.assertEqual(getpatch.call_count, 3)
+        self.assertEqual(sleeppatch.call_count, 2)
+        self.assertAlmostEqual(sleeppatch.call_args_list[1][0][0], 1.0, places=1)
@@ -0,0 +1,137 @@
+"""Testing the record cache (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+from pyhandle.recordcache import RecordCache, NotFoundCache, TTLCache
+
+
+def make_record(handle, *ttls):
+    values = [{'index': i+1, 'type': 'TEST'+str(i), 'data': {'format': 'string', 'value': 'val'}, 'ttl': ttl}
+              for i, ttl in enumerate(ttls)]
+    return {'responseCode': 1, 'handle': handle, 'values': values}
+
+
+class RecordCacheTestCase(unittest.TestCase):
+
+    def test_get_ttl(self):
+        """Test that records expire after their smallest ttl, capped by max_ttl."""
+        cache = RecordCache(max_ttl=300)
+        self.assertEqual(cache.get_ttl(make_record('my/handle', 86400, 60, 3600)), 60)
+        self.assertEqual(cache.get_ttl(make_record('my/handle', 86400)), 300)
+        self.assertEqual(cache.get_ttl({'handle': 'my/handle'}), 300)
+
+    def test_put_and_get_copies(self):
+        """Test that cached records cannot be modified by the caller."""
+        cache = RecordCache()
+        record = make_record('my/handle', 86400)
+        cache.put('my/handle', record)
+        record['values'] = []
+
+        received = cache.get('my/handle')
+        self.assertEqual(len(received['values']), 1)
+        received['values'] = []
+        self.assertEqual(len(cache.get('my/handle')['values']), 1)
+        self.assertEqual(cache.get('hdl:my/handle')['handle'], 'my/handle')
+
+    @mock.patch('pyhandle.recordcache.time.monotonic')
+    def test_expiry(self, timepatch):
+        """Test that records expire."""
+        cache = RecordCache()
+        timepatch.return_value = 1000
+        cache.put('my/handle', make_record('my/handle', 60))
+        timepatch.return_value = 1059
+        self.assertIsNotNone(cache.get('my/handle'))
+        timepatch.return_value = 1061
+        self.assertIsNone(cache.get('my/handle'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations'], stats['size']), (1, 1, 1, 0))
+
+    def test_zero_ttl_not_cached(self):
+        """Test that records with ttl 0 are not cached."""
+        cache = RecordCache()
+        cache.put('my/handle', make_record('my/handle', 0))
+        self.assertIsNone(cache.get('my/handle'))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used record is evicted."""
+        cache = RecordCache(maxsize=2)
+        cache.put('my/a', make_record('my/a', 60))
+        cache.put('my/b', make_record('my/b', 60))
+        cache.get('my/a')
+        cache.put('my/c', make_record('my/c', 60))
+        self.assertIsNotNone(cache.get('my/a'))
+        self.assertIsNone(cache.get('my/b'))
+        self.assertIsNotNone(cache.get('my/c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        """Test removing a record."""
+        cache = RecordCache()
+        cache.put('my/handle', make_record('my/handle', 60))
+        cache.invalidate('hdl:my/handle')
+        self.assertIsNone(cache.get('my/handle'))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_put_outdated_generation(self):
+        """Test that a record read before its handle was invalidated is not stored."""
+        cache = RecordCache(maxsize=2)
+        generation = cache.generation()
+        cache.invalidate('my/handle')
+        cache.put('my/handle', make_record('my/handle', 60), generation)
+        self.assertIsNone(cache.get('my/handle'))
+
+        # Other handles, and records read after the invalidation, are stored:
+        cache.put('my/other', make_record('my/other', 60), generation)
+        self.assertIsNotNone(cache.get('my/other'))
+        cache.put('my/handle', make_record('my/handle', 60), cache.generation())
+        self.assertIsNotNone(cache.get('my/handle'))
+
+        # Handles whose invalidation is forgotten count as invalidated:
+        for handle in ('my/a', 'my/b', 'my/c'):
+            cache.invalidate(handle)
+        cache.put('my/a', make_record('my/a', 60), generation)
+        self.assertIsNone(cache.get('my/a'))
+
+    def test_from_args(self):
+        """Test creating the cache from (string) config values."""
+        self.assertIsNone(RecordCache.from_args({}))
+        self.assertIsNone(RecordCache.from_args({'record_cache_size': 0}))
+        cache = RecordCache.from_args({'record_cache_size': '10', 'record_cache_max_ttl': '30'})
+        self.assertEqual(cache.stats()['maxsize'], 10)
+        self.assertEqual(cache.get_ttl(make_record('my/handle', 60)), 30)
+        with self.assertRaises(ValueError):
+            TTLCache(0)
+
+
+class NotFoundCacheTestCase(unittest.TestCase):
+
+    @mock.patch('pyhandle.recordcache.time.monotonic')
+    def test_expiry(self, timepatch):
+        """Test that not found handles are forgotten after the ttl."""
+        cache = NotFoundCache(ttl=10)
+        timepatch.return_value = 1000
+        self.assertFalse(cache.contains('my/handle'))
+        cache.add('my/handle')
+        timepatch.return_value = 1009
+        self.assertTrue(cache.contains('hdl:my/handle'))
+        timepatch.return_value = 1011
+        self.assertFalse(cache.contains('my/handle'))
+
+    def test_invalidate(self):
+        """Test forgetting a handle, e.g. after registering it."""
+        cache = NotFoundCache()
+        cache.add('my/handle')
+        cache.invalidate('my/handle')
+        self.assertFalse(cache.contains('my/handle'))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_from_args(self):
+        """Test creating the cache from (string) config values."""
+        self.assertIsNone(NotFoundCache.from_args({'record_cache_size': 10}))
+        cache = NotFoundCache.from_args({'not_found_cache_size': '2', 'not_found_cache_ttl': '5'})
+        self.assertEqual(cache.stats()['maxsize'], 2)
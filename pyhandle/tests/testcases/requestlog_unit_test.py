@@ -0,0 +1,119 @@
+"""Testing the structured request log (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import json
+import mock
+import os
+import shutil
+import tempfile
+import pyhandle
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.requestlog import RequestLog
+from pyhandle.tests.mockresponses import MockResponse
+
+PATH_CRED = pyhandle.util.get_neighbour_directory(__file__, 'testcredentials')
+CRED_FILE = PATH_CRED+'/fake_certs_and_keys/fake_certi_and_bothkeys.pem'
+
+
+class RequestLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'requests.jsonl')
+
+    def read_entries(self, request_log):
+        request_log.flush()
+        with open(self.path) as log_file:
+            return [json.loads(line) for line in log_file]
+
+    @mock.patch('requests.Session.put')
+    @mock.patch('requests.Session.get')
+    def test_connector_logs_requests(self, getpatch, putpatch):
+        """Test that the connector writes one JSON line per request, without body."""
+        getpatch.return_value = MockResponse(success=True)
+        putpatch.return_value = MockResponse(status_code=201)
+        inst = HandleSystemConnector(
+            certificate_and_key=CRED_FILE,
+            handle_server_url='http://foo.com',
+            request_log=self.path
+        )
+        self.addCleanup(inst.get_request_log().close)
+
+        inst.send_handle_get_request('my/testhandle')
+        _, payload = inst.send_handle_put_request(handle='my/testhandle',
+            list_of_entries=[{'index': 1, 'type': 'URL', 'data': 'http://foo.bar'}])
+
+        entries = self.read_entries(inst.get_request_log())
+        self.assertEqual([entry['op'] for entry in entries], ['GET', 'PUT'])
+        self.assertEqual(entries[0]['handle'], 'my/testhandle')
+        self.assertEqual(entries[0]['url'], 'http://foo.com/api/handles/my/testhandle')
+        self.assertEqual(entries[0]['status'], 200)
+        self.assertEqual(entries[0]['request_bytes'], 0)
+        self.assertEqual(entries[0]['response_bytes'], len(getpatch.return_value.content))
+        self.assertGreaterEqual(entries[0]['latency_ms'], 0)
+        self.assertEqual(entries[1]['status'], 201)
+        self.assertEqual(entries[1]['request_bytes'], len(payload))
+        self.assertNotIn('body', entries[0])
+
+    def test_body_truncated(self):
+        """Test that response bodies are truncated to the given size."""
+        request_log = RequestLog(self.path, body_bytes=10)
+        self.addCleanup(request_log.close)
+        request_log.log_request('GET', 'my/testhandle', 'http://foo.com', MockResponse(success=True))
+        entry = self.read_entries(request_log)[0]
+        self.assertEqual(entry['body'], '{"response')
+        self.assertTrue(entry['body_truncated'])
+        self.assertIsNone(entry['latency_ms'])
+
+    @mock.patch('pyhandle.requestlog.random.random')
+    def test_sampling(self, randompatch):
+        """Test that only the sampled requests are logged."""
+        request_log = RequestLog(self.path, sample_rate=0.25)
+        self.addCleanup(request_log.close)
+        for value in [0.1, 0.5, 0.2, 0.9]:
+            randompatch.return_value = value
+            request_log.log_request('GET', 'my/testhandle'+str(value), 'http://foo.com', MockResponse())
+        handles = [entry['handle'] for entry in self.read_entries(request_log)]
+        self.assertEqual(handles, ['my/testhandle0.1', 'my/testhandle0.2'])
+
+    def test_full_buffer_drops_entries(self):
+        """Test that entries are dropped instead of waiting for the writer."""
+        request_log = RequestLog(self.path, buffer_size=1)
+        self.addCleanup(request_log.close)
+        with mock.patch('pyhandle.requestlog.queue.Queue.put_nowait', side_effect=[None, pyhandle.requestlog.queue.Full]):
+            request_log.log_request('GET', 'my/testhandle', 'http://foo.com', None)
+            request_log.log_request('GET', 'my/testhandle', 'http://foo.com', None)
+        self.assertEqual(request_log.dropped, 1)
+
+    def test_from_args(self):
+        """Test that clients logging to one file share the request log."""
+        self.assertIsNone(RequestLog.from_args({}))
+        request_log = RequestLog.from_args({'request_log': self.path, 'request_log_sample_rate': '0.5',
+                                            'request_log_body_bytes': '100'})
+        self.addCleanup(request_log.close)
+        self.assertEqual(request_log.sample_rate, 0.5)
+        self.assertEqual(request_log.body_bytes, 100)
+        self.assertIs(RequestLog.from_args({'request_log': self.path}), request_log)
+        self.assertIs(RequestLog.from_args({'request_log': request_log}), request_log)
+        with self.assertRaises(ValueError):
+            RequestLog.from_args({'request_log': self.path+'2', 'request_log_sample_rate': 2})
+
+    def test_close(self):
+        """Test that closing writes the remaining entries and can be repeated."""
+        request_log = RequestLog(self.path)
+        request_log.log_request('DELETE', 'my/testhandle', 'http://foo.com', MockResponse())
+        request_log.close()
+        request_log.close()
+        request_log.log_request('DELETE', 'my/testhandle', 'http://foo.com', MockResponse())
+        request_log.flush()
+        with open(self.path) as log_file:
+            self.assertEqual(len(log_file.readlines()), 1)
+        shared = RequestLog.from_args({'request_log': self.path})
+        self.addCleanup(shared.close)
+        self.assertIsNot(shared, request_log)
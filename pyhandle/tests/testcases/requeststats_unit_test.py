@@ -0,0 +1,122 @@
+"""Testing the request statistics (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+import requests
+import pyhandle
+from pyhandle.handleclient import PyHandleClient
+from pyhandle.client.resthandleclient import RESTHandleClient
+from pyhandle.handlesystemconnector import HandleSystemConnector
+from pyhandle.requeststats import RequestStatistics, LatencyHistogram, get_outcome
+from pyhandle.tests.mockresponses import MockResponse
+
+PATH_CRED = pyhandle.util.get_neighbour_directory(__file__, 'testcredentials')
+CRED_FILE = PATH_CRED+'/fake_certs_and_keys/fake_certi_and_bothkeys.pem'
+
+
+class LatencyHistogramTestCase(unittest.TestCase):
+
+    def test_percentiles(self):
+        """Test that percentiles are estimated within their bucket."""
+        histogram = LatencyHistogram(bounds=(0.1, 1.0))
+        self.assertIsNone(histogram.percentile(50))
+        for value in [0.05] * 90 + [0.5] * 9 + [3.0]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [90, 9, 1])
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.sum, 12.0)
+        self.assertAlmostEqual(histogram.percentile(50), 0.1 * 50 / 90)
+        self.assertAlmostEqual(histogram.percentile(95), 0.1 + 0.9 * 5 / 9)
+        self.assertAlmostEqual(histogram.percentile(99), 1.0)
+        self.assertAlmostEqual(histogram.percentile(100), 3.0)
+
+
+class RequestStatisticsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = HandleSystemConnector(
+            certificate_and_key=CRED_FILE,
+            handle_server_url='http://foo.com',
+            max_retries=3
+        )
+        self.statistics = self.inst.get_statistics()
+
+    def test_outcome(self):
+        """Test classifying responses."""
+        self.assertEqual(get_outcome(MockResponse(status_code=201)), 'success')
+        self.assertEqual(get_outcome(MockResponse(notfound=True)), 'not_found')
+        self.assertEqual(get_outcome(MockResponse(status_code=401)), 'client_error')
+        self.assertEqual(get_outcome(MockResponse(status_code=500)), 'server_error')
+        self.assertEqual(get_outcome(None), 'error')
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.put')
+    @mock.patch('requests.Session.get')
+    def test_connector_records_requests(self, getpatch, putpatch, sleeppatch):
+        """Test that requests, retries and bytes are counted."""
+        getpatch.side_effect = [MockResponse(success=True), MockResponse(notfound=True),
+                                requests.exceptions.ConnectionError(), MockResponse(success=True)]
+        putpatch.return_value = MockResponse(status_code=201)
+
+        self.inst.send_handle_get_request('my/testhandle')
+        self.inst.send_handle_get_request('my/testhandle')
+        self.inst.send_handle_get_request('my/testhandle')
+        _, payload = self.inst.send_handle_put_request(handle='my/testhandle',
+            list_of_entries=[{'index': 1, 'type': 'URL', 'data': 'http://foo.bar'}])
+
+        stats = self.statistics.as_dict()
+        self.assertEqual(stats['requests'], {'GET': {'success': 2, 'not_found': 1}, 'PUT': {'success': 1}})
+        self.assertEqual(stats['retries'], {'GET': 1})
+        self.assertEqual(stats['latency']['GET']['count'], 3)
+        self.assertIsNotNone(stats['latency']['GET']['p99'])
+        self.assertEqual(stats['bytes_sent'], len(payload))
+        received = [MockResponse(success=True), MockResponse(notfound=True), MockResponse(success=True),
+                    putpatch.return_value]
+        self.assertEqual(stats['bytes_received'], sum(len(resp.content) for resp in received))
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_failed_request_counted(self, getpatch, sleeppatch):
+        """Test that requests that raise are counted as errors."""
+        getpatch.side_effect = requests.exceptions.ConnectionError()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.inst.send_handle_get_request('my/testhandle')
+        self.assertEqual(self.statistics.as_dict()['requests'], {'GET': {'error': 1}})
+        self.assertEqual(self.statistics.as_dict()['retries'], {'GET': 3})
+
+    def test_prometheus(self):
+        """Test the export in the Prometheus text format."""
+        statistics = RequestStatistics(latency_buckets=(0.1, 1.0))
+        statistics.record_request('GET', 'success', 0.05, bytes_received=100)
+        statistics.record_request('GET', 'success', 0.5)
+        statistics.record_retry('GET')
+        text = statistics.to_prometheus()
+        self.assertIn('# TYPE pyhandle_requests_total counter\n', text)
+        self.assertIn('pyhandle_requests_total{op="GET",outcome="success"} 2\n', text)
+        self.assertIn('pyhandle_request_duration_seconds_bucket{op="GET",le="0.1"} 1\n', text)
+        self.assertIn('pyhandle_request_duration_seconds_bucket{op="GET",le="1.0"} 2\n', text)
+        self.assertIn('pyhandle_request_duration_seconds_bucket{op="GET",le="+Inf"} 2\n', text)
+        self.assertIn('pyhandle_request_duration_seconds_count{op="GET"} 2\n', text)
+        self.assertIn('pyhandle_received_bytes_total 100\n', text)
+        self.assertIn('pyhandle_retries_total{op="GET"} 1\n', text)
+        statistics.reset()
+        self.assertEqual(statistics.as_dict()['requests'], {})
+
+    @mock.patch('requests.Session.get')
+    def test_client_stats(self, getpatch):
+        """Test that the client shares its statistics and includes its caches."""
+        getpatch.return_value = MockResponse(success=True)
+        client = RESTHandleClient.instantiate_for_read_access('http://foo.com', record_cache_size=10)
+        client.retrieve_handle_record_json('my/testhandle')
+        client.retrieve_handle_record_json('my/testhandle')
+
+        stats = client.stats().as_dict()
+        self.assertEqual(stats['requests'], {'GET': {'success': 1}})
+        self.assertEqual(stats['caches']['record_cache']['hits'], 1)
+        self.assertIn('pyhandle_cache_hits_total{cache="record_cache"} 1\n', client.stats().to_prometheus())
+        self.assertIsInstance(PyHandleClient('rest').stats(), RequestStatistics)
@@ -0,0 +1,196 @@
+"""Testing the retry policy and the circuit breaker (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import mock
+import requests
+import time
+from pyhandle.retrypolicy import RetryPolicy, CircuitBreaker
+from pyhandle.handleexceptions import HandleServerUnavailableError
+from pyhandle.tests.mockresponses import MockResponse
+
+
+class ResponseSequence(object):
+    '''
+    Sends the given responses (or raises the given exceptions)
+    one after another, counting the calls.
+    '''
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)-1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@mock.patch('pyhandle.retrypolicy.time.sleep')
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def test_retry_until_success(self, sleeppatch):
+        """Test that temporary failures are retried."""
+        policy = RetryPolicy(max_retries=3)
+        send = ResponseSequence(MockResponse(status_code=503), requests.exceptions.ConnectionError(), MockResponse(success=True))
+
+        resp = policy.send(send)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(sleeppatch.call_count, 2)
+
+    def test_retry_exhausted(self, sleeppatch):
+        """Test that the last failed response is returned after all retries."""
+        policy = RetryPolicy(max_retries=2)
+        send = ResponseSequence(MockResponse(status_code=502))
+
+        resp = policy.send(send)
+
+        self.assertEqual(resp.status_code, 502)
+        self.assertEqual(send.calls, 3)
+
+    def test_retry_exhausted_connection_error(self, sleeppatch):
+        """Test that the connection error is raised after all retries."""
+        policy = RetryPolicy(max_retries=1)
+        send = ResponseSequence(requests.exceptions.ConnectionError())
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            policy.send(send)
+        self.assertEqual(send.calls, 2)
+
+    def test_no_retry_if_not_idempotent(self, sleeppatch):
+        """Test that non-idempotent requests are sent only once."""
+        policy = RetryPolicy(max_retries=3)
+        send = ResponseSequence(MockResponse(status_code=503))
+
+        resp = policy.send(send, idempotent=False)
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(send.calls, 1)
+
+    def test_no_retry_after_deadline(self, sleeppatch):
+        """Test that no retry is started if it would end after the deadline."""
+        policy = RetryPolicy(max_retries=3)
+        busy = MockResponse(status_code=503)
+        busy.headers = {'Retry-After': '5'}
+        send = ResponseSequence(busy)
+
+        resp = policy.send(send, deadline=time.time()+2)
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(send.calls, 1)
+
+    def test_no_retry_on_other_status(self, sleeppatch):
+        """Test that e.g. 404 and 500 are not retried."""
+        policy = RetryPolicy(max_retries=3)
+        for status in [404, 500]:
+            send = ResponseSequence(MockResponse(status_code=status))
+            policy.send(send)
+            self.assertEqual(send.calls, 1)
+        self.assertEqual(sleeppatch.call_count, 0)
+
+    def test_backoff_exponential_with_jitter(self, sleeppatch):
+        """Test that the waiting time grows exponentially and is capped."""
+        policy = RetryPolicy(backoff_factor=1, backoff_max=5)
+        with mock.patch('pyhandle.retrypolicy.random.uniform', side_effect=lambda low, high: high):
+            waits = [policy.get_backoff_time(n) for n in range(1, 5)]
+        self.assertEqual(waits, [1, 2, 4, 5])
+        for _ in range(20):
+            self.assertTrue(0 <= policy.get_backoff_time(3) <= 4)
+
+    def test_backoff_retry_after(self, sleeppatch):
+        """Test that a Retry-After header is honoured."""
+        policy = RetryPolicy(max_retries=1, backoff_max=10)
+        busy = MockResponse(status_code=503)
+        busy.headers = {'Retry-After': '7'}
+        send = ResponseSequence(busy, MockResponse(success=True))
+
+        policy.send(send)
+
+        sleeppatch.assert_called_once_with(7.0)
+        busy.headers = {'Retry-After': '3600'}
+        self.assertEqual(policy.get_backoff_time(1, busy), 10)
+
+    def test_from_args(self, sleeppatch):
+        """Test creating a policy from (string) config values."""
+        policy = RetryPolicy.from_args({'max_retries': '5', 'retry_status_codes': '503,504'})
+        self.assertEqual(policy.max_retries, 5)
+        self.assertEqual(policy.status_codes, frozenset([503, 504]))
+        self.assertIsInstance(policy.circuit_breaker, CircuitBreaker)
+        with self.assertRaises(ValueError):
+            RetryPolicy.from_args({'max_retries': -1})
+
+    def test_from_args_opt_in(self, sleeppatch):
+        """Test that neither retries nor the circuit breaker are on by default."""
+        policy = RetryPolicy.from_args({})
+        self.assertEqual(policy.max_retries, 0)
+        send = ResponseSequence(MockResponse(status_code=503))
+        for _ in range(10):
+            policy.send(send)
+        self.assertEqual(send.calls, 10)
+        self.assertEqual(policy.circuit_breaker.get_state(), CircuitBreaker.CLOSED)
+        self.assertEqual(sleeppatch.call_count, 0)
+
+
+@mock.patch('pyhandle.retrypolicy.time.sleep')
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    def test_breaker_opens_and_fails_fast(self, sleeppatch):
+        """Test that the breaker opens after consecutive failures."""
+        policy = RetryPolicy(max_retries=1, circuit_breaker=CircuitBreaker(threshold=4, timeout=60))
+        send = ResponseSequence(MockResponse(status_code=503))
+
+        policy.send(send)
+        policy.send(send)
+        self.assertEqual(policy.circuit_breaker.get_state(), CircuitBreaker.OPEN)
+        with self.assertRaises(HandleServerUnavailableError):
+            policy.send(send, handle='my/handle')
+        self.assertEqual(send.calls, 4)
+
+    def test_breaker_half_open_trial(self, sleeppatch):
+        """Test that one trial request closes the breaker again."""
+        breaker = CircuitBreaker(threshold=1, timeout=30)
+        policy = RetryPolicy(max_retries=0, circuit_breaker=breaker)
+        with mock.patch('pyhandle.retrypolicy.time.time', return_value=1000):
+            policy.send(ResponseSequence(MockResponse(status_code=502)))
+        with mock.patch('pyhandle.retrypolicy.time.time', return_value=1031):
+            self.assertEqual(breaker.get_state(), CircuitBreaker.HALF_OPEN)
+            breaker.before_request()
+            with self.assertRaises(HandleServerUnavailableError):
+                # Only one trial at a time:
+                breaker.before_request()
+            breaker.record_success()
+        self.assertEqual(breaker.get_state(), CircuitBreaker.CLOSED)
+
+    def test_breaker_ignores_rate_limiting(self, sleeppatch):
+        """Test that 429 responses do not open the breaker."""
+        policy = RetryPolicy(max_retries=0, circuit_breaker=CircuitBreaker(threshold=1))
+        policy.send(ResponseSequence(MockResponse(status_code=429)))
+        self.assertEqual(policy.circuit_breaker.get_state(), CircuitBreaker.CLOSED)
+
+    def test_breaker_rate_limiting_keeps_failures(self, sleeppatch):
+        """Test that 429 responses do not reset the consecutive failures."""
+        policy = RetryPolicy(max_retries=0, circuit_breaker=CircuitBreaker(threshold=2))
+        policy.send(ResponseSequence(MockResponse(status_code=503)))
+        policy.send(ResponseSequence(MockResponse(status_code=429)))
+        self.assertEqual(policy.circuit_breaker.get_state(), CircuitBreaker.CLOSED)
+        policy.send(ResponseSequence(MockResponse(status_code=503)))
+        self.assertEqual(policy.circuit_breaker.get_state(), CircuitBreaker.OPEN)
+
+    def test_breaker_rate_limited_trial(self, sleeppatch):
+        """Test that a 429 response to the trial request neither closes the
+        breaker nor blocks the next trial."""
+        breaker = CircuitBreaker(threshold=1, timeout=30)
+        policy = RetryPolicy(max_retries=0, circuit_breaker=breaker)
+        with mock.patch('pyhandle.retrypolicy.time.time', return_value=1000):
+            policy.send(ResponseSequence(MockResponse(status_code=502)))
+        with mock.patch('pyhandle.retrypolicy.time.time', return_value=1031):
+            policy.send(ResponseSequence(MockResponse(status_code=429)))
+            self.assertEqual(breaker.get_state(), CircuitBreaker.HALF_OPEN)
+            breaker.before_request()
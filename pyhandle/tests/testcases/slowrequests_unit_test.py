@@ -0,0 +1,110 @@
+"""Testing the slow-request detector (no server access)."""
+
+import sys
+if sys.version_info < (2, 7):
+    import unittest2 as unittest
+else:
+    import unittest
+
+import datetime
+import mock
+import requests
+from pyhandle.client.resthandleclient import RESTHandleClient
+from pyhandle.handleclient import PyHandleClient
+from pyhandle.requeststats import RequestStatistics
+from pyhandle.hooks import HookChain, RequestHook
+from pyhandle.slowrequests import SlowRequestDetector
+from pyhandle.tests.mockresponses import MockResponse
+
+
+class SlowRequestDetectorTestCase(unittest.TestCase):
+
+    def test_from_args(self):
+        """Test that a detector is only made if there is a threshold."""
+        self.assertIsNone(SlowRequestDetector.from_args({}))
+        detector = SlowRequestDetector.from_args({'slow_request_threshold': '2.5',
+                                                  'slow_request_ring_size': '10'})
+        self.assertEqual(detector.threshold, 2.5)
+        self.assertEqual(detector.ring_size, 10)
+        self.assertIs(SlowRequestDetector.from_args({'slow_request_threshold': detector}), detector)
+        with self.assertRaises(ValueError):
+            SlowRequestDetector.from_args({'slow_request_threshold': -1})
+        self.assertEqual(RESTHandleClient.instantiate_for_read_access('http://foo.com').get_slow_requests(), [])
+
+    @mock.patch('pyhandle.retrypolicy.time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_client_captures_slow_requests(self, getpatch, sleeppatch):
+        """Test that slow requests are kept with phases, retries and size, and logged."""
+        response = MockResponse(success=True)
+        response.elapsed = datetime.timedelta(seconds=0)
+        getpatch.side_effect = [requests.exceptions.ConnectionError(), response]
+        client = RESTHandleClient.instantiate_for_read_access('http://foo.com', slow_request_threshold=0, max_retries=1)
+
+        with self.assertLogs('pyhandle.slowrequests', 'WARNING') as logs:
+            client.retrieve_handle_record_json('my/testhandle')
+
+        records = client.get_slow_requests()
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record['op'], 'GET')
+        self.assertEqual(record['handle'], 'my/testhandle')
+        self.assertEqual(record['url'], 'http://foo.com/api/handles/my/testhandle')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['retries'], 1)
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertEqual(record['phases']['response'], 0)
+        self.assertAlmostEqual(record['phases']['other'], record['latency'])
+        self.assertGreaterEqual(record['phases']['parse'], 0)
+        self.assertIn('Slow request: GET http://foo.com/api/handles/my/testhandle', logs.output[0])
+
+    @mock.patch('pyhandle.client.dbhandleclient.pymysql.connect')
+    def test_db_client_options(self, connectpatch):
+        """Test that the options reach the DB client, also from the credentials, and that others are refused."""
+        connectpatch.return_value.cursor.return_value.fetchall.return_value = [{'handle': 'my/handle'}]
+        credentials = {'db_host': 'localhost', 'db_user': 'user', 'db_password': 'pw', 'db_name': 'handles'}
+        statistics = RequestStatistics()
+
+        client = PyHandleClient('db', credentials, statistics=statistics, slow_request_threshold=0)
+        client.handle_client.execute_query('SELECT handle FROM handles')
+        self.assertIs(client.stats(), statistics)
+        self.assertEqual(statistics.as_dict()['requests'], {'SELECT': {'success': 1}})
+        records = client.get_slow_requests()
+        self.assertEqual([(record['op'], record['response_bytes']) for record in records], [('SELECT', 1)])
+
+        credentials['slow_request_threshold'] = '0'
+        client = PyHandleClient('db', credentials)
+        client.handle_client.execute_query('SELECT handle FROM handles')
+        self.assertEqual(len(client.get_slow_requests()), 1)
+
+        with self.assertRaisesRegex(ValueError, 'not supported by the DB client: max_retries'):
+            PyHandleClient('db', credentials, max_retries=3)
+        with self.assertRaisesRegex(ValueError, 'only passed to the DB client'):
+            PyHandleClient('rest', slow_request_threshold=1)
+
+    @mock.patch('requests.Session.get')
+    def test_fast_requests_ignored(self, getpatch):
+        """Test that requests below the threshold are not captured, and user hooks are kept."""
+        getpatch.return_value = MockResponse(success=True)
+        hook = RequestHook()
+        client = RESTHandleClient.instantiate_for_read_access('http://foo.com', slow_request_threshold=60,
+            request_hooks=[hook])
+        client.retrieve_handle_record_json('my/testhandle')
+        self.assertEqual(client.get_slow_requests(), [])
+        hooks = client._get_handlesystemconnector().get_request_hooks().hooks
+        self.assertIs(hooks[0], hook)
+        self.assertIsInstance(hooks[1], SlowRequestDetector)
+
+    def test_ring_is_bounded(self):
+        """Test that only the newest records are kept."""
+        detector = SlowRequestDetector(0, ring_size=2)
+        chain = HookChain([detector])
+        with self.assertLogs('pyhandle.slowrequests', 'WARNING'):
+            for handle in ['my/1', 'my/2', 'my/3']:
+                chain.after_request(chain.before_request('DELETE', handle, 'http://foo.com/'+handle),
+                                    error=requests.exceptions.Timeout())
+        records = detector.records()
+        self.assertEqual([record['handle'] for record in records], ['my/2', 'my/3'])
+        self.assertEqual(records[0]['error'], 'Timeout()')
+        self.assertIsNone(records[0]['response_bytes'])
+        detector.clear()
+        self.assertEqual(detector.records(), [])
@@ -5,7 +5,7 @@ if sys.version_info < (2, 7):
 else:
     import unittest
 
-from pyhandle.util import get_valid_https_verify
+from pyhandle.util import get_valid_https_verify, get_valid_bool, get_valid_positive_int
 
 
 class UtilConfigTestCase(unittest.TestCase):
@@ -33,3 +33,25 @@ class UtilConfigTestCase(unittest.TestCase):
     def test_valid_https_verify_bool_string(self):
         """Test return string when getting a string value in https_verify"""
         self.assertEqual(get_valid_https_verify('ca_cert.crt'), 'ca_cert.crt')
+
+    def test_valid_bool_string(self):
+        """Test return bool when getting a boolean or its string"""
+        self.assertEqual(get_valid_bool('False'), False)
+        self.assertEqual(get_valid_bool('true'), True)
+        self.assertEqual(get_valid_bool(True), True)
+
+    def test_valid_bool_invalid(self):
+        """Test exception when getting a value that is no boolean"""
+        with self.assertRaises(ValueError):
+            get_valid_bool('maybe')
+
+    def test_valid_positive_int(self):
+        """Test return int when getting an int or its string"""
+        self.assertEqual(get_valid_positive_int(20), 20)
+        self.assertEqual(get_valid_positive_int('20'), 20)
+
+    def test_valid_positive_int_invalid(self):
+        """Test exception when getting zero, a float or no number"""
+        for value in [0, -3, 2.5, 'many', True]:
+            with self.assertRaises(ValueError):
+                get_valid_positive_int(value)
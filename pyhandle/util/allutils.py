@@ -6,3 +6,4 @@ from .utilconfig import *
 from .pathutils import *
 from .logutils import *
 from .argsutils import *
+from .concurrencyutils import *
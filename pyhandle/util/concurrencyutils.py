@@ -0,0 +1,244 @@
+'''
+This module provides helpers to run many independent
+    operations (e.g. one request per handle) concurrently
+    while keeping the amount of pending work bounded.
+'''
+
+import concurrent.futures
+import threading
+import time
+
+
+def bounded_concurrent_map(function, items, max_workers=10, max_in_flight=None,
+                           deadline=None, deadline_error=None):
+    '''
+    Apply a function to every item of an iterable using a thread
+        pool. The iterable is consumed lazily, so that never more
+        than max_in_flight items are pending at the same time. This
+        keeps memory bounded even for very long (or endless) inputs.
+
+    Exceptions raised by the function are not propagated, but
+        returned along with the item, so that one failing item does
+        not abort the others.
+
+    :function: The function to apply. It is called with one item.
+    :items: Any iterable.
+    :max_workers: Optional. The number of threads. Defaults to 10.
+    :max_in_flight: Optional. The maximum number of submitted but
+        not yet yielded items. Defaults to twice max_workers.
+    :deadline: Optional. The point in time (as returned by time.time())
+        at which to give up. Then, no more items are read from the
+        iterable, the queued work is cancelled and the pending items
+        are yielded with a deadline error. Work that is already running
+        cannot be interrupted, so the function should itself respect the
+        deadline (e.g. by using it for its timeouts).
+    :deadline_error: Optional. A function that is called with a pending
+        item and returns the exception to yield for it when the deadline
+        is exceeded. Defaults to a TimeoutError.
+    :return: A generator of tuples (item, result, exception), in
+        order of completion. Either result or exception is None.
+    '''
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1, not '+str(max_workers))
+    if max_in_flight is None:
+        max_in_flight = 2*max_workers
+    max_in_flight = max(max_in_flight, max_workers)
+
+    iterator = iter(items)
+    pending = {}
+    exhausted = False
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    deadline_exceeded = False
+    try:
+        while True:
+
+            # Fill up the pipeline (unless the deadline has passed):
+            if deadline is not None and time.time() >= deadline:
+                exhausted = True
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(function, item)] = item
+
+            if len(pending) == 0:
+                break
+
+            # Hand out whatever is finished:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.time())
+            done, _ = concurrent.futures.wait(
+                pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            if len(done) == 0:
+                # Deadline exceeded: Give up on all pending items.
+                deadline_exceeded = True
+                for future in pending:
+                    future.cancel()
+                abandoned = list(pending.values())
+                pending.clear()
+                for item in abandoned:
+                    if deadline_error is None:
+                        yield item, None, TimeoutError('Deadline exceeded')
+                    else:
+                        yield item, None, deadline_error(item)
+                break
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, error
+    finally:
+        # If the consumer stops early, do not start the queued work:
+        for future in pending:
+            future.cancel()
+        # Do not wait for work that was given up because of the deadline:
+        executor.shutdown(wait=not deadline_exceeded)
+
+
+class SummarizedResults(object):
+    '''
+    Wraps a generator of (item, result, exception) tuples (as returned
+        by bounded_concurrent_map) and counts the outcomes while they
+        are consumed. The counts are available as the dict "summary"
+        at any time, and are complete once the iteration has finished.
+    '''
+
+    def __init__(self, results, classify, outcomes):
+        '''
+        :results: The generator of tuples.
+        :classify: A function that is called with item, result and
+            exception and returns the outcome to count.
+        :outcomes: The names of all possible outcomes, so that they
+            appear in the summary with 0 even if they never occur.
+        '''
+        self.__results = results
+        self.__classify = classify
+        self.summary = dict((outcome, 0) for outcome in outcomes)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item, result, error = next(self.__results)
+        outcome = self.__classify(item, result, error)
+        self.summary[outcome] = self.summary.get(outcome, 0) + 1
+        return item, result, error
+
+    next = __next__  # Python 2
+
+    def close(self):
+        '''
+        Stop early: Pending work that has not started yet is cancelled.
+        '''
+        self.__results.close()
+
+    def get_summary(self):
+        '''
+        Consume all remaining results and return the summary.
+
+        :return: A dict with the number of items per outcome.
+        '''
+        for _ in self:
+            pass
+        return self.summary
+
+
+class _Flight(object):
+    # One call in progress, and its outcome:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.copies = []
+
+
+class SingleFlight(object):
+    '''
+    Coalesces concurrent calls with the same key: While a call for a
+        key is in progress, other threads that make a call for the
+        same key do not run their function, but wait for the running
+        call and receive its result (or its exception).
+    '''
+
+    def __init__(self, copy=None):
+        '''
+        :copy: Optional. A function that copies a result, e.g.
+            copy.deepcopy. If given, every caller receives its own result:
+            the waiting threads get copies, made before they are woken,
+            and the running call keeps the original. Defaults to None
+            (all callers share the result).
+        '''
+        self.__copy = copy
+        self.__lock = threading.Lock()
+        self.__flights = {}
+
+    def do(self, key, function, timeout=None):
+        '''
+        Run the function, unless a call with the same key is in progress.
+
+        :key: A hashable key, e.g. the URL of a request.
+        :function: A function without arguments.
+        :timeout: Optional. The maximum number of seconds to wait for a
+            call of another thread. Defaults to None (no limit).
+        :raise: :exc:`~TimeoutError`: If the call of another thread did
+            not finish in time.
+        :return: A tuple of the result and a boolean that is True if the
+            result was shared by another thread's call.
+        '''
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self.__flights[key] = flight
+            else:
+                flight.waiters += 1
+
+        if leader:
+            try:
+                flight.result = function()
+            except BaseException as exc:
+                flight.error = exc
+                raise
+            finally:
+                with self.__lock:
+                    # Unless it was forgotten, no thread can join any more:
+                    if self.__flights.get(key) is flight:
+                        del self.__flights[key]
+                    waiters = flight.waiters
+                try:
+                    if flight.error is None and self.__copy is not None:
+                        flight.copies = [self.__copy(flight.result) for _ in range(waiters)]
+                except BaseException as exc:
+                    flight.error = exc
+                    raise
+                finally:
+                    flight.done.set()
+            return flight.result, False
+
+        if not flight.done.wait(timeout):
+            raise TimeoutError('Waited too long for the running call')
+        if flight.error is not None:
+            raise flight.error
+        if self.__copy is None:
+            return flight.result, True
+        with self.__lock:
+            return flight.copies.pop(), True
+
+    def forget(self, match):
+        '''
+        Let the calls in progress finish without new threads joining them:
+            Threads calling :meth:`do` afterwards run their own call.
+
+        :match: A function that returns True for the keys to forget.
+        '''
+        with self.__lock:
+            for key in [key for key in self.__flights if match(key)]:
+                del self.__flights[key]
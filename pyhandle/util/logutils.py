@@ -43,16 +43,20 @@ def log_instantiation(LOGGER, classname, args, forbidden, with_date=False):
         date and time should be logged.
     '''
 
+    # Nothing to do if debug messages are discarded anyway:
+    if not LOGGER.isEnabledFor(logging.DEBUG):
+        return
+
     # Info:
     if with_date:
-            LOGGER.debug('Instantiating '+classname+' at '+datetime.datetime.now().strftime('%Y-%m-%d_%H:%M'))
+        LOGGER.debug('Instantiating %s at %s', classname, datetime.datetime.now().strftime('%Y-%m-%d_%H:%M'))
     else:
-        LOGGER.debug('Instantiating '+classname)
+        LOGGER.debug('Instantiating %s', classname)
 
     # Debug:
     for argname in args:
         if args[argname] is not None:
             if argname in forbidden:
-                LOGGER.debug('Param '+argname+'*******')
+                LOGGER.debug('Param %s*******', argname)
             else:
-                LOGGER.debug('Param '+argname+'='+str(args[argname]))
+                LOGGER.debug('Param %s=%s', argname, args[argname])
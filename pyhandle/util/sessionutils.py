@@ -0,0 +1,220 @@
+'''
+This module provides the creation of the HTTP sessions used
+    to talk to the Handle Server and to the reverse lookup
+    servlet, with configurable connection pooling,
+    keep-alive behaviour and timeouts.
+'''
+
+import logging
+import socket
+import time
+import requests
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE, DEFAULT_POOLBLOCK
+from urllib3.connection import HTTPConnection
+
+from .logutils import NullHandler
+from .utilconfig import get_valid_bool, get_valid_positive_int
+from ..handleexceptions import DeadlineExceededError
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(NullHandler())
+
+SESSION_ARGS = [
+    'pool_connections',
+    'pool_maxsize',
+    'pool_block',
+    'keep_alive',
+    'tcp_keepalive'
+]
+
+TIMEOUT_ARGS = [
+    'timeout',
+    'connect_timeout',
+    'read_timeout'
+]
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+
+def get_tcp_keepalive_socket_options():
+    '''
+    The socket options that switch on TCP keep-alive probes, so that
+        idle pooled connections that were dropped by a firewall or
+        load balancer are detected instead of hanging on reuse. The
+        timing options are only added where the platform has them.
+
+    :return: A list of socket options as understood by urllib3.
+    '''
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (('TCP_KEEPIDLE', 60), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 6)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PoolingHTTPAdapter(HTTPAdapter):
+    '''
+    A requests HTTPAdapter that can also pass socket options (e.g.
+        for TCP keep-alive) to the connection pools it creates.
+    '''
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super(PoolingHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super(PoolingHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+
+def get_session_settings(args):
+    '''
+    Extract and validate the connection pool and keep-alive settings
+        from the arguments passed to a connector. Values may also be
+        strings, as read from a JSON credentials file.
+
+    :args: A dictionary of arguments. Missing or None values are
+        replaced by the defaults.
+    :raise: :exc:`~ValueError`: If a value is not valid.
+    :return: A dictionary containing the keys 'pool_connections',
+        'pool_maxsize', 'pool_block', 'keep_alive' and 'tcp_keepalive'.
+    '''
+    settings = dict(
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        keep_alive=True,
+        tcp_keepalive=False
+    )
+    for name in ['pool_connections', 'pool_maxsize']:
+        if args.get(name) is not None:
+            settings[name] = get_valid_positive_int(args[name])
+    for name in ['pool_block', 'keep_alive', 'tcp_keepalive']:
+        if args.get(name) is not None:
+            settings[name] = get_valid_bool(args[name])
+    return settings
+
+
+def make_session(pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE,
+                 pool_block=DEFAULT_POOLBLOCK, keep_alive=True, tcp_keepalive=False):
+    '''
+    Create a requests session whose HTTP and HTTPS adapters use the
+        given connection pool settings.
+
+    :pool_connections: Optional. The number of connection pools (i.e.
+        of different hosts) to cache. Defaults to 10.
+    :pool_maxsize: Optional. The maximum number of connections kept
+        open per host. Should be at least the number of threads that
+        use the session concurrently. Defaults to 10.
+    :pool_block: Optional. If True, a thread waits for a free
+        connection when the pool is exhausted, instead of opening an
+        extra connection that is discarded afterwards. Defaults to
+        False.
+    :keep_alive: Optional. If False, every connection is closed after
+        its response ("Connection: close"). Defaults to True.
+    :tcp_keepalive: Optional. If True, TCP keep-alive probes are sent
+        on idle connections. Defaults to False.
+    :return: A requests.Session.
+    '''
+    socket_options = None
+    if tcp_keepalive:
+        socket_options = HTTPConnection.default_socket_options + get_tcp_keepalive_socket_options()
+
+    session = requests.Session()
+    adapter = PoolingHTTPAdapter(
+        socket_options=socket_options,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    LOGGER.debug('Session created (pool_connections=%s, pool_maxsize=%s, pool_block=%s,'
+                 ' keep_alive=%s, tcp_keepalive=%s).',
+                 pool_connections, pool_maxsize, pool_block, keep_alive, tcp_keepalive)
+    return session
+
+
+def _get_valid_seconds(value, name):
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a valid number of seconds for '+name+': '+str(value))
+    if seconds <= 0:
+        raise ValueError('Not a valid number of seconds for '+name+': '+str(value))
+    return seconds
+
+
+def get_valid_timeout(value):
+    '''
+    Get a (connect, read) timeout tuple from a number of seconds (used
+        for both) or from a pair of numbers. Values may also be strings,
+        as read from a JSON credentials file.
+
+    :value: The input value, e.g. 5, '5', (3, 30) or [3, 30].
+    :raise: :exc:`~ValueError`: If the value is not valid.
+    :return: A tuple of two floats.
+    '''
+    if isinstance(value, (tuple, list)):
+        if len(value) != 2:
+            raise ValueError('A timeout must be one number or a pair of numbers: '+str(value))
+        return (_get_valid_seconds(value[0], 'connect timeout'),
+                _get_valid_seconds(value[1], 'read timeout'))
+    seconds = _get_valid_seconds(value, 'timeout')
+    return (seconds, seconds)
+
+
+def get_timeout_settings(args):
+    '''
+    Extract and validate the timeout settings from the arguments passed
+        to a connector.
+
+    :args: A dictionary that may contain the keys 'timeout' (one number
+        or a pair), 'connect_timeout' and 'read_timeout'. The latter
+        override the former.
+    :raise: :exc:`~ValueError`: If a value is not valid.
+    :return: A tuple (connect timeout, read timeout) in seconds.
+    '''
+    connect_timeout, read_timeout = DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+    if args.get('timeout') is not None:
+        connect_timeout, read_timeout = get_valid_timeout(args['timeout'])
+    if args.get('connect_timeout') is not None:
+        connect_timeout = _get_valid_seconds(args['connect_timeout'], 'connect_timeout')
+    if args.get('read_timeout') is not None:
+        read_timeout = _get_valid_seconds(args['read_timeout'], 'read_timeout')
+    return (connect_timeout, read_timeout)
+
+
+def get_request_timeout(default_timeout, timeout=None, deadline=None, handle=None, op=None):
+    '''
+    Compute the timeout for one request: The timeout passed for this
+        call (or else the connector's default), shortened so that the
+        request ends before the deadline.
+
+    :default_timeout: The connector's (connect, read) timeout tuple.
+    :timeout: Optional. The timeout passed for this call: one number or
+        a pair of numbers.
+    :deadline: Optional. The point in time (as returned by time.time())
+        at which the operation must be finished.
+    :handle: Optional. The handle, only used in the exception.
+    :op: Optional. The operation, only used in the exception.
+    :raise: :exc:`~pyhandle.handleexceptions.DeadlineExceededError`: If
+        the deadline has passed already.
+    :return: A tuple (connect timeout, read timeout) in seconds.
+    '''
+    if timeout is not None:
+        connect_timeout, read_timeout = get_valid_timeout(timeout)
+    else:
+        connect_timeout, read_timeout = default_timeout
+    if deadline is not None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceededError(handle=handle, operation=op)
+        connect_timeout = min(connect_timeout, remaining)
+        read_timeout = min(read_timeout, remaining)
+    return (connect_timeout, read_timeout)
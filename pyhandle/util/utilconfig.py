@@ -22,3 +22,40 @@ def get_valid_https_verify(value):
         http_verify_value = bool_values[value.lower()]
 
     return http_verify_value
+
+def get_valid_bool(value):
+    '''
+    Get a boolean from a boolean or from its string representation
+    (e.g. as read from a JSON credentials file).
+
+    :value: The input value, e.g. True, 'true' or 'False'.
+    :raise: :exc:`~ValueError`: If the value cannot be interpreted
+        as boolean.
+    :returns: True or False.
+    '''
+    bool_values = {'false': False, 'true': True}
+
+    if isinstance(value, bool):
+        return value
+    elif isinstance(value, str) and value.lower() in bool_values.keys():
+        return bool_values[value.lower()]
+    raise ValueError('Not a boolean value: '+str(value))
+
+def get_valid_positive_int(value):
+    '''
+    Get a positive integer from an integer or from its string
+    representation (e.g. as read from a JSON credentials file).
+
+    :value: The input value, e.g. 20 or '20'.
+    :raise: :exc:`~ValueError`: If the value is not a positive integer.
+    :returns: The integer.
+    '''
+    if isinstance(value, bool):
+        raise ValueError('Not a positive integer: '+str(value))
+    try:
+        int_value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a positive integer: '+str(value))
+    if int_value < 1 or str(int_value) != str(value).strip():
+        raise ValueError('Not a positive integer: '+str(value))
+    return int_value
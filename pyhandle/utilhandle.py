@@ -5,8 +5,6 @@ pyhandle library.
 '''
 from __future__ import absolute_import
 import base64
-from future.standard_library import install_aliases
-install_aliases()
 from urllib.parse import quote
 from . import handleexceptions
 from . import util
@@ -95,6 +95,10 @@ setup(name='pyhandle',
           'pymysql==0.8.0 ; python_version < "3.11.0"',
           'pymysql==1.1.0 ; python_version >= "3.11.0"'
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'fast': ['orjson'],
+      },
       tests_require=test_dependencies,
       python_requires='>=3.6',
       cmdclass={'test': NoseTestCommand},